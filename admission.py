@@ -0,0 +1,245 @@
+"""
+Admission Control - bounded concurrency with priority classes and delay-based shedding
+Requests wait for one of a fixed number of slots, served by priority class and earliest
+deadline within a class. Each class sheds new arrivals once its measured queue delay
+nears its budget, so overload gets a fast 503 with Retry-After instead of a timeout.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower rank is served first
+PRIORITY_CLASSES: Dict[str, int] = {"telephony": 0, "voice": 1, "chat": 2, "batch": 3}
+
+# Longest a request of each class may wait for a slot. Twilio abandons a webhook
+# after 15s, so calls can afford to queue; batch work should give way quickly.
+DEFAULT_MAX_QUEUE_DELAY_MS: Dict[str, float] = {
+    "telephony": 5000,
+    "voice": 1500,
+    "chat": 2000,
+    "batch": 500,
+}
+
+# New arrivals are shed once the expected wait passes this share of their budget;
+# by then anything queued has little time left for the work itself
+SHED_THRESHOLD = 0.5
+
+# Seconds for a measured queue delay to decay by half when no admissions refresh it
+DELAY_HALF_LIFE = 1.0
+DELAY_SMOOTHING = 0.3
+
+
+class Overloaded(Exception):
+    """A request was shed: 429 when its session is over its limit, 503 otherwise"""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class Ticket:
+    """An admitted request's slot; release() is safe to call more than once"""
+
+    __slots__ = ("controller", "priority", "session", "released")
+
+    def __init__(self, controller: "AdmissionController", priority: str, session: Optional[str]):
+        self.controller = controller
+        self.priority = priority
+        self.session = session
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+# (rank, deadline, sequence, enqueued at, priority, future)
+Waiter = Tuple[int, float, int, float, str, asyncio.Future]
+
+
+class AdmissionController:
+    """Per-worker concurrency limit shared by HTTP routes and WebSocket turns
+
+    All state is touched from the event loop only, so no locks are needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        max_per_session: int = 2,
+        max_queue_delay_ms: Optional[Dict[str, float]] = None,
+    ):
+        budgets = {**DEFAULT_MAX_QUEUE_DELAY_MS, **(max_queue_delay_ms or {})}
+        unknown = set(budgets) - set(PRIORITY_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown priority classes: {', '.join(sorted(unknown))}")
+        if max_concurrent < 1 or max_per_session < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_per_session = max_per_session
+        self.budgets = {name: ms / 1000 for name, ms in budgets.items()}
+        self.in_flight = 0
+        self._sessions: Dict[str, int] = {}
+        self._waiters: List[Waiter] = []
+        self._sequence = itertools.count()
+        self._delays: Dict[str, Tuple[float, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """ADMISSION_MAX_QUEUE_DELAY_MS overrides budgets, e.g. "chat=1000,batch=200" """
+        budgets = {}
+        for item in os.getenv("ADMISSION_MAX_QUEUE_DELAY_MS", "").split(","):
+            if item.strip():
+                name, _, value = item.partition("=")
+                budgets[name.strip()] = float(value)
+        return cls(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "64")),
+            max_per_session=int(os.getenv("ADMISSION_MAX_PER_SESSION", "2")),
+            max_queue_delay_ms=budgets,
+        )
+
+    def queue_delay(self, priority: str, now: Optional[float] = None) -> float:
+        """Seconds a new request of this class can expect to queue
+
+        The larger of the recent measured wait (decaying while nothing is admitted)
+        and the age of the oldest request still waiting at this priority or above.
+        """
+        now = now if now is not None else time.monotonic()
+        rank = PRIORITY_CLASSES[priority]
+        oldest = min((w[3] for w in self._waiters if w[0] <= rank and not w[5].done()), default=now)
+        return max(self._recent_delay(priority, now), now - oldest)
+
+    def _recent_delay(self, priority: str, now: float) -> float:
+        delay, measured_at = self._delays.get(priority, (0.0, now))
+        return delay * 0.5 ** ((now - measured_at) / DELAY_HALF_LIFE)
+
+    def _record_delay(self, priority: str, waited: float, now: float):
+        previous = self._recent_delay(priority, now) if priority in self._delays else waited
+        smoothed = previous + DELAY_SMOOTHING * (waited - previous)
+        self._delays[priority] = (smoothed, now)
+        metrics.observe("admission_queue_delay_ms", waited * 1000, {"priority": priority})
+
+    def _shed(
+        self, priority: str, reason: str, status_code: int, retry_after: float, detail: str
+    ) -> Overloaded:
+        metrics.inc("admission_shed_total", 1, {"priority": priority, "reason": reason})
+        return Overloaded(status_code, retry_after, detail)
+
+    def _hold_session(self, session: Optional[str]):
+        if session is not None:
+            self._sessions[session] = self._sessions.get(session, 0) + 1
+
+    def _drop_session(self, session: Optional[str]):
+        if session is None:
+            return
+        remaining = self._sessions.get(session, 0) - 1
+        if remaining > 0:
+            self._sessions[session] = remaining
+        else:
+            self._sessions.pop(session, None)
+
+    async def acquire(self, priority: str, session: Optional[str] = None) -> Ticket:
+        """Wait for a slot or raise Overloaded; the caller must release the ticket"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        now = time.monotonic()
+        if session is not None and self._sessions.get(session, 0) >= self.max_per_session:
+            raise self._shed(
+                priority,
+                "session",
+                429,
+                self.queue_delay(priority, now),
+                "Too many concurrent requests for this session",
+            )
+
+        if self.in_flight < self.max_concurrent:
+            # Slots pass straight to waiters on release, so a free slot means no queue
+            self.in_flight += 1
+            self._hold_session(session)
+            self._record_delay(priority, 0.0, now)
+            return Ticket(self, priority, session)
+
+        budget = self.budgets[priority]
+        expected = self.queue_delay(priority, now)
+        if expected > budget * SHED_THRESHOLD:
+            raise self._shed(
+                priority, "queue_delay", 503, expected, "Server is busy, please retry shortly"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (
+            PRIORITY_CLASSES[priority],
+            now + budget,
+            next(self._sequence),
+            now,
+            priority,
+            future,
+        )
+        heapq.heappush(self._waiters, waiter)
+        self._hold_session(session)
+        try:
+            await asyncio.wait_for(future, budget)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended; hand the slot on
+                self._release(Ticket(self, priority, session))
+            else:
+                self._drop_session(session)
+            if isinstance(e, asyncio.TimeoutError):
+                ended = time.monotonic()
+                self._record_delay(priority, ended - now, ended)
+                raise self._shed(
+                    priority,
+                    "deadline",
+                    503,
+                    self.queue_delay(priority),
+                    "Server is busy, please retry shortly",
+                )
+            raise
+        return Ticket(self, priority, session)
+
+    def _release(self, ticket: Ticket):
+        self._drop_session(ticket.session)
+        now = time.monotonic()
+        while self._waiters:
+            _, deadline, _, enqueued, priority, future = heapq.heappop(self._waiters)
+            # Waiters past their deadline are about to time out and be shed
+            if future.done() or deadline <= now:
+                continue
+            self._record_delay(priority, now - enqueued, now)
+            future.set_result(None)
+            return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: str, session: Optional[str] = None) -> AsyncIterator[Ticket]:
+        """Hold a slot for the enclosed block"""
+        ticket = await self.acquire(priority, session)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        return {
+            "in_flight": self.in_flight,
+            "queued": sum(1 for w in self._waiters if not w[5].done()),
+            "queue_delay_ms": {
+                name: round(self.queue_delay(name, now) * 1000, 1) for name in PRIORITY_CLASSES
+            },
+        }
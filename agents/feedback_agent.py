@@ -1,19 +1,94 @@
 """
-Feedback Agent placeholder
+Feedback Agent - stores ratings and reports trends from pre-aggregated rollups
+Every rating updates feedback_rollups in the same transaction, so trend reads
+touch one row per day, agent, intent and latency bucket, never raw feedback.
 """
 
 import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import LATENCY_BUCKETS_MS
 
 logger = logging.getLogger(__name__)
 
+LATENCY_BUCKET_ORDER = [f"<{bound}" for bound in LATENCY_BUCKETS_MS] + [
+    f">={LATENCY_BUCKETS_MS[-1]}",
+    "unknown",
+]
+
+
+def summarize_rollups(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold rollup rows into totals: count, average rating, positive rate, mean latency"""
+    count = rating_sum = positive = negative = latency_sum = timed = 0
+    for row in rows:
+        count += row["feedback_count"]
+        rating_sum += row["rating_sum"]
+        positive += row["positive_count"]
+        negative += row["negative_count"]
+        latency_sum += row["response_time_ms_sum"]
+        timed += row["timed_count"]
+    return {
+        "count": count,
+        "avg_rating": round(rating_sum / count, 3) if count else 0,
+        "positive_rate": round(positive / count, 3) if count else 0,
+        "negative_rate": round(negative / count, 3) if count else 0,
+        "avg_response_time_ms": round(latency_sum / timed, 1) if timed else None,
+    }
+
+
 class FeedbackAgent:
     def __init__(self, db_manager):
         self.db = db_manager
-    
-    async def store_feedback(self, conversation_id: str, rating: int, comment: str = None):
-        """Store user feedback"""
-        pass
-    
-    async def analyze_feedback_trends(self):
-        """Analyze feedback trends"""
-        return {"avg_rating": 0, "total_feedback": 0}
\ No newline at end of file
+
+    async def store_feedback(
+        self, conversation_id: str, rating: int, comment: Optional[str] = None
+    ) -> bool:
+        """Store user feedback; False if the conversation does not exist (yet)"""
+        stored = await self.db.store_feedback(conversation_id, rating, comment)
+        if stored is None:
+            logger.info(f"Feedback for unknown conversation {conversation_id}")
+            return False
+        return True
+
+    async def analyze_feedback_trends(self, days: int = 30) -> Dict[str, Any]:
+        """Feedback over the last `days` days, by day, agent, intent and response time"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        rows = await self.db.get_feedback_rollups(since)
+
+        groups: Dict[str, Dict[str, List[Dict]]] = {
+            "day": defaultdict(list),
+            "agent_type": defaultdict(list),
+            "intent": defaultdict(list),
+            "latency_bucket": defaultdict(list),
+        }
+        for row in rows:
+            for dimension, group in groups.items():
+                key = row[dimension]
+                group[key.isoformat() if dimension == "day" else key].append(row)
+
+        overall = summarize_rollups(rows)
+        return {
+            "window_days": days,
+            "since": since.isoformat(),
+            "total_feedback": overall["count"],
+            "avg_rating": overall["avg_rating"],
+            "positive_rate": overall["positive_rate"],
+            "by_day": [
+                {"day": day, **summarize_rollups(group)}
+                for day, group in sorted(groups["day"].items())
+            ],
+            "by_agent": {
+                agent: summarize_rollups(group) for agent, group in groups["agent_type"].items()
+            },
+            "by_intent": {
+                intent or "unknown": summarize_rollups(group)
+                for intent, group in groups["intent"].items()
+            },
+            "by_latency": [
+                {"bucket": bucket, **summarize_rollups(groups["latency_bucket"][bucket])}
+                for bucket in LATENCY_BUCKET_ORDER
+                if bucket in groups["latency_bucket"]
+            ],
+        }
@@ -1,25 +1,229 @@
 """
-Intent Agent placeholder
+Intent Agent - compiled keyword matcher with an optional embedding centroid fallback
 """
 
 import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import IntentType
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Listed in priority order: on equal scores the earlier intent wins
+# Besides the original keywords, only spellings the old substring match already caught
+# ("reschedule", "enrollment") or obvious variants of them are listed
+INTENT_KEYWORDS: Dict[IntentType, Tuple[str, ...]] = {
+    IntentType.SCHEDULING: ("book", "schedule", "appointment", "reschedule"),
+    IntentType.COURSE_INFO: ("course", "program", "curriculum"),
+    IntentType.ENROLLMENT: (
+        "enroll",
+        "enrol",
+        "enrolment",
+        "enrollment",
+        "signup",
+        "sign up",
+        "register",
+        "registration",
+    ),
+}
+
+# Inflected forms that usually mean something else ("Which books should I read?")
+EXCLUDED_FORMS = frozenset({"books"})
+
+INTENT_EXAMPLES: Dict[IntentType, Tuple[str, ...]] = {
+    IntentType.SCHEDULING: (
+        "Can I talk to an advisor tomorrow afternoon?",
+        "I'd like to set up a call with someone",
+        "What times are free next week?",
+        "Is there a slot on Thursday morning?",
+        "Can someone phone me to discuss my options?",
+    ),
+    IntentType.COURSE_INFO: (
+        "What will I learn in the data analytics track?",
+        "How long does the web development class run?",
+        "Which topics are covered?",
+        "Is the cyber security stream taught online?",
+        "What projects will I build?",
+    ),
+    IntentType.ENROLLMENT: (
+        "How do I join the next intake?",
+        "I want to secure my place",
+        "What do I need to get started with admission?",
+        "Where do I submit my application?",
+        "Is there still room in the March cohort?",
+    ),
+    IntentType.GENERAL: (
+        "Hello there",
+        "Thanks for your help",
+        "Who are you?",
+        "How much are the fees?",
+        "Do you offer payment plans or scholarships?",
+        "What jobs do graduates get?",
+    ),
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _inflections(word: str) -> Iterable[str]:
+    """Common English inflections, expanded once at compile time instead of per message"""
+    yield word
+    yield word + "s"
+    yield word + "es"
+    yield word + "ed"
+    yield word + "ing"
+    if word.endswith("e"):
+        yield word[:-1] + "ing"
+        yield word + "d"
+    elif len(word) > 2 and word[-1] not in "aeiouwy" and word[-2] in "aeiou":
+        yield word + word[-1] + "ed"
+        yield word + word[-1] + "ing"
+
+
+class KeywordIntentMatcher:
+    """Token/bigram lookup table producing per-intent scores in one pass"""
+
+    def __init__(self, keywords: Dict[IntentType, Sequence[str]]):
+        self.intents: List[IntentType] = list(keywords)
+        self._table: Dict[str, Tuple[int, ...]] = {}
+
+        table: Dict[str, set] = {}
+        for index, intent in enumerate(self.intents):
+            for keyword in keywords[intent]:
+                words = TOKEN_PATTERN.findall(keyword.lower())
+                if not words:
+                    continue
+                *head, last = words
+                for form in set(_inflections(last)) - (EXCLUDED_FORMS - {last}):
+                    table.setdefault(" ".join(head + [form]), set()).add(index)
+        self._table = {key: tuple(sorted(value)) for key, value in table.items()}
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._table)
+
+    def scores(self, message: str) -> List[int]:
+        """Keyword hit counts per intent, indexed like self.intents"""
+        counts = [0] * len(self.intents)
+        table = self._table
+        previous = None
+        for token in TOKEN_PATTERN.findall(message.lower()):
+            for index in table.get(token, ()):
+                counts[index] += 1
+            if previous is not None:
+                for index in table.get(previous + " " + token, ()):
+                    counts[index] += 1
+            previous = token
+        return counts
+
+    def match(self, message: str) -> Optional[IntentType]:
+        """Highest-scoring intent, or None when no keyword matched"""
+        counts = self.scores(message)
+        best = max(range(len(counts)), key=lambda i: (counts[i], -i)) if counts else None
+        if best is None or counts[best] == 0:
+            return None
+        return self.intents[best]
+
+
+class EmbeddingIntentClassifier:
+    """Nearest-centroid classifier over VectorStore embeddings"""
+
+    def __init__(
+        self,
+        vector_store,
+        examples: Dict[IntentType, Sequence[str]] = INTENT_EXAMPLES,
+        min_similarity: float = 0.7,
+    ):
+        self.vector_store = vector_store
+        self.examples = examples
+        self.min_similarity = min_similarity
+        self.labels: List[IntentType] = []
+        self.centroids: Optional[np.ndarray] = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.centroids is not None
+
+    @staticmethod
+    def _normalise(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    async def fit(self):
+        """Embed the examples (one batched call) and compute one centroid per intent"""
+        labels = list(self.examples)
+        texts = [text for label in labels for text in self.examples[label]]
+        vectors = self._normalise(
+            np.asarray(await self.vector_store.create_embeddings(texts), dtype=np.float32)
+        )
+
+        centroids, offset = [], 0
+        for label in labels:
+            count = len(self.examples[label])
+            centroids.append(vectors[offset : offset + count].mean(axis=0))
+            offset += count
+        self.labels = labels
+        self.centroids = self._normalise(np.vstack(centroids))
+
+    async def classify(self, messages: Sequence[str]) -> List[Optional[IntentType]]:
+        """Label each message, or None where no centroid is similar enough"""
+        if not messages:
+            return []
+        vectors = self._normalise(
+            np.asarray(await self.vector_store.create_embeddings(list(messages)), dtype=np.float32)
+        )
+        scores = vectors @ self.centroids.T
+        best = scores.argmax(axis=1)
+        return [
+            self.labels[b] if scores[i, b] >= self.min_similarity else None
+            for i, b in enumerate(best)
+        ]
+
+
 class IntentAgent:
-    def __init__(self, llm_orchestrator):
+    def __init__(
+        self,
+        llm_orchestrator,
+        vector_store=None,
+        keywords: Optional[Dict[IntentType, Sequence[str]]] = None,
+        embedding_fallback: Optional[bool] = None,
+    ):
         self.llm_orchestrator = llm_orchestrator
-    
+        self.matcher = KeywordIntentMatcher(keywords or INTENT_KEYWORDS)
+        # Opt-in: keyword misses otherwise stay "general" and go to RAG
+        if embedding_fallback is None:
+            embedding_fallback = os.getenv("INTENT_EMBEDDING_FALLBACK", "false").lower() == "true"
+        self.embedding_classifier = None
+        if embedding_fallback and vector_store is not None:
+            self.embedding_classifier = EmbeddingIntentClassifier(
+                vector_store,
+                min_similarity=float(os.getenv("INTENT_EMBEDDING_MIN_SIMILARITY", "0.7")),
+            )
+
+    @traced("agent.intent")
     async def detect_intent(self, message: str) -> str:
         """Detect user intent"""
-        # Simple keyword-based intent detection
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ["book", "schedule", "appointment"]):
-            return "scheduling"
-        elif any(word in message_lower for word in ["course", "program", "curriculum"]):
-            return "course_info"
-        elif any(word in message_lower for word in ["enroll", "signup", "register"]):
-            return "enrollment"
-        else:
-            return "general"
\ No newline at end of file
+        return (await self.detect_intents([message]))[0]
+
+    async def detect_intents(self, messages: Sequence[str]) -> List[str]:
+        """Detect intents for a batch; keyword misses share one embedding call"""
+        intents: List[Optional[IntentType]] = [self.matcher.match(m) for m in messages]
+
+        unmatched = [i for i, intent in enumerate(intents) if intent is None]
+        if unmatched and self.embedding_classifier is not None:
+            try:
+                if not self.embedding_classifier.fitted:
+                    await self.embedding_classifier.fit()
+                labels = await self.embedding_classifier.classify([messages[i] for i in unmatched])
+                for i, label in zip(unmatched, labels):
+                    intents[i] = label
+            except Exception as e:
+                logger.warning(f"Embedding intent fallback failed: {e}")
+
+        return [(intent or IntentType.GENERAL).value for intent in intents]
@@ -1,22 +1,144 @@
 """
-RAG Agent placeholder - implement based on the full version provided
+RAG Agent - retrieval-augmented answers with a semantic answer cache
 """
 
-from typing import Dict, Any
 import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from llm_orchestrator import PLACEHOLDER_RESPONSE, LLMProvider
+from semantic_cache import SemanticCache
+from tracing import span
 
 logger = logging.getLogger(__name__)
 
+
 class RAGAgent:
-    def __init__(self, vector_store, db_manager):
+    def __init__(self, vector_store, db_manager, llm_orchestrator=None):
         self.vector_store = vector_store
         self.db = db_manager
-    
+        self.llm_orchestrator = llm_orchestrator
+        self.top_k = int(os.getenv("RAG_TOP_K", "5"))
+        # "auto" lets the orchestrator pick the fastest healthy provider per request
+        provider = os.getenv("RAG_LLM_PROVIDER", "auto")
+        self.provider = None if provider == "auto" else LLMProvider(provider)
+        self.semantic_cache = SemanticCache(
+            dimension=vector_store.embedding_dimension,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "512")),
+        )
+
     async def handle_request(self, message_data: Dict, user_id: str) -> Dict[str, Any]:
         """Handle RAG requests"""
-        return {
-            "message": "This is a placeholder RAG response. Implement full RAG logic here.",
-            "confidence": 0.8,
-            "sources": [],
-            "metadata": {}
-        }
\ No newline at end of file
+        async for event in self.stream_request(message_data, user_id):
+            if event["type"] == "final":
+                return event["response"]
+
+    async def stream_request(
+        self, message_data: Dict, user_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"type": "token"} events while answering, then one {"type": "final"} event"""
+        with span("agent.rag"):
+            async for event in self._answer(message_data, user_id):
+                yield event
+
+    async def _answer(self, message_data: Dict, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        query = message_data["message"]
+        history = message_data.get("history") or ""
+        query_embedding = await self.vector_store.create_embedding(query)
+        generation = self.vector_store.index_generation
+
+        # Follow-up questions depend on history, so only standalone turns use the cache
+        cached = None if history else self.semantic_cache.lookup(query_embedding, generation)
+        if cached is not None:
+            answer, similarity = cached
+            yield {"type": "token", "content": answer["message"]}
+            yield {
+                "type": "final",
+                "response": {
+                    **answer,
+                    "metadata": {
+                        **answer["metadata"],
+                        "cache": "hit",
+                        "cache_similarity": similarity,
+                    },
+                },
+            }
+            return
+
+        documents = await self.vector_store.search_documents(
+            query, top_k=self.top_k, query_embedding=query_embedding
+        )
+        if not documents:
+            message = "I couldn't find information about that. Could you rephrase your question?"
+            yield {"type": "token", "content": message}
+            yield {
+                "type": "final",
+                "response": {
+                    "message": message,
+                    "confidence": 0.0,
+                    "sources": [],
+                    "metadata": {"cache": "miss", "documents_found": 0},
+                },
+            }
+            return
+
+        parts: List[str] = []
+        async for token in self._stream_answer(query, documents, history):
+            parts.append(token)
+            yield {"type": "token", "content": token}
+
+        answer = {
+            "message": "".join(parts),
+            "confidence": round(float(documents[0]["max_score"]), 4),
+            "sources": self._sources(documents),
+            "metadata": {"documents_found": len(documents)},
+        }
+        if not history and self._cacheable(answer["message"]):
+            self.semantic_cache.store(query_embedding, answer, generation)
+        yield {
+            "type": "final",
+            "response": {**answer, "metadata": {**answer["metadata"], "cache": "miss"}},
+        }
+
+    def _cacheable(self, message: str) -> bool:
+        """Only real LLM answers are cached; fallbacks would outlive a provider coming up"""
+        if self.llm_orchestrator is None or not message.strip():
+            return False
+        return PLACEHOLDER_RESPONSE not in message
+
+    def build_prompt(self, query: str, documents: List[Dict], history: str = "") -> str:
+        """Assemble the grounded prompt sent to the LLM"""
+        context = "\n\n".join(
+            chunk["metadata"].get("content", "")
+            for document in documents
+            for chunk in document["chunks"]
+        )
+        conversation = f"Conversation so far:\n{history}\n\n" if history else ""
+        return (
+            "Answer the question using only the context below. "
+            "If the context does not contain the answer, say so.\n\n"
+            f"Context:\n{context}\n\n{conversation}Question: {query}"
+        )
+
+    async def _stream_answer(
+        self, query: str, documents: List[Dict], history: str = ""
+    ) -> AsyncIterator[str]:
+        if self.llm_orchestrator is None:
+            yield documents[0]["chunks"][0]["metadata"].get("content", "")
+            return
+        async for token in self.llm_orchestrator.stream_request(
+            self.build_prompt(query, documents, history), self.provider
+        ):
+            yield token
+
+    @staticmethod
+    def _sources(documents: List[Dict]) -> List[Dict[str, str]]:
+        return [
+            {
+                "document_id": str(document["document_id"]),
+                "title": str(document["metadata"]["title"]),
+            }
+            for document in documents
+        ]
@@ -1,24 +1,239 @@
 """
-Scheduler Agent placeholder
+Scheduler Agent - consultation booking backed by an in-memory availability index
+Free-slot questions are answered from the index without touching the database; the
+appointments table decides every booking, and the index is rebuilt from it every
+SCHEDULER_REFRESH_SECONDS so other workers' bookings and cancellations show up.
 """
 
-from typing import Dict, Any
+import asyncio
 import logging
+import os
+import re
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from availability import AvailabilityIndex, format_clock
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+TIME_OF_DAY = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b")
+# Period -> (from, until) local time
+PERIODS = {
+    "morning": (dt_time(0), dt_time(12)),
+    "afternoon": (dt_time(12), dt_time.max),
+}
+
+
+def parse_preference(
+    text: str, today: date
+) -> Tuple[Optional[date], Optional[dt_time], Optional[str]]:
+    """(day, time, period) a message asks for, each None when not mentioned
+
+    Understands today/tomorrow, weekday names (the next one, including today), times like
+    "2pm", "2:30 pm" or "14:00", and "morning"/"afternoon".
+    """
+    text = text.lower()
+    day = None
+    if "tomorrow" in text:
+        day = today + timedelta(days=1)
+    elif "today" in text:
+        day = today
+    else:
+        for number, name in enumerate(WEEKDAYS):
+            if re.search(rf"\b{name}\b", text):
+                day = today + timedelta(days=(number - today.weekday()) % 7)
+                break
+
+    at = None
+    match = TIME_OF_DAY.search(text)
+    if match:
+        if match.group(3):
+            hour = int(match.group(1)) % 12 + (12 if match.group(3) == "pm" else 0)
+            minute = int(match.group(2) or 0)
+        else:
+            hour, minute = int(match.group(4)), int(match.group(5))
+        if hour < 24 and minute < 60:
+            at = dt_time(hour, minute)
+
+    period = next((name for name in PERIODS if name in text), None)
+    return day, at, period
+
+
 class SchedulerAgent:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, availability: Optional[AvailabilityIndex] = None):
         self.db = db_manager
-    
-    async def handle_request(self, message_data: Dict, user_id: str) -> Dict[str, Any]:
-        """Handle scheduling requests"""
+        self.availability = availability or AvailabilityIndex.from_env()
+        self.refresh_interval = float(os.getenv("SCHEDULER_REFRESH_SECONDS", "30"))
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def initialize(self):
+        """Load existing bookings into the availability index and keep it fresh"""
+        if self.db is None:
+            return
+        loaded = await self.refresh()
+        logger.info(f"Availability index loaded {loaded} bookings")
+        if self.refresh_interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def refresh(self, today: Optional[date] = None) -> int:
+        """Rebuild the index from the appointments table"""
+        self.availability.roll(today)
+        rows = await self.db.get_booked_appointments(self.availability.window_start)
+        return self.availability.rebuild((row["advisor_id"], row["starts_at"]) for row in rows)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh availability: {e}")
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    def format_slot(self, start: datetime) -> str:
+        local = start.astimezone(self.availability.timezone)
+        return f"{local:%a} {local.day} {local:%b}, {format_clock(local.time())}"
+
+    def _slots(self, slots: List[Tuple[str, datetime]]) -> List[Dict[str, str]]:
+        return [{"advisor_id": advisor, "starts_at": start.isoformat()} for advisor, start in slots]
+
+    def _find_slots(
+        self,
+        now: datetime,
+        day: Optional[date],
+        at: Optional[dt_time],
+        period: Optional[str],
+        limit: int = 3,
+    ) -> List[Tuple[str, datetime]]:
+        """Free slots matching the preference; the earliest ones when there is none"""
+        if day is None and at is None and period is None:
+            return self.availability.next_free(now, limit=limit)
+
+        after = now
+        if day is not None:
+            after = max(now, datetime.combine(day, dt_time(), tzinfo=now.tzinfo))
+        if at is not None:
+            wanted = datetime.combine(after.date(), at, tzinfo=now.tzinfo)
+            if wanted < now:
+                wanted += timedelta(days=1)
+            after = max(after, wanted)
+
+        found: List[Tuple[str, datetime]] = []
+        first = after.date()
+        last = day if day is not None else self.availability.window_end.date()
+        current = first
+        while current <= last and len(found) < limit:
+            for start in self.availability.free_slots(current):
+                if start < after:
+                    continue
+                if period and not PERIODS[period][0] <= start.time() < PERIODS[period][1]:
+                    continue
+                found.extend(self.availability.next_free(start, limit=1))
+                if len(found) >= limit:
+                    break
+            current += timedelta(days=1)
+        return found
+
+    @traced("agent.scheduler")
+    async def handle_request(
+        self, message_data: Dict, user_id: str, now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Offer free consultation times, honouring a day or time the message asks for"""
+        now = now or datetime.now(self.availability.timezone)
+        self.availability.roll(now.date())
+        preference = parse_preference(message_data.get("message", ""), now.date())
+        slots = self._find_slots(now, *preference)
+        note = ""
+        if not slots and any(preference):
+            note = "There are no free times matching that. "
+            slots = self.availability.next_free(now, limit=3)
+        if not slots:
+            return {
+                "message": "Sorry, there are no free consultation times at the moment. "
+                "Please check back soon.",
+                "success": False,
+                "metadata": {"action": "offer_slots", "slots": []},
+            }
+        times = "; ".join(self.format_slot(start) for _, start in slots)
         return {
-            "message": "Scheduling functionality coming soon!",
-            "success": False,
-            "metadata": {"action": "placeholder"}
+            "message": f"{note}The next available consultation times are: {times}. "
+            "Which one suits you?",
+            "success": True,
+            "metadata": {"action": "offer_slots", "slots": self._slots(slots)},
         }
-    
-    async def book_appointment(self, user_id: str, preferred_time: str, phone_number: str, **kwargs):
-        """Book appointment placeholder"""
-        return None
\ No newline at end of file
+
+    async def book_appointment(
+        self,
+        user_id: str,
+        preferred_time: str,
+        phone_number: str,
+        now: Optional[datetime] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Book the preferred slot with any free advisor, or suggest alternatives
+
+        Raises ValueError for an unknown advisor_id, or when preferred_time is not a future
+        slot within business hours and the booking horizon.
+        """
+        advisor_id = kwargs.get("advisor_id")
+        if advisor_id and advisor_id not in self.availability.advisors:
+            raise ValueError(f"Unknown advisor {advisor_id!r}")
+        start = datetime.fromisoformat(preferred_time)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=self.availability.timezone)
+        now = now or datetime.now(self.availability.timezone)
+        self.availability.roll(now.date())
+        self.availability.check_bookable(start, now)
+        advisors = [advisor_id] if advisor_id else self.availability.advisors
+
+        if self.db is None:
+            for advisor in advisors:
+                if self.availability.reserve(advisor, start):
+                    return {
+                        "success": True,
+                        "appointment": {"advisor_id": advisor, "starts_at": start.isoformat()},
+                    }
+        else:
+            # The index may be stale, so it only orders the attempts; the table decides
+            for advisor in sorted(advisors, key=lambda a: not self.availability.is_free(a, start)):
+                try:
+                    appointment = await self.db.create_appointment(
+                        user_id,
+                        advisor,
+                        start,
+                        start + self.availability.slot_length,
+                        phone_number=phone_number,
+                        appointment_type=kwargs.get("appointment_type") or "consultation",
+                        notes=kwargs.get("notes"),
+                    )
+                except asyncpg.UniqueViolationError:
+                    logger.info(f"Slot {start.isoformat()} for {advisor} is already booked")
+                    self.availability.reserve(advisor, start)
+                    continue
+                self.availability.reserve(advisor, start)
+                return {"success": True, "appointment": appointment}
+
+        alternatives = self.availability.next_free(start, advisor=advisor_id, limit=3)
+        return {"success": False, "alternatives": self._slots(alternatives)}
+
+    async def cancel_appointment(self, appointment_id: str) -> bool:
+        """Cancel a booking and return its slot to the index"""
+        cancelled = await self.db.cancel_appointment(appointment_id)
+        if cancelled is None:
+            return False
+        try:
+            self.availability.release(cancelled["advisor_id"], cancelled["starts_at"])
+        except (KeyError, ValueError):
+            pass
+        return True
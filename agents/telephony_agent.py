@@ -1,19 +1,167 @@
 """
-Telephony Agent placeholder
+Telephony Agent - pre-rendered TwiML for inbound calls and a queued outbound dialer
+Inbound templates are compiled once and each rendered variant is cached, so a webhook
+only picks a variant and returns a string. Outbound calls go through a persistent
+queue drained by a rate-limited worker pool, started with the app so saved jobs resume.
 """
 
+import asyncio
 import logging
+import os
+from datetime import datetime
+from datetime import time as dt_time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from jinja2 import Environment
+
+from availability import format_clock, format_days
+from outbound_calls import OutboundCallQueue, OutboundCallWorkerPool, TwilioCallClient
 
 logger = logging.getLogger(__name__)
 
+TWIML_TEMPLATES = {
+    "inbound_open": (
+        '<?xml version="1.0" encoding="UTF-8"?><Response>'
+        '<Say voice="{{ voice }}">{{ greeting }}</Say>'
+        '{% if advisor_number %}<Dial timeout="20">{{ advisor_number }}</Dial>{% endif %}'
+        '<Say voice="{{ voice }}">Please leave a message after the tone.</Say>'
+        '<Record maxLength="120" playBeep="true"/></Response>'
+    ),
+    "inbound_closed": (
+        '<?xml version="1.0" encoding="UTF-8"?><Response>'
+        '<Say voice="{{ voice }}">{{ greeting }} {{ hours_notice }}</Say>'
+        '<Record maxLength="120" playBeep="true"/></Response>'
+    ),
+    "appointment_reminder": (
+        '<?xml version="1.0" encoding="UTF-8"?><Response>'
+        '<Say voice="{{ voice }}">Hi{% if name %} {{ name }}{% endif %}, this is a reminder '
+        "of your consultation on {{ when }}. We look forward to speaking with you.</Say>"
+        "</Response>"
+    ),
+}
+
+
+class TwiMLRenderer:
+    """Jinja templates compiled once; renders are memoised per distinct variable set"""
+
+    def __init__(self, templates: Dict[str, str] = TWIML_TEMPLATES, cache_size: int = 1024):
+        environment = Environment(autoescape=True)
+        self.templates = {
+            name: environment.from_string(source) for name, source in templates.items()
+        }
+        self._render = lru_cache(maxsize=cache_size)(self._render_uncached)
+
+    def _render_uncached(self, template: str, variables: Tuple[Tuple[str, Any], ...]) -> str:
+        return self.templates[template].render(**dict(variables))
+
+    def render(self, template: str, **variables) -> str:
+        """Cached render; only for variables drawn from a small set (no per-call values)"""
+        return self._render(template, tuple(sorted(variables.items())))
+
+    def render_uncached(self, template: str, **variables) -> str:
+        return self.templates[template].render(**variables)
+
+    def cache_info(self):
+        return self._render.cache_info()
+
+
 class TelephonyAgent:
-    def __init__(self):
-        pass
-    
-    async def handle_inbound_call(self, call_sid: str, from_number: str):
-        """Handle inbound calls"""
-        return "<Response><Say>Hello from the bootcamp chatbot!</Say></Response>"
-    
-    async def make_outbound_call(self, to_number: str, appointment_data: dict):
-        """Make outbound call"""
-        return None
\ No newline at end of file
+    def __init__(self, call_client=None, queue: Optional[OutboundCallQueue] = None):
+        self.renderer = TwiMLRenderer()
+        self.voice = os.getenv("TWILIO_VOICE", "Polly.Olivia")
+        self.business_name = os.getenv("BUSINESS_NAME", "Employability Advantage")
+        self.advisor_number = os.getenv("ADVISOR_PHONE_NUMBER", "")
+        self.timezone = ZoneInfo(os.getenv("BUSINESS_TIMEZONE", "Australia/Sydney"))
+        self.opens_at = dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_START", "09:00"))
+        self.closes_at = dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_END", "17:00"))
+        self.working_days = {int(d) for d in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(",")}
+
+        self._call_client = call_client
+        self._queue = queue
+        self._pool: Optional[OutboundCallWorkerPool] = None
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        local = (now or datetime.now(self.timezone)).astimezone(self.timezone)
+        return (
+            local.weekday() in self.working_days and self.opens_at <= local.time() < self.closes_at
+        )
+
+    def hours_notice(self) -> str:
+        return (
+            f"Our advisors are available from {format_clock(self.opens_at)} "
+            f"to {format_clock(self.closes_at)}, {format_days(self.working_days)}. "
+            "Leave a message and we will call you back."
+        )
+
+    async def handle_inbound_call(
+        self, call_sid: str, from_number: str, now: Optional[datetime] = None
+    ) -> str:
+        """Return TwiML for an inbound call; only the open/closed variant varies per call"""
+        greeting = f"Hello, thanks for calling {self.business_name}."
+        if self.is_open(now):
+            return self.renderer.render(
+                "inbound_open",
+                voice=self.voice,
+                greeting=greeting,
+                advisor_number=self.advisor_number,
+            )
+        return self.renderer.render(
+            "inbound_closed",
+            voice=self.voice,
+            greeting=greeting,
+            hours_notice=self.hours_notice(),
+        )
+
+    def _outbound_pool(self) -> OutboundCallWorkerPool:
+        if self._pool is None:
+            if self._queue is None:
+                self._queue = OutboundCallQueue(
+                    os.getenv("OUTBOUND_CALL_DB", "data/outbound_calls.sqlite3"),
+                    lease_seconds=float(os.getenv("OUTBOUND_CALL_LEASE_SECONDS", "300")),
+                )
+            if self._call_client is None:
+                self._call_client = TwilioCallClient(
+                    os.getenv("TWILIO_ACCOUNT_SID"),
+                    os.getenv("TWILIO_AUTH_TOKEN"),
+                    os.getenv("TWILIO_PHONE_NUMBER"),
+                )
+            self._pool = OutboundCallWorkerPool(
+                self._queue,
+                self._call_client,
+                workers=int(os.getenv("OUTBOUND_CALL_WORKERS", "4")),
+                calls_per_second=float(os.getenv("OUTBOUND_CALLS_PER_SECOND", "1")),
+                max_attempts=int(os.getenv("OUTBOUND_CALL_MAX_ATTEMPTS", "3")),
+                backoff_seconds=float(os.getenv("OUTBOUND_CALL_BACKOFF_SECONDS", "30")),
+            )
+            self._pool.start()
+        return self._pool
+
+    def start_outbound(self):
+        """Start the dialer so jobs saved before a restart are resumed"""
+        self._outbound_pool()
+
+    async def make_outbound_call(self, to_number: str, appointment_data: dict) -> str:
+        """Queue an appointment reminder call; returns the job id"""
+        twiml = self.renderer.render_uncached(
+            "appointment_reminder",
+            voice=self.voice,
+            name=appointment_data.get("name", ""),
+            when=appointment_data.get("when", ""),
+        )
+        pool = self._outbound_pool()
+        job_id = await asyncio.to_thread(pool.queue.enqueue, to_number, twiml, appointment_data)
+        pool.notify()
+        return job_id
+
+    def outbound_stats(self) -> Dict[str, int]:
+        if self._pool is None:
+            return {}
+        return self._pool.queue.counts()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool.queue.close()
+            self._pool = None
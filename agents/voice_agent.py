@@ -1,23 +1,385 @@
 """
-Voice Agent placeholder
+Voice Agent - streaming speech-to-text and sentence-by-sentence text-to-speech
+Engines are pluggable (VOICE_STT_ENGINE / VOICE_TTS_ENGINE); the fake engines need no
+audio libraries and are used in tests. Fixed prompts (default_phrases() and anything passed
+to warm_cache) are kept in a content-addressed disk cache so they are never synthesized
+twice; generated answers may contain personal details and are never written to disk.
 """
 
+import asyncio
+import hashlib
+import io
 import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from datetime import time as dt_time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from availability import format_clock, format_days
 
 logger = logging.getLogger(__name__)
 
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def default_phrases() -> Tuple[str, ...]:
+    """Fixed prompts, with the opening hours taken from the business-hours settings"""
+    opens_at = dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_START", "09:00"))
+    closes_at = dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_END", "17:00"))
+    working_days = {int(d) for d in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(",")}
+    place = os.getenv("BUSINESS_TIMEZONE", "Australia/Sydney").rsplit("/", 1)[-1]
+    return (
+        "Hi, thanks for calling. How can I help you today?",
+        f"Our advisors are available {format_days(working_days)}, "
+        f"{format_clock(opens_at)} to {format_clock(closes_at)} {place.replace('_', ' ')} time.",
+        "Sorry, I didn't catch that. Could you say it again?",
+    )
+
+
+class SpeechToText(ABC):
+    """Streaming STT: consume audio frames, yield {"text", "final"} transcripts"""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, frames: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        """An async generator over transcripts of the frames received so far"""
+
+
+class TextToSpeech(ABC):
+    """Synthesize one piece of text to encoded audio"""
+
+    name = "base"
+    media_type = "application/octet-stream"
+
+    @abstractmethod
+    async def synthesize(self, text: str) -> bytes:
+        """Encoded audio for text, in media_type"""
+
+
+class FakeSpeechToText(SpeechToText):
+    """Treats each frame as UTF-8 text; emits a partial transcript per frame"""
+
+    name = "fake"
+
+    async def transcribe(self, frames: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        words: List[str] = []
+        async for frame in frames:
+            words.extend(frame.decode("utf-8", errors="ignore").split())
+            yield {"text": " ".join(words), "final": False}
+        yield {"text": " ".join(words), "final": True}
+
+
+class FakeTextToSpeech(TextToSpeech):
+    """Deterministic bytes per text, with optional synthesis latency"""
+
+    name = "fake"
+    media_type = "audio/x-fake"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def synthesize(self, text: str) -> bytes:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return b"FAKEAUDIO:" + text.encode("utf-8")
+
+
+class RecognizerSpeechToText(SpeechToText):
+    """SpeechRecognition (Google Web Speech) over 16-bit mono PCM frames
+
+    The recognizer is not incremental, so partials re-transcribe the buffer every
+    partial_interval seconds of new audio; the final transcript runs once at the end.
+    """
+
+    name = "google"
+
+    def __init__(
+        self, sample_rate: int = 16000, language: str = "en-AU", partial_interval: float = 1.5
+    ):
+        import speech_recognition as sr
+
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+        self.sample_rate = sample_rate
+        self.language = language
+        self.partial_bytes = int(partial_interval * sample_rate * 2)
+
+    def _recognize(self, pcm: bytes) -> str:
+        audio = self._sr.AudioData(pcm, self.sample_rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except self._sr.UnknownValueError:
+            return ""
+
+    async def transcribe(self, frames: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        buffer = bytearray()
+        next_partial = self.partial_bytes
+        async for frame in frames:
+            buffer.extend(frame)
+            if len(buffer) >= next_partial:
+                next_partial = len(buffer) + self.partial_bytes
+                text = await asyncio.to_thread(self._recognize, bytes(buffer))
+                if text:
+                    yield {"text": text, "final": False}
+        text = await asyncio.to_thread(self._recognize, bytes(buffer)) if buffer else ""
+        yield {"text": text, "final": True}
+
+
+class GTTSTextToSpeech(TextToSpeech):
+    """Google Translate TTS via gTTS, producing MP3"""
+
+    media_type = "audio/mpeg"
+
+    def __init__(self, language: str = "en", tld: str = "com.au"):
+        from gtts import gTTS
+
+        self._gtts = gTTS
+        self.language = language
+        self.tld = tld
+        self.name = f"gtts-{language}-{tld}"
+
+    def _synthesize(self, text: str) -> bytes:
+        buffer = io.BytesIO()
+        self._gtts(text=text, lang=self.language, tld=self.tld).write_to_fp(buffer)
+        return buffer.getvalue()
+
+    async def synthesize(self, text: str) -> bytes:
+        return await asyncio.to_thread(self._synthesize, text)
+
+
+def create_stt(engine: str) -> SpeechToText:
+    if engine == "fake":
+        return FakeSpeechToText()
+    if engine == "google":
+        return RecognizerSpeechToText(sample_rate=int(os.getenv("VOICE_SAMPLE_RATE", "16000")))
+    raise ValueError(f"Unsupported VOICE_STT_ENGINE: {engine}")
+
+
+def create_tts(engine: str) -> TextToSpeech:
+    if engine == "fake":
+        return FakeTextToSpeech()
+    if engine == "gtts":
+        return GTTSTextToSpeech()
+    raise ValueError(f"Unsupported VOICE_TTS_ENGINE: {engine}")
+
+
+class PhraseAudioCache:
+    """Content-addressed audio files: sha256(engine, normalised text) -> bytes on disk
+
+    Only phrases registered with allow() are cached, so free-form answers never are.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._phrases: set = set()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        return " ".join(text.split())
+
+    def key(self, engine: str, text: str) -> str:
+        return hashlib.sha256(f"{engine}\0{self.normalise(text)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def allow(self, phrases: Iterable[str]):
+        self._phrases.update(self.normalise(phrase) for phrase in phrases)
+
+    def cacheable(self, text: str) -> bool:
+        return self.normalise(text) in self._phrases
+
+    def get(self, engine: str, text: str) -> Optional[bytes]:
+        path = self._path(self.key(engine, text))
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(path)
+        return audio
+
+    def put(self, engine: str, text: str, audio: bytes):
+        path = self._path(self.key(engine, text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.enforce_limit()
+
+    def enforce_limit(self):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    stat = os.stat(os.path.join(root, name))
+                    files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def split_sentences(buffer: str) -> Tuple[List[str], str]:
+    """Complete sentences in buffer, plus the unfinished remainder"""
+    parts = SENTENCE_END.split(buffer)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
+
+
 class VoiceAgent:
-    def __init__(self):
-        pass
-    
+    def __init__(
+        self,
+        stt: Optional[SpeechToText] = None,
+        tts: Optional[TextToSpeech] = None,
+        cache: Optional[PhraseAudioCache] = None,
+    ):
+        self.stt = stt or create_stt(os.getenv("VOICE_STT_ENGINE", "google"))
+        self.tts = tts or create_tts(os.getenv("VOICE_TTS_ENGINE", "gtts"))
+        self.cache = cache or PhraseAudioCache(
+            os.getenv("VOICE_CACHE_DIR", "data/voice_cache"),
+            max_bytes=int(os.getenv("VOICE_CACHE_MAX_MB", "256")) * 1024 * 1024,
+        )
+        self.phrases = default_phrases()
+        self.cache.allow(self.phrases)
+        # Engine calls in flight across all streams, and sentences synthesized ahead per stream
+        self._synthesis = asyncio.Semaphore(int(os.getenv("VOICE_TTS_CONCURRENCY", "4")))
+        self.lookahead = int(os.getenv("VOICE_TTS_LOOKAHEAD", "2"))
+        if self.lookahead < 1:
+            # No sentence could ever be synthesized, so the stream would wait forever
+            raise ValueError("VOICE_TTS_LOOKAHEAD must be at least 1")
+
+    @property
+    def media_type(self) -> str:
+        return self.tts.media_type
+
     async def speech_to_text(self, audio_data: bytes) -> str:
-        """Convert speech to text"""
-        return "Speech recognition not implemented yet"
-    
+        """Convert a complete recording to text"""
+
+        async def frames():
+            yield audio_data
+
+        return await self.transcribe_stream(frames())
+
+    async def transcribe_stream(self, frames: AsyncIterator[bytes], on_partial=None) -> str:
+        """Transcribe frames as they arrive; on_partial receives each interim transcript"""
+        final = ""
+        async for transcript in self.stt.transcribe(frames):
+            if transcript["final"]:
+                final = transcript["text"]
+            elif on_partial is not None:
+                await on_partial(transcript["text"])
+        return final
+
     async def text_to_speech(self, text: str) -> bytes:
-        """Convert text to speech"""
-        return b""
-    
-    async def process_voice_conversation(self, audio_input, session_context):
-        """Process voice conversation"""
-        return {"success": False, "message": "Voice processing not implemented"}
\ No newline at end of file
+        """Convert text to speech, from the phrase cache when possible"""
+        cacheable = self.cache.cacheable(text)
+        if cacheable:
+            audio = self.cache.get(self.tts.name, text)
+            if audio is not None:
+                return audio
+        async with self._synthesis:
+            audio = await self.tts.synthesize(text)
+        if cacheable:
+            self.cache.put(self.tts.name, text, audio)
+        return audio
+
+    async def warm_cache(self, phrases: Optional[Iterable[str]] = None):
+        """Register fixed phrases (default_phrases() when None) and pre-synthesize them"""
+        phrases = list(self.phrases if phrases is None else phrases)
+        self.cache.allow(phrases)
+        for phrase in phrases:
+            await self.text_to_speech(phrase)
+
+    async def synthesize_stream(
+        self, tokens: AsyncIterator[str]
+    ) -> AsyncIterator[Tuple[str, bytes]]:
+        """Yield (sentence, audio) in order as soon as each sentence is complete
+
+        Tokens keep being consumed while earlier sentences are synthesized, at most
+        `lookahead` sentences ahead of the one being delivered.
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        ahead = asyncio.Semaphore(self.lookahead)
+
+        async def schedule(sentence: str):
+            await ahead.acquire()
+            pending.put_nowait((sentence, asyncio.create_task(self.text_to_speech(sentence))))
+
+        async def produce():
+            buffer = ""
+            try:
+                async for token in tokens:
+                    buffer += token
+                    sentences, buffer = split_sentences(buffer)
+                    for sentence in sentences:
+                        await schedule(sentence)
+                if buffer.strip():
+                    await schedule(buffer.strip())
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                sentence, synthesis = item
+                audio = await synthesis
+                ahead.release()
+                yield sentence, audio
+            await producer
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+
+    async def process_voice_conversation(
+        self, audio_input: bytes, respond: Callable[[str], Awaitable[str]]
+    ) -> Dict[str, Any]:
+        """One non-streaming turn: transcribe a recording, answer it, synthesize the answer
+
+        respond maps the transcript to the answer text. Streaming clients use
+        /ws/voice/{session_id} instead.
+        """
+        transcript = await self.speech_to_text(audio_input)
+        if not transcript:
+            return {"success": False, "message": "No speech recognized"}
+        response = await respond(transcript)
+
+        async def answer():
+            yield response
+
+        segments = [
+            {"text": sentence, "audio": audio}
+            async for sentence, audio in self.synthesize_stream(answer())
+        ]
+        return {
+            "success": True,
+            "transcript": transcript,
+            "response": response,
+            "media_type": self.media_type,
+            "segments": segments,
+        }
@@ -0,0 +1,282 @@
+"""
+Availability index - per-advisor, per-day free-slot bitmaps for appointment search
+Each working day is one integer whose set bits are free slots, and each advisor keeps a
+sorted list of days that still have a free slot. Finding the next free slot is a
+bisect plus a lowest-set-bit, independent of how many bookings exist.
+
+The index is a per-process view for offering times. Bookings are decided by the
+appointments table, and the index is rebuilt from it periodically so bookings and
+cancellations made by other workers show up.
+"""
+
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+
+def format_clock(value: dt_time) -> str:
+    """12-hour time like "9:00 AM" (strftime's %-I is not portable)"""
+    return f"{value.hour % 12 or 12}:{value.minute:02d} {'AM' if value.hour < 12 else 'PM'}"
+
+
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def format_days(days) -> str:
+    """Weekday numbers (Monday = 0) as "Monday to Friday", "Monday and Thursday" and so on"""
+    days = sorted(days)
+    if len(days) > 2 and days == list(range(days[0], days[-1] + 1)):
+        return f"{DAY_NAMES[days[0]]} to {DAY_NAMES[days[-1]]}"
+    names = [DAY_NAMES[day] for day in days]
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+class AvailabilityIndex:
+    """Free slots for a set of advisors over a rolling booking horizon"""
+
+    def __init__(
+        self,
+        advisors: Iterable[str],
+        opens_at: dt_time,
+        closes_at: dt_time,
+        working_days: Set[int],
+        timezone: ZoneInfo,
+        slot_minutes: int = 30,
+        horizon_days: int = 90,
+        today: Optional[date] = None,
+    ):
+        self.advisors = list(advisors)
+        if not self.advisors:
+            raise ValueError("At least one advisor is required")
+        self.opens_at = opens_at
+        self.working_days = set(working_days)
+        self.timezone = timezone
+        self.slot_minutes = slot_minutes
+        self.horizon_days = horizon_days
+
+        self._open_minute = opens_at.hour * 60 + opens_at.minute
+        day_minutes = closes_at.hour * 60 + closes_at.minute - self._open_minute
+        self.slots_per_day = day_minutes // slot_minutes
+        if self.slots_per_day <= 0:
+            raise ValueError("Business hours must contain at least one slot")
+        self._full_day = (1 << self.slots_per_day) - 1
+
+        # advisor -> day ordinal -> bitmap of free slots (set bit = free)
+        self._days: Dict[str, Dict[int, int]] = {advisor: {} for advisor in self.advisors}
+        # advisor -> sorted day ordinals whose bitmap is non-zero
+        self._open_days: Dict[str, List[int]] = {advisor: [] for advisor in self.advisors}
+        self._first = self._last = (today or datetime.now(timezone).date()).toordinal() - 1
+        self._lock = threading.Lock()
+        self.roll(today)
+
+    @classmethod
+    def from_env(cls, today: Optional[date] = None) -> "AvailabilityIndex":
+        return cls(
+            advisors=os.getenv("SCHEDULER_ADVISORS", "advisor").split(","),
+            opens_at=dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_START", "09:00")),
+            closes_at=dt_time.fromisoformat(os.getenv("BUSINESS_HOURS_END", "17:00")),
+            working_days={int(d) for d in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(",")},
+            timezone=ZoneInfo(os.getenv("BUSINESS_TIMEZONE", "Australia/Sydney")),
+            slot_minutes=int(os.getenv("SCHEDULER_SLOT_MINUTES", "30")),
+            horizon_days=int(os.getenv("SCHEDULER_HORIZON_DAYS", "90")),
+            today=today,
+        )
+
+    @property
+    def slot_length(self) -> timedelta:
+        return timedelta(minutes=self.slot_minutes)
+
+    @property
+    def window_start(self) -> datetime:
+        """Start of the earliest day the index covers"""
+        return datetime.combine(date.fromordinal(self._first), dt_time(), tzinfo=self.timezone)
+
+    @property
+    def window_end(self) -> datetime:
+        """End of the last day within the booking horizon"""
+        return self.window_start + timedelta(days=self.horizon_days)
+
+    def roll(self, today: Optional[date] = None):
+        """Drop past days and open new ones so the horizon starts at today"""
+        first = (today or datetime.now(self.timezone).date()).toordinal()
+        last = first + self.horizon_days - 1
+        with self._lock:
+            for advisor in self.advisors:
+                days, open_days = self._days[advisor], self._open_days[advisor]
+                for ordinal in [o for o in days if o < first]:
+                    del days[ordinal]
+                del open_days[: bisect_left(open_days, first)]
+                for ordinal in range(max(first, self._last + 1), last + 1):
+                    if date.fromordinal(ordinal).weekday() in self.working_days:
+                        days[ordinal] = self._full_day
+                        open_days.append(ordinal)
+            self._first = first
+            self._last = max(self._last, last)
+
+    def slot_of(self, start: datetime) -> Tuple[int, int]:
+        """(day ordinal, slot index) for a slot start; ValueError if it is not one"""
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=self.timezone)
+        local = start.astimezone(self.timezone)
+        minutes = local.hour * 60 + local.minute - self._open_minute
+        if local.second or local.microsecond or minutes % self.slot_minutes:
+            raise ValueError(f"{start.isoformat()} is not on a {self.slot_minutes}-minute slot")
+        index = minutes // self.slot_minutes
+        if not 0 <= index < self.slots_per_day or local.weekday() not in self.working_days:
+            raise ValueError(f"{start.isoformat()} is outside business hours")
+        return local.toordinal(), index
+
+    def check_bookable(self, start: datetime, now: Optional[datetime] = None):
+        """ValueError unless start is a future slot within the booking horizon"""
+        self.slot_of(start)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=self.timezone)
+        if start <= (now or datetime.now(self.timezone)):
+            raise ValueError(f"{start.isoformat()} is in the past")
+        if start >= self.window_end:
+            raise ValueError(f"{start.isoformat()} is more than {self.horizon_days} days ahead")
+
+    def start_of(self, ordinal: int, index: int) -> datetime:
+        opening = datetime.combine(date.fromordinal(ordinal), self.opens_at, tzinfo=self.timezone)
+        return opening + timedelta(minutes=index * self.slot_minutes)
+
+    def is_free(self, advisor: str, start: datetime) -> bool:
+        ordinal, index = self.slot_of(start)
+        return bool(self._days[advisor].get(ordinal, 0) >> index & 1)
+
+    def reserve(self, advisor: str, start: datetime) -> bool:
+        """Atomically check and take a slot; False if it was already taken"""
+        ordinal, index = self.slot_of(start)
+        bit = 1 << index
+        with self._lock:
+            days = self._days[advisor]
+            bits = days.get(ordinal, 0)
+            if not bits & bit:
+                return False
+            days[ordinal] = bits & ~bit
+            if not days[ordinal]:
+                open_days = self._open_days[advisor]
+                del open_days[bisect_left(open_days, ordinal)]
+        return True
+
+    def release(self, advisor: str, start: datetime):
+        """Free a slot again after a cancellation (or a failed booking write)"""
+        ordinal, index = self.slot_of(start)
+        bit = 1 << index
+        with self._lock:
+            days = self._days[advisor]
+            if ordinal not in days or days[ordinal] & bit:
+                return
+            if not days[ordinal]:
+                insort(self._open_days[advisor], ordinal)
+            days[ordinal] |= bit
+
+    def load(self, bookings: Iterable[Tuple[str, datetime]]) -> int:
+        """Mark existing bookings as taken; returns how many fell inside the horizon"""
+        loaded = 0
+        for advisor, start in bookings:
+            try:
+                if advisor in self._days and self.reserve(advisor, start):
+                    loaded += 1
+            except ValueError:
+                logger.warning(f"Ignoring booking for {advisor} at {start}: not a slot")
+        return loaded
+
+    def rebuild(self, bookings: Iterable[Tuple[str, datetime]]) -> int:
+        """Replace every reservation with `bookings` (a fresh read of the database)
+
+        Returns how many fell inside the horizon.
+        """
+        taken: Dict[str, Dict[int, int]] = {advisor: {} for advisor in self.advisors}
+        for advisor, start in bookings:
+            try:
+                ordinal, index = self.slot_of(start)
+            except ValueError:
+                logger.warning(f"Ignoring booking for {advisor} at {start}: not a slot")
+                continue
+            if advisor in taken:
+                taken[advisor][ordinal] = taken[advisor].get(ordinal, 0) | 1 << index
+
+        loaded = 0
+        with self._lock:
+            for advisor in self.advisors:
+                booked = taken[advisor]
+                days = {
+                    ordinal: self._full_day & ~booked.get(ordinal, 0)
+                    for ordinal in self._days[advisor]
+                }
+                loaded += sum(bin(booked[o]).count("1") for o in booked if o in days)
+                self._days[advisor] = days
+                self._open_days[advisor] = sorted(o for o, bits in days.items() if bits)
+        return loaded
+
+    def _next_for(
+        self, advisor: str, ordinal: int, index: int, limit: int
+    ) -> List[Tuple[datetime, str]]:
+        found = []
+        days, open_days = self._days[advisor], self._open_days[advisor]
+        position = bisect_left(open_days, ordinal)
+        while position < len(open_days) and len(found) < limit:
+            day = open_days[position]
+            bits = days[day]
+            if day == ordinal:
+                bits &= ~((1 << index) - 1)
+            while bits and len(found) < limit:
+                lowest = bits & -bits
+                found.append((self.start_of(day, lowest.bit_length() - 1), advisor))
+                bits ^= lowest
+            position += 1
+        return found
+
+    def next_free(
+        self, after: datetime, advisor: Optional[str] = None, limit: int = 1
+    ) -> List[Tuple[str, datetime]]:
+        """The earliest free (advisor, start) pairs starting at or after `after`"""
+        if after.tzinfo is None:
+            after = after.replace(tzinfo=self.timezone)
+        local = after.astimezone(self.timezone)
+        minutes = local.hour * 60 + local.minute - self._open_minute
+        if local.second or local.microsecond:
+            minutes += 1
+        index = max(0, -(-minutes // self.slot_minutes))
+        ordinal = local.toordinal()
+        if index >= self.slots_per_day:
+            ordinal, index = ordinal + 1, 0
+
+        advisors = [advisor] if advisor is not None else self.advisors
+        with self._lock:
+            found = [slot for a in advisors for slot in self._next_for(a, ordinal, index, limit)]
+        return [(a, start) for start, a in sorted(found)[:limit]]
+
+    def free_slots(self, day: date, advisor: Optional[str] = None) -> List[datetime]:
+        """Slot starts on a day when at least one (or the given) advisor is free"""
+        advisors = [advisor] if advisor is not None else self.advisors
+        ordinal = day.toordinal()
+        with self._lock:
+            bits = 0
+            for a in advisors:
+                bits |= self._days[a].get(ordinal, 0)
+        return [self.start_of(ordinal, i) for i in range(self.slots_per_day) if bits >> i & 1]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            booked = sum(
+                self.slots_per_day - bin(bits).count("1")
+                for days in self._days.values()
+                for bits in days.values()
+            )
+            open_days = sum(len(days) for days in self._open_days.values())
+        return {
+            "advisors": len(self.advisors),
+            "days": self._last - self._first + 1,
+            "booked": booked,
+            "open_days": open_days,
+        }
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark for the availability index versus scanning the booking list
+Books a growing number of random slots across several advisors, then times
+"next free slot" queries and check-and-reserve against each approach.
+
+Usage: python -m benchmarks.bench_availability [--advisors N] [--queries N]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+from typing import Dict, List, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from availability import AvailabilityIndex
+
+TIMEZONE = ZoneInfo("Australia/Sydney")
+TODAY = date(2024, 3, 4)
+
+
+def build_index(advisors: List[str]) -> AvailabilityIndex:
+    return AvailabilityIndex(
+        advisors,
+        dt_time(9),
+        dt_time(17),
+        {0, 1, 2, 3, 4},
+        TIMEZONE,
+        slot_minutes=30,
+        horizon_days=365,
+        today=TODAY,
+    )
+
+
+def naive_next_free(
+    bookings: Set[Tuple[str, datetime]],
+    index: AvailabilityIndex,
+    advisors: List[str],
+    after: datetime,
+):
+    """What a query over all appointments amounts to: walk slots, test each against bookings"""
+    for day in range(index.horizon_days):
+        current = TODAY + timedelta(days=day)
+        if current.weekday() not in index.working_days:
+            continue
+        for slot in range(index.slots_per_day):
+            start = index.start_of(current.toordinal(), slot)
+            if start < after:
+                continue
+            for advisor in advisors:
+                if (advisor, start) not in bookings:
+                    return advisor, start
+    return None
+
+
+def per_query_microseconds(query, afters: List[datetime]) -> float:
+    started = time.perf_counter()
+    for after in afters:
+        query(after)
+    return (time.perf_counter() - started) / len(afters) * 1e6
+
+
+def run(advisor_count: int = 5, query_count: int = 2000, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    advisors = [f"advisor-{n}" for n in range(advisor_count)]
+    results = []
+    for booking_count in (0, 1000, 5000, 20000):
+        index = build_index(advisors)
+        # Bookings fill the calendar front to back, as they do in practice
+        slots = [
+            (a, index.start_of(o, s))
+            for o in sorted(index._days[advisors[0]])
+            for s in range(index.slots_per_day)
+            for a in advisors
+        ]
+        bookings = set(slots[:booking_count])
+        index.load(bookings)
+
+        horizon = timedelta(days=7)
+        afters = [
+            datetime.combine(TODAY, dt_time(9), TIMEZONE) + rng.random() * horizon
+            for _ in range(query_count)
+        ]
+        afters = [after.replace(second=0, microsecond=0) for after in afters]
+
+        indexed = per_query_microseconds(lambda after: index.next_free(after), afters)
+        naive = per_query_microseconds(
+            lambda after: naive_next_free(bookings, index, advisors, after), afters[:200]
+        )
+
+        candidates = [slots[rng.randrange(len(slots))] for _ in range(query_count)]
+        started = time.perf_counter()
+        for advisor, start in candidates:
+            if index.reserve(advisor, start):
+                index.release(advisor, start)
+        reserve = (time.perf_counter() - started) / query_count * 1e6
+
+        results.append(
+            {
+                "advisors": advisor_count,
+                "bookings": len(bookings),
+                "index_next_free_us": round(indexed, 2),
+                "scan_next_free_us": round(naive, 2),
+                "index_reserve_us": round(reserve, 2),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--advisors", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.advisors, args.queries), indent=2))
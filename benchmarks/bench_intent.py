@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for the compiled keyword intent matcher
+Reports per-message cost as the keyword vocabulary grows.
+
+Usage: python -m benchmarks.bench_intent [--messages N]
+"""
+
+import argparse
+import json
+import random
+import string
+import time
+from typing import Dict, List
+
+from agents.intent_agent import INTENT_KEYWORDS, KeywordIntentMatcher
+
+SAMPLE_MESSAGES = [
+    "Can I book an appointment with an advisor on Tuesday?",
+    "What does the data analytics course curriculum cover?",
+    "How do I enroll in the next intake of the program?",
+    "I left my notebook at the campus, who do I contact?",
+    "What are the fees and is there a payment plan available?",
+]
+
+
+def synthetic_keywords(extra_per_intent: int, seed: int = 7) -> Dict:
+    """The shipped vocabulary plus random filler keywords per intent"""
+    rng = random.Random(seed)
+    keywords = {}
+    for intent, words in INTENT_KEYWORDS.items():
+        filler = [
+            "".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(extra_per_intent)
+        ]
+        keywords[intent] = tuple(words) + tuple(filler)
+    return keywords
+
+
+def per_message_microseconds(matcher: KeywordIntentMatcher, messages: List[str]) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        matcher.match(message)
+    return (time.perf_counter() - started) / len(messages) * 1e6
+
+
+def run(message_count: int = 20000) -> List[Dict]:
+    messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] for i in range(message_count)]
+    results = []
+    for extra in (0, 100, 1000, 10000):
+        matcher = KeywordIntentMatcher(synthetic_keywords(extra))
+        per_message_microseconds(matcher, messages[:1000])  # warm-up
+        results.append(
+            {
+                "vocabulary_size": matcher.vocabulary_size,
+                "us_per_message": round(per_message_microseconds(matcher, messages), 3),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages), indent=2))
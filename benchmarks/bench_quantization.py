@@ -0,0 +1,97 @@
+"""
+Recall / memory / latency tradeoff of quantized vector storage on a synthetic corpus
+Compares the exact float32 index with int8 and binary codes at several rerank depths.
+
+Usage: python -m benchmarks.bench_quantization [--vectors N] [--dimension D] [--queries N]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from quantized_index import QuantizedVectorIndex
+from vector_index import LocalVectorIndex
+
+RERANK_DEPTHS = {"int8": (20, 50, 100), "binary": (50, 100, 200, 400)}
+
+
+def synthetic_corpus(
+    count: int, dimension: int, latent: int = 64, clusters: int = 256, seed: int = 7
+) -> np.ndarray:
+    """Clustered unit vectors on a low-dimensional subspace, like real sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, latent)).astype(np.float32)
+    points = centres[rng.integers(0, clusters, count)]
+    points += 0.5 * rng.standard_normal((count, latent)).astype(np.float32)
+    projection = rng.standard_normal((latent, dimension)).astype(np.float32)
+    vectors = points @ projection
+    noise = rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors += 0.1 * np.abs(vectors).mean() * noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(index, queries: np.ndarray, truth: List[set], top_k: int) -> Dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = index.search(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {chunk_id for chunk_id, _, _ in results})
+    return {
+        f"recall@{top_k}": round(hits / (len(queries) * top_k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def run(
+    count: int = 20000, dimension: int = 1024, query_count: int = 200, top_k: int = 10
+) -> List[Dict]:
+    vectors = synthetic_corpus(count, dimension)
+    ids = [f"c{i}" for i in range(count)]
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.integers(0, count, query_count)]
+    queries = queries + 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    exact = LocalVectorIndex(dimension=dimension, initial_capacity=count)
+    exact.upsert(ids, vectors)
+    truth = [{chunk_id for chunk_id, _, _ in exact.search(q, top_k)} for q in queries]
+    results = [
+        {
+            "storage": "float32",
+            "rerank_candidates": None,
+            "resident_mb": round(exact.vectors.nbytes / 2**20, 2),
+            **measure(exact, queries, truth, top_k),
+        }
+    ]
+
+    with tempfile.TemporaryDirectory() as path:
+        exact.save(path)
+        for quantization, depths in RERANK_DEPTHS.items():
+            # Loading encodes the saved float rows; they stay on disk, memory-mapped
+            index = QuantizedVectorIndex.load(path, dimension, quantization)
+            for depth in depths:
+                index.rerank_candidates = depth
+                results.append(
+                    {
+                        "storage": quantization,
+                        "rerank_candidates": depth,
+                        "resident_mb": round(index.resident_bytes / 2**20, 2),
+                        **measure(index, queries, truth, top_k),
+                    }
+                )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.vectors, args.dimension, args.queries, args.top_k), indent=2))
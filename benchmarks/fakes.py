@@ -0,0 +1,248 @@
+"""
+In-process stand-ins for Neon/asyncpg, Upstash, Mixbread, Twilio and the LLM providers
+Each fake takes a FaultInjector so benchmarks can add latency and error rates.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from llm_orchestrator import LLMProvider, ProviderClient
+
+
+@dataclass
+class FaultInjector:
+    """Adds latency (mean +/- jitter, in ms) and random failures to a fake call"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self.calls = 0
+        self.failures = 0
+
+    async def __call__(self, name: str = "fake"):
+        self.calls += 1
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self._random.random() < self.error_rate:
+            self.failures += 1
+            raise ConnectionError(f"Injected {name} failure")
+
+
+class FakeConnection:
+    """The subset of asyncpg.Connection that DatabaseManager uses"""
+
+    def __init__(self, pool: "FakePool"):
+        self.pool = pool
+
+    async def execute(self, query: str, *args) -> str:
+        await self.pool.faults("postgres")
+        return "OK"
+
+    async def fetchrow(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        await self.pool.faults("postgres")
+        normalised = " ".join(query.split()).upper()
+        if normalised.startswith("INSERT INTO USERS"):
+            session_id = args[0]
+            user = self.pool.users.get(session_id)
+            if user is None:
+                user = self.pool.users[session_id] = {
+                    "id": uuid.uuid4(),
+                    "session_id": session_id,
+                    "metadata": args[4],
+                }
+            return user
+        if normalised.startswith("SELECT * FROM USERS WHERE SESSION_ID"):
+            return self.pool.users.get(args[0])
+        return None
+
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        await self.pool.faults("postgres")
+        return []
+
+    async def fetchval(self, query: str, *args):
+        await self.pool.faults("postgres")
+        return None
+
+    async def copy_records_to_table(self, table: str, records, columns):
+        await self.pool.faults("postgres")
+        self.pool.tables.setdefault(table, []).extend(records)
+
+
+class FakePool:
+    """asyncpg pool stand-in with a bounded number of connections"""
+
+    def __init__(self, faults: Optional[FaultInjector] = None, max_size: int = 20):
+        self.faults = faults or FaultInjector()
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, List] = {}
+        self._slots = asyncio.Semaphore(max_size)
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._slots:
+            yield FakeConnection(self)
+
+    async def close(self):
+        pass
+
+
+def fake_create_pool(faults: Optional[FaultInjector] = None):
+    """Drop-in replacement for asyncpg.create_pool"""
+
+    async def create_pool(dsn=None, min_size=5, max_size=20, **kwargs):
+        return FakePool(faults, max_size=max_size)
+
+    return create_pool
+
+
+def fake_embedding(text: str, dimension: int = 1024) -> List[float]:
+    """Deterministic pseudo-embedding: same text, same vector"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeMixbread:
+    """httpx handler for POST /embeddings"""
+
+    def __init__(self, faults: Optional[FaultInjector] = None, dimension: int = 1024):
+        self.faults = faults or FaultInjector()
+        self.dimension = dimension
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        try:
+            await self.faults("mixbread")
+        except ConnectionError:
+            return httpx.Response(503, json={"error": "unavailable"})
+        texts = json.loads(request.content)["input"]
+        return httpx.Response(
+            200,
+            json={
+                "data": [
+                    {"index": i, "embedding": fake_embedding(text, self.dimension)}
+                    for i, text in enumerate(texts)
+                ]
+            },
+        )
+
+
+class FakeUpstash:
+    """httpx handler for Upstash Vector /upsert, /query and /delete"""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.metadata: Dict[str, Dict] = {}
+
+    def seed(self, documents: int = 50, chunks_per_document: int = 4, dimension: int = 1024):
+        """Populate a synthetic course catalogue"""
+        for d in range(documents):
+            for c in range(chunks_per_document):
+                content = f"Course {d} module {c}: fees, schedule and curriculum details."
+                chunk_id = f"course-{d}#{c}"
+                self.vectors[chunk_id] = np.asarray(fake_embedding(content, dimension))
+                self.metadata[chunk_id] = {
+                    "document_id": f"course-{d}",
+                    "title": f"Course {d}",
+                    "content": content,
+                }
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        try:
+            await self.faults("upstash")
+        except ConnectionError:
+            return httpx.Response(503, json={"error": "unavailable"})
+
+        body = json.loads(request.content)
+        path = request.url.path.rstrip("/")
+        if path.endswith("/upsert"):
+            for item in body:
+                self.vectors[item["id"]] = np.asarray(item["vector"], dtype=np.float32)
+                self.metadata[item["id"]] = item.get("metadata", {})
+            return httpx.Response(200, json={"result": "Success"})
+        if path.endswith("/delete"):
+            for chunk_id in body:
+                self.vectors.pop(chunk_id, None)
+                self.metadata.pop(chunk_id, None)
+            return httpx.Response(200, json={"result": {"deleted": len(body)}})
+        if path.endswith("/query"):
+            if not self.vectors:
+                return httpx.Response(200, json={"result": []})
+            ids = list(self.vectors)
+            scores = np.vstack([self.vectors[i] for i in ids]) @ np.asarray(body["vector"])
+            top = np.argsort(-scores)[: body.get("topK", 10)]
+            return httpx.Response(
+                200,
+                json={
+                    "result": [
+                        {"id": ids[i], "score": float(scores[i]), "metadata": self.metadata[ids[i]]}
+                        for i in top
+                    ]
+                },
+            )
+        return httpx.Response(404)
+
+
+class FakeLLMProvider(ProviderClient):
+    """Streams a canned answer token by token with injected latency"""
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        faults: Optional[FaultInjector] = None,
+        tokens: int = 40,
+        token_interval_ms: float = 0.0,
+    ):
+        super().__init__(provider, "fake-key", "fake-model", "http://fake.invalid")
+        self.faults = faults or FaultInjector()
+        self.tokens = tokens
+        self.token_interval_ms = token_interval_ms
+
+    async def stream(self, message: str, **kwargs):
+        await self.faults(self.provider.value)
+        for i in range(self.tokens):
+            if self.token_interval_ms:
+                await asyncio.sleep(self.token_interval_ms / 1000)
+            yield f"token{i} "
+
+
+class FakeTwilioClient:
+    """Records outbound calls instead of dialing; failures come from the FaultInjector"""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+        self.calls: List[Dict[str, Any]] = []
+
+    async def create_call(self, to_number: str, twiml: str) -> str:
+        await self.faults("twilio")
+        call_sid = f"CA{uuid.uuid4().hex}"
+        self.calls.append(
+            {
+                "sid": call_sid,
+                "to": to_number,
+                "twiml": twiml,
+                "at": asyncio.get_running_loop().time(),
+            }
+        )
+        return call_sid
+
+
+def mock_client(handler, base_url: str) -> httpx.AsyncClient:
+    """AsyncClient that routes every request to an in-process handler"""
+    return httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(handler))
@@ -0,0 +1,304 @@
+"""
+Connection Hub - WebSocket registry with bounded send queues and cross-worker fan-out
+Every connection gets its own outbound queue and sender task, so one slow client never
+blocks the chat loop or other clients. Messages for a session connected to another
+worker travel over a pub/sub broker (Redis in production, in-memory in tests).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Set, Union
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, Dict[str, Any]], None]
+
+# RFC 6455 close codes
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class InMemoryBroker:
+    """Process-local broker; hubs sharing one instance behave like separate workers"""
+
+    def __init__(self):
+        self._subscribers: Set[Deliver] = set()
+
+    async def subscribe(self, deliver: Deliver):
+        self._subscribers.add(deliver)
+
+    async def unsubscribe(self, deliver: Deliver):
+        self._subscribers.discard(deliver)
+
+    async def publish(self, session_id: str, message: Dict[str, Any]):
+        payload = json.dumps(message)
+        for deliver in list(self._subscribers):
+            deliver(session_id, json.loads(payload))
+
+    async def close(self):
+        self._subscribers.clear()
+
+
+class RedisBroker:
+    """Redis pub/sub broker; each worker pattern-subscribes once for all sessions"""
+
+    def __init__(self, url: str, channel_prefix: str = "ws:session:"):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.channel_prefix = channel_prefix
+        self._listeners: Dict[Deliver, asyncio.Task] = {}
+
+    async def subscribe(self, deliver: Deliver):
+        pubsub = self.redis.pubsub()
+        await pubsub.psubscribe(self.channel_prefix + "*")
+        self._listeners[deliver] = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def unsubscribe(self, deliver: Deliver):
+        task = self._listeners.pop(deliver, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _listen(self, pubsub, deliver: Deliver):
+        try:
+            while True:
+                try:
+                    async for item in pubsub.listen():
+                        if item["type"] != "pmessage":
+                            continue
+                        channel = item["channel"]
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        deliver(channel[len(self.channel_prefix) :], json.loads(item["data"]))
+                    logger.warning("Redis pub/sub stream ended, resubscribing")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Redis pub/sub listener failed, resubscribing: {e}")
+                await self._resubscribe(pubsub)
+        finally:
+            await pubsub.close()
+
+    async def _resubscribe(self, pubsub, max_delay: float = 30.0):
+        """Retry the subscription with exponential backoff until Redis is back"""
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await pubsub.psubscribe(self.channel_prefix + "*")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = min(delay * 2, max_delay)
+                logger.warning(f"Redis resubscribe failed, retrying in {delay:.0f}s: {e}")
+
+    async def publish(self, session_id: str, message: Dict[str, Any]):
+        await self.redis.publish(self.channel_prefix + session_id, json.dumps(message))
+
+    async def close(self):
+        for deliver in list(self._listeners):
+            await self.unsubscribe(deliver)
+        await self.redis.close()
+
+
+class Connection:
+    """One accepted WebSocket plus its bounded outbound queue"""
+
+    def __init__(self, hub: "ConnectionHub", websocket: WebSocket, session_id: str):
+        self.hub = hub
+        self.websocket = websocket
+        self.session_id = session_id
+        self.id = uuid.uuid4().hex
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=hub.queue_size)
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self.close_code: Optional[int] = None
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def send(self, message: Union[Dict[str, Any], bytes]) -> bool:
+        """Queue a JSON message (or binary frame) without waiting; a full queue evicts"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.hub.slow_evictions += 1
+            logger.warning(f"Evicting slow WebSocket client for session {self.session_id}")
+            self.hub.spawn(self.close(CLOSE_TRY_AGAIN_LATER, "Client too slow"))
+            return False
+
+    async def _send_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                if isinstance(message, bytes):
+                    sending = self.websocket.send_bytes(message)
+                else:
+                    sending = self.websocket.send_json(message)
+                await asyncio.wait_for(sending, timeout=self.hub.send_timeout)
+                self.hub.messages_sent += 1
+            except asyncio.TimeoutError:
+                self.hub.slow_evictions += 1
+                self.hub.spawn(self.close(CLOSE_TRY_AGAIN_LATER, "Send timed out"))
+                return
+            except Exception:
+                self.hub.spawn(self.close(CLOSE_GOING_AWAY))
+                return
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        self.hub.unregister(self)
+        if self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+class ConnectionHub:
+    """Registry of local WebSocket connections keyed by session id"""
+
+    def __init__(
+        self,
+        broker=None,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        self.broker = broker
+        self.queue_size = queue_size or int(os.getenv("WS_QUEUE_SIZE", "256"))
+        self.send_timeout = send_timeout or float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+        self.heartbeat_interval = heartbeat_interval or float(
+            os.getenv("WS_HEARTBEAT_SECONDS", "30")
+        )
+        self.idle_timeout = idle_timeout or float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "300"))
+
+        self.sessions: Dict[str, Dict[str, Connection]] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        # Background closes are referenced here so they are not garbage-collected mid-run
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.messages_sent = 0
+        self.slow_evictions = 0
+        self.idle_evictions = 0
+        self.published = 0
+
+    @classmethod
+    def from_env(cls) -> "ConnectionHub":
+        """Use Redis when REDIS_URL is set, otherwise stay process-local"""
+        redis_url = os.getenv("REDIS_URL")
+        return cls(broker=RedisBroker(redis_url) if redis_url else None)
+
+    async def start(self):
+        if self.broker is not None:
+            await self.broker.subscribe(self._deliver)
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+        for connection in [c for conns in self.sessions.values() for c in conns.values()]:
+            await connection.close(CLOSE_GOING_AWAY, "Server shutting down")
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.broker is not None:
+            await self.broker.unsubscribe(self._deliver)
+            await self.broker.close()
+
+    def spawn(self, coroutine) -> asyncio.Task:
+        """Run a coroutine in the background, holding a reference until it finishes"""
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def register(self, websocket: WebSocket, session_id: str) -> Connection:
+        """Track an accepted WebSocket; several tabs may share one session"""
+        connection = Connection(self, websocket, session_id)
+        self.sessions.setdefault(session_id, {})[connection.id] = connection
+        return connection
+
+    def unregister(self, connection: Connection):
+        connections = self.sessions.get(connection.session_id)
+        if connections is None:
+            return
+        connections.pop(connection.id, None)
+        if not connections:
+            del self.sessions[connection.session_id]
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.sessions.values())
+
+    def send_local(
+        self, session_id: str, message: Dict[str, Any], exclude: Optional[str] = None
+    ) -> int:
+        """Queue a message to this worker's connections for a session; returns how many"""
+        return sum(
+            connection.send(message)
+            for connection in list(self.sessions.get(session_id, {}).values())
+            if connection.id != exclude
+        )
+
+    async def publish(
+        self, session_id: str, message: Dict[str, Any], exclude: Optional[str] = None
+    ):
+        """Deliver to a session wherever it is connected, skipping connection id `exclude`"""
+        self.published += 1
+        if self.broker is None:
+            self.send_local(session_id, message, exclude)
+        else:
+            await self.broker.publish(session_id, {"message": message, "exclude": exclude})
+
+    def _deliver(self, session_id: str, envelope: Dict[str, Any]):
+        if session_id in self.sessions:
+            self.send_local(session_id, envelope["message"], envelope.get("exclude"))
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.reap()
+
+    def reap(self):
+        """Close idle connections and send a heartbeat to the rest"""
+        now = time.monotonic()
+        for connections in list(self.sessions.values()):
+            for connection in list(connections.values()):
+                if now - connection.last_seen > self.idle_timeout:
+                    self.idle_evictions += 1
+                    self.spawn(connection.close(CLOSE_NORMAL, "Idle timeout"))
+                else:
+                    connection.send({"type": "ping"})
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self.sessions),
+            "connections": self.connection_count,
+            "messages_sent": self.messages_sent,
+            "published": self.published,
+            "slow_evictions": self.slow_evictions,
+            "idle_evictions": self.idle_evictions,
+        }
@@ -0,0 +1,198 @@
+"""
+Conversation Context Manager - recent turns plus a rolling summary, within a token budget
+Each session keeps its last few turns verbatim; older turns are folded into a summary
+incrementally. Context is cached in memory and persisted in conversation_context, so
+building a prompt costs at most one database read per turn. Saves are compare-and-swap
+on a version column; a worker whose cached copy is stale reloads and reapplies its turn.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from llm_orchestrator import PLACEHOLDER_RESPONSE
+from monitoring import metrics
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) without a tokenizer dependency"""
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = "end") -> str:
+    """Cut text to roughly max_tokens at a word boundary, keeping its start or end"""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    if keep == "end":
+        cut = text[-limit:]
+        return cut[cut.find(" ") + 1 :] if " " in cut else cut
+    cut = text[:limit]
+    return cut[: cut.rfind(" ")] if " " in cut else cut
+
+
+@dataclass
+class ConversationContext:
+    session_id: str
+    summary: str = ""
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    summarized_turns: int = 0
+    version: int = 0
+
+    @classmethod
+    def from_record(cls, session_id: str, record: Optional[Dict]) -> "ConversationContext":
+        if not record:
+            return cls(session_id)
+        return cls(
+            session_id,
+            summary=record.get("summary") or "",
+            turns=list(record.get("recent_turns") or []),
+            summarized_turns=record.get("summarized_turns") or 0,
+            version=record.get("version") or 0,
+        )
+
+
+class ContextManager:
+    """Builds token-budgeted conversation history for prompts"""
+
+    def __init__(self, db_manager, llm_orchestrator=None):
+        self.db = db_manager
+        self.llm_orchestrator = llm_orchestrator
+        self.max_turns = int(os.getenv("CONTEXT_MAX_TURNS", "6"))
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.summary_tokens = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+        self.save_attempts = int(os.getenv("CONTEXT_SAVE_ATTEMPTS", "3"))
+        self.cache = TTLCache(
+            max_entries=int(os.getenv("CONTEXT_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "1800")),
+        )
+        # session_id -> [lock, holders + waiters], so turns for a session apply in order
+        self._locks: Dict[str, list] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    async def get(self, session_id: str) -> ConversationContext:
+        """Cached context, or one database read on a cache miss"""
+        found, context = self.cache.get(session_id)
+        if found and context is not None:
+            return context
+        try:
+            record = await self.db.get_conversation_context(session_id)
+        except Exception as e:
+            logger.warning(f"Failed to load context for {session_id}: {e}")
+            record = None
+        context = ConversationContext.from_record(session_id, record)
+        self.cache.set(session_id, context)
+        return context
+
+    async def build_history(self, session_id: str) -> str:
+        """Summary plus the newest turns that fit within the token budget"""
+        context = await self.get(session_id)
+        summary = truncate_tokens(context.summary, self.summary_tokens)
+        remaining = self.token_budget - estimate_tokens(summary)
+
+        lines: List[str] = []
+        for turn in reversed(context.turns):
+            rendered = f"User: {turn['user']}\nAssistant: {turn['assistant']}"
+            cost = estimate_tokens(rendered)
+            if cost > remaining:
+                break
+            lines.append(rendered)
+            remaining -= cost
+        lines.reverse()
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        parts.extend(lines)
+        metrics.observe(
+            "context_history_tokens",
+            self.token_budget - remaining,
+            buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000),
+        )
+        return "\n".join(parts)
+
+    def record_turn(self, session_id: str, user_message: str, assistant_message: str):
+        """Append a turn in the background; turns for one session are applied in order"""
+        task = asyncio.create_task(self.append_turn(session_id, user_message, assistant_message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def append_turn(self, session_id: str, user_message: str, assistant_message: str):
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                for _ in range(self.save_attempts):
+                    if await self._apply_turn(session_id, user_message, assistant_message):
+                        return
+                    # Another worker saved since this copy was loaded; reload and reapply
+                    metrics.inc("context_save_conflicts")
+                    self.cache.invalidate(session_id)
+                logger.warning(
+                    f"Dropped a turn for {session_id} after {self.save_attempts} conflicting saves"
+                )
+        except Exception as e:
+            logger.warning(f"Failed to update context for {session_id}: {e}")
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    async def _apply_turn(self, session_id: str, user_message: str, assistant_message: str) -> bool:
+        """Append one turn and save it if nobody else has; False on a version conflict"""
+        context = await self.get(session_id)
+        turns = context.turns + [{"user": user_message, "assistant": assistant_message}]
+        summary, summarized = context.summary, context.summarized_turns
+
+        overflow = len(turns) - self.max_turns
+        if overflow > 0:
+            # Until the summary is ready, readers see the folded turns verbatim
+            self.cache.set(
+                session_id,
+                ConversationContext(session_id, summary, turns, summarized, context.version),
+            )
+            folded, turns = turns[:overflow], turns[overflow:]
+            summary = await self.summarize(summary, folded)
+            summarized += len(folded)
+
+        version = await self.db.save_conversation_context(
+            session_id, summary, turns, summarized, context.version
+        )
+        if version is None:
+            return False
+        self.cache.set(
+            session_id, ConversationContext(session_id, summary, turns, summarized, version)
+        )
+        return True
+
+    async def summarize(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        """Fold turns into the running summary; only the new turns are sent to the LLM"""
+        transcript = "\n".join(f"User: {t['user']}\nAssistant: {t['assistant']}" for t in turns)
+        if self.llm_orchestrator is not None:
+            prompt = (
+                f"Update the running summary of a conversation with a prospective student. "
+                f"Keep names, courses, dates and decisions; stay under "
+                f"{self.summary_tokens * 3 // 4} words.\n\n"
+                f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+            )
+            try:
+                result = await self.llm_orchestrator.route_request(prompt)
+                content = (result or {}).get("content", "").strip()
+                if content and content != PLACEHOLDER_RESPONSE:
+                    return truncate_tokens(content, self.summary_tokens)
+            except Exception as e:
+                logger.warning(f"LLM summary failed, falling back to extractive: {e}")
+
+        # Extractive fallback: keep the user's side of the newest folded turns
+        questions = " ".join(t["user"] for t in turns)
+        return truncate_tokens(f"{summary} {questions}".strip(), self.summary_tokens)
+
+    async def close(self):
+        """Wait for queued context updates to be persisted"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
@@ -3,26 +3,84 @@ Database manager for Neon Postgres
 Handles connections, schemas, and database operations
 """
 
-import asyncpg
+import asyncio
 import json
+import logging
+import os
+import time
 import uuid
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-import os
-import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from monitoring import metrics
+from tracing import span
+from ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+CONVERSATION_COLUMNS = (
+    "id",
+    "user_id",
+    "session_id",
+    "message",
+    "response",
+    "agent_type",
+    "intent",
+    "confidence_score",
+    "response_time_ms",
+    "created_at",
+    "metadata",
+)
+
+# Errors where Postgres rejected the rows themselves; retrying the same batch cannot succeed
+REJECTED_RECORD_ERRORS = (
+    asyncpg.exceptions.DataError,
+    asyncpg.exceptions.IntegrityConstraintViolationError,
+)
+
+# Upper bounds (ms) of the response-time buckets feedback is rolled up by
+LATENCY_BUCKETS_MS = (500, 1000, 2000, 5000)
+
+
+def latency_bucket(response_time_ms: Optional[int]) -> str:
+    if response_time_ms is None:
+        return "unknown"
+    for bound in LATENCY_BUCKETS_MS:
+        if response_time_ms < bound:
+            return f"<{bound}"
+    return f">={LATENCY_BUCKETS_MS[-1]}"
+
+
 class DatabaseManager:
     """Manages Neon Postgres database connections and operations"""
-    
+
     def __init__(self):
         self.pool = None
         self.database_url = os.getenv("NEON_DATABASE_URL")
         if not self.database_url:
             raise ValueError("NEON_DATABASE_URL environment variable is required")
-    
+
+        # session_id -> user row, in front of users lookups
+        self.user_cache = TTLCache(
+            max_entries=int(os.getenv("USER_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "300")),
+            negative_ttl_seconds=float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "30")),
+        )
+
+        # Write-behind buffer for conversation logging
+        self.conversation_buffer_size = int(os.getenv("CONVERSATION_BUFFER_SIZE", "1000"))
+        self.conversation_flush_batch = int(os.getenv("CONVERSATION_FLUSH_BATCH", "200"))
+        self.conversation_flush_interval = (
+            float(os.getenv("CONVERSATION_FLUSH_INTERVAL_MS", "250")) / 1000
+        )
+        self._conversation_queue: Optional[asyncio.Queue] = None
+        self._conversation_writer: Optional[asyncio.Task] = None
+        self._closing = False
+        self.conversation_stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0}
+
     async def initialize(self):
         """Initialize the database connection pool and create tables"""
         try:
@@ -32,37 +90,56 @@ class DatabaseManager:
                 min_size=5,
                 max_size=20,
                 command_timeout=60,
-                server_settings={
-                    'application_name': 'bootcamp_chatbot',
-                    'timezone': 'UTC'
-                }
+                server_settings={"application_name": "bootcamp_chatbot", "timezone": "UTC"},
             )
-            
+
             logger.info("Database connection pool created successfully")
             await self.create_tables()
             logger.info("Database tables verified/created")
-            
+            self.start_conversation_writer()
+
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
-    
+
+    async def close(self):
+        """Drain buffered conversation records, then close the pool"""
+        self._closing = True
+        if self._conversation_writer is not None:
+            await self._conversation_writer
+            self._conversation_writer = None
+            logger.info(f"Conversation writer drained: {self.conversation_stats}")
+        if self.pool:
+            await self.pool.close()
+
     @asynccontextmanager
     async def get_connection(self):
         """Get a database connection from the pool"""
         if not self.pool:
             raise RuntimeError("Database not initialized. Call initialize() first.")
-        
-        async with self.pool.acquire() as connection:
-            yield connection
-    
+
+        requested = time.perf_counter()
+        with span("db.connection"):
+            async with self.pool.acquire() as connection:
+                acquired = time.perf_counter()
+                metrics.observe("db_pool_wait_ms", (acquired - requested) * 1000)
+                try:
+                    yield connection
+                finally:
+                    metrics.inc("db_operations_total")
+                    metrics.observe(
+                        "db_connection_hold_ms", (time.perf_counter() - acquired) * 1000
+                    )
+
     async def create_tables(self):
         """Create all required database tables"""
         async with self.get_connection() as conn:
             # Enable UUID extension
             await conn.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
-            
+
             # Users table
-            await conn.execute("""
+            await conn.execute(
+                """
                 CREATE TABLE IF NOT EXISTS users (
                     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
                     session_id VARCHAR(255) UNIQUE NOT NULL,
@@ -74,10 +151,12 @@ class DatabaseManager:
                     metadata JSONB DEFAULT '{}'::jsonb,
                     preferences JSONB DEFAULT '{}'::jsonb
                 );
-            """)
-            
+            """
+            )
+
             # Conversations table
-            await conn.execute("""
+            await conn.execute(
+                """
                 CREATE TABLE IF NOT EXISTS conversations (
                     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
                     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
@@ -91,34 +170,413 @@ class DatabaseManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     metadata JSONB DEFAULT '{}'::jsonb
                 );
-            """)
-            
+            """
+            )
+
+            # Per-session rolling summary and recent turns for prompt context
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation_context (
+                    session_id VARCHAR(255) PRIMARY KEY,
+                    summary TEXT NOT NULL DEFAULT '',
+                    recent_turns JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    summarized_turns INTEGER NOT NULL DEFAULT 0,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """
+            )
+            await conn.execute(
+                "ALTER TABLE conversation_context "
+                "ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"
+            )
+
+            # Appointments; the partial unique index is the cross-worker double-booking guard
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS appointments (
+                    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+                    advisor_id VARCHAR(100) NOT NULL,
+                    starts_at TIMESTAMPTZ NOT NULL,
+                    ends_at TIMESTAMPTZ NOT NULL,
+                    phone_number VARCHAR(20),
+                    appointment_type VARCHAR(100) DEFAULT 'consultation',
+                    notes TEXT,
+                    status VARCHAR(20) NOT NULL DEFAULT 'booked',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """
+            )
+            await conn.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS appointments_advisor_slot
+                ON appointments (advisor_id, starts_at) WHERE status = 'booked';
+            """
+            )
+
+            # One rating per conversation; re-rating replaces it
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS feedback (
+                    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                    conversation_id UUID UNIQUE NOT NULL
+                        REFERENCES conversations(id) ON DELETE CASCADE,
+                    rating SMALLINT NOT NULL,
+                    comment TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """
+            )
+
+            # Running totals per conversation day, agent, intent and latency bucket,
+            # maintained in the same transaction as each feedback write
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS feedback_rollups (
+                    day DATE NOT NULL,
+                    agent_type VARCHAR(100) NOT NULL,
+                    intent VARCHAR(100) NOT NULL,
+                    latency_bucket VARCHAR(20) NOT NULL,
+                    feedback_count INTEGER NOT NULL DEFAULT 0,
+                    rating_sum INTEGER NOT NULL DEFAULT 0,
+                    positive_count INTEGER NOT NULL DEFAULT 0,
+                    negative_count INTEGER NOT NULL DEFAULT 0,
+                    response_time_ms_sum BIGINT NOT NULL DEFAULT 0,
+                    timed_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, agent_type, intent, latency_bucket)
+                );
+            """
+            )
+
             logger.info("All database tables created successfully")
-    
+
+    async def get_user(self, session_id: str) -> Optional[Dict]:
+        """Get a user by session, caching both found and missing sessions"""
+        found, user = self.user_cache.get(session_id)
+        if found:
+            return user
+
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow("SELECT * FROM users WHERE session_id = $1", session_id)
+
+        if row is None:
+            self.user_cache.set_negative(session_id)
+            return None
+        user = dict(row)
+        self.user_cache.set(session_id, user)
+        return user
+
     async def get_or_create_user(self, session_id: str, user_data: Optional[Dict] = None) -> Dict:
         """Get existing user or create new one"""
+        found, user = self.user_cache.get(session_id)
+        if found and user is not None:
+            return user
+
+        # Single atomic round trip; concurrent first requests for a session cannot race
+        user_metadata = user_data or {}
         async with self.get_connection() as conn:
-            # Try to get existing user
-            user = await conn.fetchrow(
-                "SELECT * FROM users WHERE session_id = $1", session_id
-            )
-            
-            if user:
-                return dict(user)
-            
-            # Create new user
-            user_metadata = user_data or {}
-            user_id = await conn.fetchval("""
+            row = await conn.fetchrow(
+                """
                 INSERT INTO users (session_id, phone_number, email, name, metadata)
                 VALUES ($1, $2, $3, $4, $5)
-                RETURNING id
-            """, 
+                ON CONFLICT (session_id) DO UPDATE SET last_active = CURRENT_TIMESTAMP
+                RETURNING *
+            """,
+                session_id,
+                user_metadata.get("phone"),
+                user_metadata.get("email"),
+                user_metadata.get("name"),
+                json.dumps(user_metadata),
+            )
+
+        user = dict(row)
+        self.user_cache.set(session_id, user)
+        return user
+
+    async def get_conversation_context(self, session_id: str) -> Optional[Dict]:
+        """Summary, recent turns and version for a session, or None"""
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT summary, recent_turns, summarized_turns, version FROM conversation_context "
+                "WHERE session_id = $1",
+                session_id,
+            )
+        if row is None:
+            return None
+        context = dict(row)
+        if isinstance(context["recent_turns"], str):
+            context["recent_turns"] = json.loads(context["recent_turns"])
+        return context
+
+    async def save_conversation_context(
+        self,
+        session_id: str,
+        summary: str,
+        recent_turns: List[Dict],
+        summarized_turns: int,
+        expected_version: int = 0,
+    ) -> Optional[int]:
+        """
+        Compare-and-swap a session's summary and recent turns.
+        Writes only if the stored version is still expected_version (0 = no row yet)
+        and returns the new version, or None if another worker saved in between.
+        """
+        async with self.get_connection() as conn:
+            return await conn.fetchval(
+                """
+                INSERT INTO conversation_context
+                    (session_id, summary, recent_turns, summarized_turns, version, updated_at)
+                VALUES ($1, $2, $3, $4, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    summary = EXCLUDED.summary,
+                    recent_turns = EXCLUDED.recent_turns,
+                    summarized_turns = EXCLUDED.summarized_turns,
+                    version = conversation_context.version + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE conversation_context.version = $5
+                RETURNING version
+            """,
+                session_id,
+                summary,
+                json.dumps(recent_turns),
+                summarized_turns,
+                expected_version,
+            )
+
+    async def create_appointment(
+        self,
+        user_id: Optional[str],
+        advisor_id: str,
+        starts_at: datetime,
+        ends_at: datetime,
+        phone_number: Optional[str] = None,
+        appointment_type: str = "consultation",
+        notes: Optional[str] = None,
+    ) -> Dict:
+        """Insert a booking; raises asyncpg.UniqueViolationError if the slot is taken"""
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                INSERT INTO appointments
+                    (user_id, advisor_id, starts_at, ends_at, phone_number, appointment_type, notes)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                RETURNING *
+            """,
+                uuid.UUID(str(user_id)) if user_id else None,
+                advisor_id,
+                starts_at,
+                ends_at,
+                phone_number,
+                appointment_type,
+                notes,
+            )
+        return dict(row)
+
+    async def get_booked_appointments(self, since: datetime) -> List[Dict]:
+        """Advisor and start time of every booking from `since` on"""
+        async with self.get_connection() as conn:
+            rows = await conn.fetch(
+                "SELECT advisor_id, starts_at FROM appointments "
+                "WHERE status = 'booked' AND starts_at >= $1",
+                since,
+            )
+        return [dict(row) for row in rows]
+
+    async def cancel_appointment(self, appointment_id: str) -> Optional[Dict]:
+        """Mark a booking cancelled; returns its advisor and start, or None if not booked"""
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow(
+                "UPDATE appointments SET status = 'cancelled' "
+                "WHERE id = $1 AND status = 'booked' RETURNING advisor_id, starts_at",
+                uuid.UUID(str(appointment_id)),
+            )
+        return dict(row) if row is not None else None
+
+    async def store_feedback(
+        self, conversation_id: str, rating: int, comment: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Upsert a conversation's rating and apply the change to feedback_rollups
+
+        Returns the rolled-up dimensions, or None if the conversation is unknown
+        (including one still waiting in the write-behind buffer).
+        """
+        conversation_id = uuid.UUID(str(conversation_id))
+        async with self.get_connection() as conn:
+            async with conn.transaction():
+                conversation = await conn.fetchrow(
+                    "SELECT agent_type, intent, response_time_ms, created_at "
+                    "FROM conversations WHERE id = $1",
+                    conversation_id,
+                )
+                if conversation is None:
+                    return None
+
+                inserted = await conn.fetchval(
+                    """
+                    INSERT INTO feedback (conversation_id, rating, comment)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (conversation_id) DO NOTHING
+                    RETURNING id
+                """,
+                    conversation_id,
+                    rating,
+                    comment,
+                )
+                previous = None
+                if inserted is None:
+                    # Row lock serializes concurrent re-ratings of one conversation
+                    previous = await conn.fetchval(
+                        "SELECT rating FROM feedback WHERE conversation_id = $1 FOR UPDATE",
+                        conversation_id,
+                    )
+                    await conn.execute(
+                        "UPDATE feedback SET rating = $2, comment = $3, "
+                        "updated_at = CURRENT_TIMESTAMP WHERE conversation_id = $1",
+                        conversation_id,
+                        rating,
+                        comment,
+                    )
+
+                response_time_ms = conversation["response_time_ms"]
+                is_new = previous is None
+                timed = is_new and response_time_ms is not None
+                dimensions = {
+                    "day": conversation["created_at"].date(),
+                    "agent_type": conversation["agent_type"],
+                    "intent": conversation["intent"] or "",
+                    "latency_bucket": latency_bucket(response_time_ms),
+                }
+                await conn.execute(
+                    """
+                    INSERT INTO feedback_rollups AS r
+                        (day, agent_type, intent, latency_bucket, feedback_count, rating_sum,
+                         positive_count, negative_count, response_time_ms_sum, timed_count)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                    ON CONFLICT (day, agent_type, intent, latency_bucket) DO UPDATE SET
+                        feedback_count = r.feedback_count + EXCLUDED.feedback_count,
+                        rating_sum = r.rating_sum + EXCLUDED.rating_sum,
+                        positive_count = r.positive_count + EXCLUDED.positive_count,
+                        negative_count = r.negative_count + EXCLUDED.negative_count,
+                        response_time_ms_sum = r.response_time_ms_sum
+                            + EXCLUDED.response_time_ms_sum,
+                        timed_count = r.timed_count + EXCLUDED.timed_count
+                """,
+                    *dimensions.values(),
+                    int(is_new),
+                    rating - (previous or 0),
+                    int(rating > 0) - int(previous is not None and previous > 0),
+                    int(rating < 0) - int(previous is not None and previous < 0),
+                    response_time_ms if timed else 0,
+                    int(timed),
+                )
+        return dimensions
+
+    async def get_feedback_rollups(self, since: date, until: Optional[date] = None) -> List[Dict]:
+        """Pre-aggregated feedback rows for days in [since, until)"""
+        query = "SELECT * FROM feedback_rollups WHERE day >= $1"
+        args: List[Any] = [since]
+        if until is not None:
+            query += " AND day < $2"
+            args.append(until)
+        async with self.get_connection() as conn:
+            rows = await conn.fetch(query + " ORDER BY day", *args)
+        return [dict(row) for row in rows]
+
+    def start_conversation_writer(self):
+        """Start the background task that flushes buffered conversation records"""
+        self._closing = False
+        self._conversation_queue = asyncio.Queue(maxsize=self.conversation_buffer_size)
+        self._conversation_writer = asyncio.create_task(self._conversation_flush_loop())
+
+    async def log_conversation(
+        self,
+        session_id: str,
+        message: str,
+        response: str,
+        agent_type: str,
+        user_id: Optional[str] = None,
+        intent: Optional[str] = None,
+        confidence_score: Optional[float] = None,
+        response_time_ms: Optional[int] = None,
+        metadata: Optional[Dict] = None,
+    ) -> str:
+        """Queue a conversation turn for bulk insert; waits while the buffer is full"""
+        if self._conversation_queue is None or self._closing:
+            raise RuntimeError("Conversation writer is not running")
+
+        conversation_id = uuid.uuid4()
+        await self._conversation_queue.put(
+            (
+                conversation_id,
+                uuid.UUID(str(user_id)) if user_id else None,
                 session_id,
-                user_metadata.get('phone'),
-                user_metadata.get('email'),
-                user_metadata.get('name'),
-                json.dumps(user_metadata)
-            )
-            
-            new_user = await conn.fetchrow("SELECT * FROM users WHERE id = $1", user_id)
-            return dict(new_user)
\ No newline at end of file
+                message,
+                response,
+                agent_type,
+                intent,
+                confidence_score,
+                response_time_ms,
+                datetime.utcnow(),
+                json.dumps(metadata or {}),
+            )
+        )
+        self.conversation_stats["queued"] += 1
+        return str(conversation_id)
+
+    async def _conversation_flush_loop(self):
+        queue = self._conversation_queue
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._closing and queue.empty():
+                return
+            try:
+                batch = [await asyncio.wait_for(queue.get(), self.conversation_flush_interval)]
+            except asyncio.TimeoutError:
+                continue
+
+            deadline = loop.time() + self.conversation_flush_interval
+            while len(batch) < self.conversation_flush_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0 or self._closing:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write_conversations(batch)
+
+    async def _write_conversations(self, records: List[tuple], attempts: int = 3):
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self.get_connection() as conn:
+                    await conn.copy_records_to_table(
+                        "conversations", records=records, columns=CONVERSATION_COLUMNS
+                    )
+                self.conversation_stats["written"] += len(records)
+                self.conversation_stats["batches"] += 1
+                return
+            except REJECTED_RECORD_ERRORS as e:
+                # COPY is all-or-nothing: bisect so only the offending rows are lost
+                if len(records) == 1:
+                    self.conversation_stats["dropped"] += 1
+                    logger.error(f"Dropped conversation record {records[0][0]}: {e}")
+                    return
+                middle = len(records) // 2
+                await self._write_conversations(records[:middle], attempts)
+                await self._write_conversations(records[middle:], attempts)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Conversation flush of {len(records)} failed (attempt {attempt}): {e}"
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(0.1 * 2**attempt)
+
+        self.conversation_stats["dropped"] += len(records)
+        logger.error(f"Dropped {len(records)} conversation records after {attempts} attempts")
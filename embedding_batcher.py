@@ -0,0 +1,111 @@
+"""
+Micro-batching coalescer for concurrent embedding requests
+Gathers single-text calls for up to N items or T milliseconds and sends one request
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from monitoring import Histogram, metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embed() calls into batched embed_batch() calls"""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set = set()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.requests_sent = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its vector from the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush_now)
+
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            waited_ms = (started - queued_at) * 1000
+            self.queue_wait_ms.observe(waited_ms)
+            metrics.observe("embedding_queue_wait_ms", waited_ms, buckets=QUEUE_WAIT_BUCKETS_MS)
+
+        # Identical texts in one batch share a single input slot
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self.batch_sizes.observe(len(unique_texts))
+        metrics.observe("embedding_batch_size", len(unique_texts), buckets=BATCH_SIZE_BUCKETS)
+        self.requests_sent += 1
+
+        try:
+            vectors = await self.embed_batch(unique_texts)
+            if len(vectors) != len(unique_texts):
+                raise Exception(
+                    f"Embedding batch returned {len(vectors)} vectors for {len(unique_texts)} inputs"
+                )
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(unique_texts)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    async def close(self):
+        """Flush queued texts and wait for in-flight batches"""
+        if self._pending:
+            self._flush_now()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        """Batch-size and queue-wait histograms; /metrics exports the same as histograms"""
+        return {
+            "requests_sent": self.requests_sent,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
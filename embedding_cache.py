@@ -0,0 +1,176 @@
+"""
+Two-tier embedding cache: bounded in-memory LRU backed by a SQLite file
+Keys are a SHA-256 of the embedding model and input text. Entries are float32 arrays in
+both tiers; disk reads and batched writes run off the event loop, and a failed write only
+costs a future cache miss.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds new entries wait so that concurrent puts share one disk transaction
+FLUSH_DELAY = 0.05
+
+
+class EmbeddingCache:
+    """LRU memory tier in front of a persistent on-disk tier"""
+
+    def __init__(self, max_entries: int = 10000, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+        # A second connection so batch writes in a worker thread never share the reader
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._pending: Dict[str, bytes] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            self._writer = sqlite3.connect(disk_path, check_same_thread=False, timeout=5.0)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Hash model and text into a fixed-size cache key"""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    async def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Return a cached float32 embedding, promoting disk hits into memory"""
+        key = self.make_key(model, text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+            blob = self._pending.get(key)
+
+        if blob is None and self._db is not None:
+            blob = await asyncio.to_thread(self._read, key)
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+                return None
+            embedding = np.frombuffer(blob, dtype=np.float32)
+            self._remember(key, embedding)
+            self.disk_hits += 1
+            return embedding
+
+    def _read(self, key: str) -> Optional[bytes]:
+        with self._read_lock:
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+                return None
+        return row[0] if row is not None else None
+
+    def put(self, model: str, text: str, embedding: Sequence[float]) -> np.ndarray:
+        """Store an embedding in memory now and queue it for the disk tier
+
+        Returns the float32 array that was cached.
+        """
+        key = self.make_key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self._writer is None:
+                return vector
+            self._pending[key] = vector.tobytes()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the event loop, so writing inline blocks nothing
+            self.flush()
+            return vector
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_soon())
+        return vector
+
+    async def _flush_soon(self):
+        await asyncio.sleep(FLUSH_DELAY)
+        await asyncio.to_thread(self.flush)
+
+    def flush(self):
+        """Write queued entries in one transaction; failures are logged and dropped"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._write_lock:
+            if self._writer is None:
+                return
+            try:
+                with self._writer:
+                    self._writer.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        pending.items(),
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write of {len(pending)} entries failed: {e}")
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters for monitoring"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Write queued entries and close the on-disk tier"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._read_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
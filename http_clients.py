@@ -0,0 +1,422 @@
+"""
+Outbound HTTP - shared connection pools, deadlines, retries and circuit breakers
+Every upstream service gets a ServiceClient over one pooled httpx client per host, so
+TLS connections are reused across the vector store, embeddings and LLM vendors. Calls
+inherit the inbound request's remaining budget, retry with jittered backoff while a
+retry budget allows, and fail fast while a vendor's circuit breaker is open.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt; anything else is returned to the caller as-is
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+POOL_WAIT_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The inbound request's budget ran out before an outbound call could finish"""
+
+
+class CircuitOpenError(RuntimeError):
+    """An upstream is failing; calls are refused until its breaker half-opens"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuit open for {upstream}; retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Bound outbound calls in the enclosed block; never extends an outer deadline"""
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(outer, at))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each HTTP request a REQUEST_BUDGET_SECONDS deadline"""
+
+    def __init__(self, app, budget: Optional[float] = None):
+        self.app = app
+        self.budget = (
+            budget if budget is not None else float(os.getenv("REQUEST_BUDGET_SECONDS", "30"))
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.budget):
+            await self.app(scope, receive, send)
+
+
+class RetryBudget:
+    """Caps retries at a share of traffic so retries cannot amplify an outage
+
+    Every first attempt earns `ratio` tokens and every retry spends one.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after reset_timeout one probe may pass"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            # A failed probe re-opens for another full timeout
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def abandon(self):
+        """A call ended without an outcome; let the next caller probe instead"""
+        self._probing = False
+
+
+class ServiceClient:
+    """One upstream service: base URL, auth headers, timeout, retries and a breaker
+
+    request/post mirror httpx.AsyncClient, returning the response for the caller to
+    check; transport errors and exhausted retries raise.
+    """
+
+    def __init__(
+        self,
+        pool: "HTTPClientPool",
+        name: str,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff: float = 0.1,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.pool = pool
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+
+    def _check(self) -> float:
+        """Timeout for the next attempt, after the deadline and breaker allow it"""
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            metrics.inc("http_client_deadline_exceeded_total", 1, {"upstream": self.name})
+            raise DeadlineExceeded(f"No budget left for {self.name}")
+        if not self.breaker.allow():
+            metrics.inc("http_client_short_circuits_total", 1, {"upstream": self.name})
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+        return self.timeout if remaining is None else min(self.timeout, remaining)
+
+    def _record(self, started: float, outcome: str):
+        labels = {"upstream": self.name}
+        metrics.observe(
+            "http_client_request_duration_ms", (time.perf_counter() - started) * 1000, labels
+        )
+        metrics.inc("http_client_requests_total", 1, {**labels, "outcome": outcome})
+
+    def _tracer(self, started: float):
+        """httpcore trace hook recording pool wait and whether a connection was reused"""
+        seen = {"first": False}
+
+        async def trace(event: str, info: Dict[str, Any]):
+            if seen["first"] or not event.endswith(".started"):
+                return
+            seen["first"] = True
+            labels = {"upstream": self.name}
+            # The first event after the pool hands out a connection is either a new
+            # TCP connect or request headers on an existing one
+            metrics.observe(
+                "http_client_pool_wait_ms",
+                (time.perf_counter() - started) * 1000,
+                labels,
+                buckets=POOL_WAIT_BUCKETS_MS,
+            )
+            reused = "false" if event.startswith("connection.") else "true"
+            metrics.inc("http_client_connections_total", 1, {**labels, "reused": reused})
+
+        return trace
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, stretched to honour Retry-After"""
+        delay = random.uniform(0, self.backoff * 2**attempt)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("Retry-After", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        client = self.pool.client_for(self.base_url)
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            timeout = self._check()
+            started = time.perf_counter()
+            error: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            try:
+                response = await asyncio.wait_for(
+                    client.request(
+                        method,
+                        self.base_url + path,
+                        headers=headers,
+                        timeout=timeout,
+                        extensions={"trace": self._tracer(started)},
+                        **kwargs,
+                    ),
+                    timeout,
+                )
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                error = e
+                self.breaker.record_failure()
+                self._record(started, "error")
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            else:
+                self._record(started, str(response.status_code))
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+
+            delay = self._delay(attempt, response)
+            remaining = remaining_budget()
+            if (
+                attempt >= self.max_retries
+                or (remaining is not None and delay >= remaining)
+                or not self.retry_budget.withdraw()
+            ):
+                if error is not None:
+                    raise error
+                return response
+            metrics.inc("http_client_retries_total", 1, {"upstream": self.name})
+            logger.info(
+                f"Retrying {self.name} {method} {path} in {delay:.2f}s "
+                f"({error or response.status_code})"
+            )
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streamed response; never retried, since a started body cannot be replayed
+
+        The deadline caps each connect/read wait rather than the whole stream.
+        """
+        client = self.pool.client_for(self.base_url)
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        timeout = self._check()
+        started = time.perf_counter()
+        try:
+            async with client.stream(
+                method,
+                self.base_url + path,
+                headers=headers,
+                timeout=timeout,
+                extensions={"trace": self._tracer(started)},
+                **kwargs,
+            ) as response:
+                self._record(started, str(response.status_code))
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                yield response
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            self._record(started, "error")
+            raise
+        finally:
+            self.breaker.abandon()
+
+
+class HTTPClientPool:
+    """One pooled httpx.AsyncClient per upstream host, shared by every ServiceClient"""
+
+    def __init__(
+        self,
+        http2: Optional[bool] = None,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if http2 is None:
+            http2 = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._services: Dict[str, ServiceClient] = {}
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientPool":
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "20")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        )
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._clients[origin] = httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, transport=self.transport
+            )
+        return client
+
+    def service(
+        self,
+        name: str,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+        **options,
+    ) -> ServiceClient:
+        """The ServiceClient registered under name, created on first use
+
+        options (max_retries, backoff, breaker, retry_budget) apply on creation only.
+        """
+        service = self._services.get(name)
+        if service is None:
+            service = self._services[name] = ServiceClient(
+                self, name, base_url, headers, timeout, **options
+            )
+        return service
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "base_url": service.base_url,
+                "circuit": service.breaker.state,
+                "retry_tokens": round(service.retry_budget.tokens, 2),
+            }
+            for name, service in self._services.items()
+        }
+
+    async def close(self):
+        clients, self._clients = list(self._clients.values()), {}
+        self._services = {}
+        for client in clients:
+            await client.aclose()
+
+
+_shared: Optional[HTTPClientPool] = None
+
+
+def shared_pool() -> HTTPClientPool:
+    """The process-wide pool, configured from the environment on first use"""
+    global _shared
+    if _shared is None:
+        _shared = HTTPClientPool.from_env()
+    return _shared
+
+
+async def close_shared_pool():
+    global _shared
+    if _shared is not None:
+        await _shared.close()
+        _shared = None
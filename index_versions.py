@@ -0,0 +1,265 @@
+"""
+Versioned, memory-mapped index files shared by every worker process
+An index directory holds immutable versions under versions/ and a CURRENT file naming
+the live one. Saving builds a complete version in a private directory, then swaps
+CURRENT with os.replace, so readers never open a half-written version. Arrays, ids and
+metadata are memory-mapped read-only: workers share the same page-cache pages instead of
+each holding a copy, and an index only copies its data into RAM when it is modified.
+Indexes that must change together are written as parts (subdirectories) of one version.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+LOCK_FILE = ".lock"
+HEADER_FILE = "header.json"
+KEEP_VERSIONS = 3
+# Superseded versions stay at least this long, so a reader that resolved one just before
+# a newer version was published can still open it
+PRUNE_GRACE_SECONDS = 60.0
+
+
+def current_version(root: str) -> Optional[str]:
+    """Name of the live version under root, or None for a flat or missing directory"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve(root: str) -> str:
+    """Directory holding the live files: the CURRENT version, else root itself"""
+    version = current_version(root)
+    return os.path.join(root, VERSIONS_DIR, version) if version else root
+
+
+def _fsync_directory(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(
+    root: str,
+    write: Callable[[str], None],
+    keep: int = KEEP_VERSIONS,
+    grace: float = PRUNE_GRACE_SECONDS,
+) -> str:
+    """Build a version with write(directory), make it current, return its directory"""
+    versions = os.path.join(root, VERSIONS_DIR)
+    os.makedirs(versions, exist_ok=True)
+    version = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(versions, f".{version}.tmp")
+    directory = os.path.join(versions, version)
+    os.makedirs(staging)
+    try:
+        write(staging)
+        for parent, subdirectories, names in os.walk(staging):
+            for name in names:
+                with open(os.path.join(parent, name), "rb") as f:
+                    os.fsync(f.fileno())
+            if subdirectories:
+                _fsync_directory(parent)
+        os.rename(staging, directory)
+        _fsync_directory(versions)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Serialise pointer swaps between workers saving at the same time
+    with open(os.path.join(root, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        pointer = os.path.join(root, CURRENT_FILE + ".tmp")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(root, CURRENT_FILE))
+        _fsync_directory(root)
+        _prune(versions, version, keep, grace)
+    return directory
+
+
+def _created_ns(version: str) -> int:
+    try:
+        return int(version.split("-", 1)[0])
+    except ValueError:
+        return 0
+
+
+def _prune(versions: str, current: str, keep: int, grace: float):
+    """Delete all but the newest `keep` versions, once superseded for `grace` seconds
+
+    Workers still mapping a deleted version keep reading it: on POSIX the pages stay
+    valid until the last mapping is closed. Only resolving and then opening needs the
+    files to exist, which the grace period covers.
+    """
+    finished = sorted(name for name in os.listdir(versions) if not name.startswith("."))
+    cutoff = time.time_ns() - int(grace * 1e9)
+    for name, successor in zip(finished[:-keep], finished[1:]):
+        if name != current and _created_ns(successor) <= cutoff:
+            shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+
+
+def write_header(directory: str, header: Dict[str, Any]):
+    with open(os.path.join(directory, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump(header, f)
+
+
+def read_header(directory: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(directory, HEADER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _open(directory: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(directory, name), mmap_mode="r")
+
+
+class MappedStrings(Sequence):
+    """Read-only list of strings: one UTF-8 blob plus row offsets, both memory-mapped"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    @staticmethod
+    def write(directory: str, name: str, values: Iterable[str]):
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(
+            os.path.join(directory, f"{name}.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        )
+        np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> "MappedStrings":
+        return cls(_open(directory, f"{name}.npy"), _open(directory, f"{name}_offsets.npy"))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _decode(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i] : self._offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._decode(i)
+
+
+class MappedRecords(MappedStrings):
+    """Read-only list of JSON objects, decoded only when a row is read"""
+
+    @staticmethod
+    def write(directory: str, name: str, values: Iterable[Any]):
+        MappedStrings.write(directory, name, (json.dumps(value) for value in values))
+
+    def _decode(self, i: int) -> Any:
+        return json.loads(super()._decode(i))
+
+
+class MappedLookup(Mapping):
+    """Read-only str -> row mapping over sorted keys, searched with np.searchsorted"""
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray):
+        self._keys = keys
+        self._rows = rows
+
+    @staticmethod
+    def write(directory: str, name: str, values: List[str]):
+        encoded = np.array([value.encode("utf-8") for value in values] or [b""], dtype=bytes)
+        encoded = encoded[: len(values)]
+        order = np.argsort(encoded, kind="stable")
+        np.save(os.path.join(directory, f"{name}_keys.npy"), encoded[order])
+        np.save(os.path.join(directory, f"{name}_rows.npy"), order.astype(np.int64))
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> "MappedLookup":
+        return cls(_open(directory, f"{name}_keys.npy"), _open(directory, f"{name}_rows.npy"))
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        encoded = key.encode("utf-8")
+        # Longer keys would be truncated to the array's width and could falsely match
+        if len(encoded) > self._keys.dtype.itemsize or not len(self._keys):
+            return default
+        i = int(np.searchsorted(self._keys, encoded))
+        if i < len(self._keys) and self._keys[i] == encoded:
+            return int(self._rows[i])
+        return default
+
+    def __getitem__(self, key: str) -> int:
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (key.decode("utf-8") for key in self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rows(self, keys: Iterable[str]) -> np.ndarray:
+        """Rows of the keys that are present, in the order given"""
+        width = self._keys.dtype.itemsize
+        encoded = [k.encode("utf-8") for k in keys]
+        encoded = np.array([k for k in encoded if len(k) <= width], dtype=self._keys.dtype)
+        if not len(encoded) or not len(self._keys):
+            return np.zeros(0, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._keys, encoded), len(self._keys) - 1)
+        hit = self._keys[found] == encoded
+        return np.asarray(self._rows[found[hit]], dtype=np.int64)
+
+
+def write_rows(directory: str, ids: List[str], metadata: Iterable[Dict[str, Any]]):
+    """Chunk ids, an id -> row lookup and per-row metadata"""
+    MappedStrings.write(directory, "ids", ids)
+    MappedLookup.write(directory, "id_lookup", list(ids))
+    MappedRecords.write(directory, "metadata", metadata)
+
+
+def open_rows(directory: str) -> Tuple[MappedStrings, MappedRecords, MappedLookup]:
+    return (
+        MappedStrings.open(directory, "ids"),
+        MappedRecords.open(directory, "metadata"),
+        MappedLookup.open(directory, "id_lookup"),
+    )
+
+
+def lookup_rows(positions: Mapping, candidates: Iterable[str]) -> np.ndarray:
+    """Rows of the candidate ids present in positions (a dict or a MappedLookup)"""
+    if isinstance(positions, MappedLookup):
+        return positions.rows(candidates)
+    return np.fromiter((positions[c] for c in candidates if c in positions), dtype=np.int64)
+
+
+def is_mapped(values: Any) -> bool:
+    return isinstance(values, (MappedStrings, MappedLookup, np.memmap))
@@ -0,0 +1,281 @@
+"""
+Streaming bulk document ingestion into the vector store
+Files are read lazily, chunked with generators, embedded in batches and upserted
+with bounded concurrency. Per-file progress is checkpointed once the index holding it has
+been saved, so runs can resume without losing chunks.
+
+Usage: python ingestion.py [PATH ...] [--batch-size N] [--concurrency N] [--reset]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".csv"}
+MAX_LINE_CHARS = 64 * 1024
+
+
+@dataclass
+class IngestionStats:
+    """Throughput counters for one ingestion run"""
+
+    documents: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_sec": round(self.documents / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_sec": round(self.chunks / elapsed, 2) if elapsed else 0.0,
+            "running": self.finished_at is None,
+        }
+
+
+def iter_files(paths: Iterable[str]) -> Iterator[str]:
+    """Yield ingestible files under the given files/directories, lazily"""
+    for path in paths:
+        if os.path.isfile(path):
+            if os.path.splitext(path)[1].lower() in TEXT_EXTENSIONS:
+                yield path
+            continue
+        if not os.path.isdir(path):
+            logger.warning(f"Ingestion path not found: {path}")
+            continue
+        with os.scandir(path) as entries:
+            children = sorted(entry.path for entry in entries if not entry.name.startswith("."))
+        yield from iter_files(children)
+
+
+def iter_lines(path: str, max_line_chars: int = MAX_LINE_CHARS) -> Iterator[str]:
+    """Stream a text file line by line; longer lines arrive in max_line_chars pieces"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        # A file with no newlines would otherwise be read into memory in one go
+        for line in iter(lambda: f.readline(max_line_chars), ""):
+            yield line
+
+
+def chunk_text(lines: Iterable[str], chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+    """Group streamed lines into ~chunk_size character chunks with overlap"""
+    if overlap >= chunk_size // 2:
+        raise ValueError("overlap must be smaller than half of chunk_size")
+
+    buffer = ""
+    for line in lines:
+        buffer += line
+        while len(buffer) >= chunk_size:
+            cut = buffer.rfind(" ", chunk_size // 2, chunk_size)
+            if cut == -1:
+                cut = chunk_size
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            buffer = buffer[max(cut - overlap, 0) :]
+
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
+class IngestionPipeline:
+    """Bulk ingestion engine feeding VectorStore.upsert_chunks"""
+
+    def __init__(
+        self,
+        vector_store,
+        batch_size: int = 32,
+        concurrency: int = 4,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        checkpoint_path: Optional[str] = "data/ingestion_checkpoint.json",
+    ):
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint: Dict[str, Dict[str, Any]] = self._load_checkpoint()
+        self.stats = IngestionStats()
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def reset_checkpoint(self):
+        """Forget progress so the next run re-ingests everything"""
+        self.checkpoint = {}
+        self._save_checkpoint()
+
+    @staticmethod
+    def _fingerprint(path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    async def run(self, paths: Iterable[str]) -> IngestionStats:
+        """Ingest every new or changed file under paths"""
+        self.stats = IngestionStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        done: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            for path in iter_files(paths):
+                await self._ingest_path(path, semaphore, done)
+
+            if hasattr(self.vector_store, "save_index"):
+                await asyncio.to_thread(self.vector_store.save_index)
+            # Only now are the chunks durable, so a crash before this re-ingests the files
+            if done:
+                self.checkpoint.update(done)
+                self._save_checkpoint()
+        finally:
+            self.stats.finished_at = time.perf_counter()
+
+        logger.info(f"Ingestion finished: {self.stats.to_dict()}")
+        return self.stats
+
+    async def _ingest_path(
+        self, path: str, semaphore: asyncio.Semaphore, done: Dict[str, Dict[str, Any]]
+    ):
+        fingerprint = self._fingerprint(path)
+        previous = self.checkpoint.get(path)
+        if previous and all(previous.get(k) == v for k, v in fingerprint.items()):
+            self.stats.skipped += 1
+            return
+
+        try:
+            chunk_count = await self._ingest_file(path, semaphore)
+        except Exception as e:
+            logger.error(f"Failed to ingest {path}: {e}")
+            self.stats.failed += 1
+            return
+
+        stale = (previous or {}).get("chunks", 0)
+        if stale > chunk_count:
+            await self.vector_store.delete_chunks(
+                [f"{path}#{n}" for n in range(chunk_count, stale)]
+            )
+
+        done[path] = {**fingerprint, "chunks": chunk_count}
+        self.stats.documents += 1
+
+    async def _ingest_file(self, path: str, semaphore: asyncio.Semaphore) -> int:
+        title = os.path.splitext(os.path.basename(path))[0]
+        tasks: List[asyncio.Task] = []
+        batch: List[Dict[str, Any]] = []
+        chunk_count = 0
+
+        async def flush(pending: List[Dict[str, Any]]):
+            # Acquire before spawning so the reader stalls once `concurrency` batches are in flight
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self._process_batch(pending, semaphore)))
+
+        for chunk_count, content in enumerate(
+            chunk_text(iter_lines(path), self.chunk_size, self.chunk_overlap), start=1
+        ):
+            batch.append(
+                {
+                    "id": f"{path}#{chunk_count - 1}",
+                    "metadata": {
+                        "document_id": path,
+                        "title": title,
+                        "source": path,
+                        "chunk_index": chunk_count - 1,
+                        "content": content,
+                    },
+                }
+            )
+            if len(batch) >= self.batch_size:
+                await flush(batch)
+                batch = []
+
+        if batch:
+            await flush(batch)
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+        return chunk_count
+
+    async def _process_batch(self, batch: List[Dict[str, Any]], semaphore: asyncio.Semaphore):
+        try:
+            embeddings = await self.vector_store.create_embeddings(
+                [chunk["metadata"]["content"] for chunk in batch]
+            )
+            for chunk, embedding in zip(batch, embeddings):
+                chunk["embedding"] = embedding
+            await self.vector_store.upsert_chunks(batch)
+            self.stats.chunks += len(batch)
+        finally:
+            semaphore.release()
+
+
+async def _main(argv: Optional[List[str]] = None):
+    from vector_store import VectorStore
+
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector store")
+    parser.add_argument("paths", nargs="*", default=["uploads"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--checkpoint", default="data/ingestion_checkpoint.json")
+    parser.add_argument("--reset", action="store_true", help="ignore the existing checkpoint")
+    args = parser.parse_args(argv)
+
+    vector_store = VectorStore()
+    await vector_store.initialize()
+    try:
+        pipeline = IngestionPipeline(
+            vector_store,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            checkpoint_path=args.checkpoint,
+        )
+        if args.reset:
+            pipeline.reset_checkpoint()
+        stats = await pipeline.run(args.paths)
+        print(json.dumps(stats.to_dict(), indent=2))
+    finally:
+        await vector_store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
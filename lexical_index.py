@@ -0,0 +1,289 @@
+"""
+In-process BM25 inverted index over chunk content
+A saved index is a compact CSR posting list plus term, id and metadata tables, all
+memory-mapped on load; updates go to an in-memory delta segment plus tombstones until
+the next save compacts both into a new base segment published as a new version.
+"""
+
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from index_versions import (
+    MappedLookup,
+    is_mapped,
+    open_rows,
+    publish,
+    read_header,
+    resolve,
+    write_header,
+    write_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.-][a-z0-9]+)*")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+TERMS_FILE = "lexical_terms.json"
+OFFSETS_FILE = "lexical_offsets.npy"
+DOCS_FILE = "lexical_docs.npy"
+FREQS_FILE = "lexical_freqs.npy"
+LENGTHS_FILE = "lexical_lengths.npy"
+MAX_TERM_FREQUENCY = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case tokens; compounds like ds-101 or 4.5 are kept whole and also split"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(WORD_PATTERN.findall(token))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> Dict[str, float]:
+    """Sum of 1 / (k + rank) over every ranking an id appears in"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+class BM25Index:
+    """Okapi BM25 over chunks, with an immutable base segment and a mutable delta"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        # Base segment: term -> row, postings for row r are offsets[r]:offsets[r + 1]
+        self._base_terms: Dict[str, int] = {}
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._base_docs = np.zeros(0, dtype=np.int32)
+        self._base_freqs = np.zeros(0, dtype=np.uint16)
+
+        # Delta segment: term -> {doc number: frequency}
+        self._delta: Dict[str, Dict[int, int]] = {}
+        self._delta_terms: Dict[int, Counter] = {}
+
+        # Per document number, across both segments
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._lengths = np.zeros(1024, dtype=np.int32)
+        self._positions: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._positions
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._base_terms.keys() | self._delta.keys())
+
+    def metadata(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(chunk_id)
+        return None if position is None else self._metadata[position]
+
+    def _make_writable(self):
+        """Copy memory-mapped per-document tables into RAM before the first modification"""
+        if not is_mapped(self._ids):
+            return
+        size = len(self._ids)
+        lengths = np.zeros(max(size * 2, 1024), dtype=np.int32)
+        lengths[:size] = self._lengths[:size]
+        self._lengths = lengths
+        self._ids = list(self._ids)
+        self._metadata = list(self._metadata)
+        self._positions = {chunk_id: doc for doc, chunk_id in enumerate(self._ids)}
+
+    def upsert(self, chunk_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index (or re-index) one chunk's text"""
+        self.delete([chunk_id])
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+
+        doc = len(self._ids)
+        if doc >= self._lengths.shape[0]:
+            grown = np.zeros(self._lengths.shape[0] * 2, dtype=np.int32)
+            grown[:doc] = self._lengths[:doc]
+            self._lengths = grown
+        self._lengths[doc] = length
+        self._ids.append(chunk_id)
+        self._metadata.append(metadata or {})
+        self._positions[chunk_id] = doc
+        self._total_length += length
+
+        for term, frequency in terms.items():
+            self._delta.setdefault(term, {})[doc] = frequency
+        self._delta_terms[doc] = terms
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove chunks; delta postings are dropped now, base postings at the next save"""
+        self._make_writable()
+        removed = 0
+        for chunk_id in ids:
+            doc = self._positions.pop(chunk_id, None)
+            if doc is None:
+                continue
+            self._total_length -= int(self._lengths[doc])
+            self._ids[doc] = None
+            self._metadata[doc] = None
+            terms = self._delta_terms.pop(doc, None)
+            if terms is None:
+                self._deleted.add(doc)
+            else:
+                for term in terms:
+                    postings = self._delta[term]
+                    del postings[doc]
+                    if not postings:
+                        del self._delta[term]
+            removed += 1
+        return removed
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc numbers, frequencies) for a term across both segments"""
+        docs, freqs = [], []
+        row = self._base_terms.get(term)
+        if row is not None:
+            start, end = self._base_offsets[row], self._base_offsets[row + 1]
+            docs.append(np.asarray(self._base_docs[start:end]))
+            freqs.append(np.asarray(self._base_freqs[start:end], dtype=np.float32))
+        delta = self._delta.get(term)
+        if delta:
+            docs.append(np.fromiter(delta.keys(), dtype=np.int32, count=len(delta)))
+            freqs.append(np.fromiter(delta.values(), dtype=np.float32, count=len(delta)))
+        if not docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(freqs)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25 score) for the top_k chunks matching any query term"""
+        live = len(self._positions)
+        if live == 0 or top_k <= 0:
+            return []
+
+        size = len(self._ids)
+        average_length = max(self._total_length / live, 1.0)
+        norms = self.k1 * (1 - self.b + self.b * self._lengths[:size] / average_length)
+        scores = np.zeros(size, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            docs, freqs = self._postings(term)
+            if docs.size == 0:
+                continue
+            # df counts tombstoned base postings until the next compaction
+            idf = np.log(1.0 + (live - docs.size + 0.5) / (docs.size + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + norms[docs])
+
+        if self._deleted:
+            scores[list(self._deleted)] = 0.0
+        matched = np.flatnonzero(scores > 0)
+        if matched.size == 0:
+            return []
+        k = min(top_k, matched.size)
+        if k < matched.size:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in ranked]
+
+    def write(self, directory: str):
+        """Compact both segments into a new base segment written into directory"""
+        live_docs = [doc for doc, chunk_id in enumerate(self._ids) if chunk_id is not None]
+        renumber = np.full(len(self._ids) + 1, -1, dtype=np.int64)
+        renumber[live_docs] = np.arange(len(live_docs))
+
+        terms: List[str] = []
+        offsets = [0]
+        doc_parts, freq_parts = [], []
+        for term in sorted(self._base_terms.keys() | self._delta.keys()):
+            docs, freqs = self._postings(term)
+            new_docs = renumber[docs]
+            keep = new_docs >= 0
+            if not keep.any():
+                continue
+            order = np.argsort(new_docs[keep], kind="stable")
+            doc_parts.append(new_docs[keep][order].astype(np.int32))
+            freq_parts.append(np.minimum(freqs[keep][order], MAX_TERM_FREQUENCY).astype(np.uint16))
+            terms.append(term)
+            offsets.append(offsets[-1] + doc_parts[-1].size)
+
+        arrays = {
+            OFFSETS_FILE: np.asarray(offsets, dtype=np.int64),
+            DOCS_FILE: np.concatenate(doc_parts) if doc_parts else np.zeros(0, np.int32),
+            FREQS_FILE: np.concatenate(freq_parts) if freq_parts else np.zeros(0, np.uint16),
+            LENGTHS_FILE: np.ascontiguousarray(self._lengths[live_docs]),
+        }
+
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name), array)
+        MappedLookup.write(directory, "terms", terms)
+        write_rows(
+            directory,
+            [self._ids[doc] for doc in live_docs],
+            (self._metadata[doc] for doc in live_docs),
+        )
+        write_header(directory, {"k1": self.k1, "b": self.b, "count": len(live_docs)})
+
+    def save(self, path: str) -> str:
+        """Compact both segments into a new base segment and publish it as a version"""
+        directory = publish(path, self.write)
+        logger.info(f"Saved lexical index with {len(self)} chunks to {directory}")
+        return directory
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """Open the current version (memory-mapped), or an empty index if absent"""
+        directory = resolve(path)
+        header = read_header(directory)
+        if header is None:
+            return cls._load_flat(directory, mmap)
+
+        mode = "r" if mmap else None
+        index = cls(k1=header["k1"], b=header["b"])
+        index._base_terms = MappedLookup.open(directory, "terms")
+        index._base_offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode=mode)
+        index._base_docs = np.load(os.path.join(directory, DOCS_FILE), mmap_mode=mode)
+        index._base_freqs = np.load(os.path.join(directory, FREQS_FILE), mmap_mode=mode)
+        index._lengths = np.load(os.path.join(directory, LENGTHS_FILE), mmap_mode="r")
+        index._ids, index._metadata, index._positions = open_rows(directory)
+        index._total_length = int(index._lengths.sum())
+        logger.info(f"Opened lexical index with {len(index)} chunks at {directory}")
+        return index
+
+    @classmethod
+    def _load_flat(cls, path: str, mmap: bool) -> "BM25Index":
+        """Directories written before versioning keep their tables in one JSON header"""
+        header_path = os.path.join(path, TERMS_FILE)
+        if not os.path.exists(header_path):
+            return cls()
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        mode = "r" if mmap else None
+        index = cls(k1=header["k1"], b=header["b"])
+        index._base_terms = {term: row for row, term in enumerate(header["terms"])}
+        index._base_offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode=mode)
+        index._base_docs = np.load(os.path.join(path, DOCS_FILE), mmap_mode=mode)
+        index._base_freqs = np.load(os.path.join(path, FREQS_FILE), mmap_mode=mode)
+
+        lengths = np.load(os.path.join(path, LENGTHS_FILE))
+        index._lengths = np.zeros(max(lengths.shape[0] * 2, 1024), dtype=np.int32)
+        index._lengths[: lengths.shape[0]] = lengths
+        index._ids = list(header["ids"])
+        index._metadata = list(header["metadata"])
+        index._positions = {chunk_id: doc for doc, chunk_id in enumerate(index._ids)}
+        index._total_length = int(lengths.sum())
+        logger.info(f"Loaded lexical index with {len(index)} chunks from {path}")
+        return index
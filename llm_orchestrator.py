@@ -1,21 +1,379 @@
 """
-LLM Orchestrator placeholder
+LLM Orchestrator - routes prompts to Claude, ChatGPT or Groq over their HTTP APIs
+Requests without an explicit provider go to the currently fastest, healthiest one,
+optionally hedged against a second provider. Unconfigured providers fall back to a
+placeholder response.
 """
 
-from enum import Enum
+import asyncio
+import json
 import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from http_clients import ServiceClient, shared_pool
+from monitoring import metrics
+from tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
+PLACEHOLDER_RESPONSE = "LLM orchestration not fully implemented"
+
+
 class LLMProvider(Enum):
     CLAUDE = "claude"
-    CHATGPT = "chatgpt"  
+    CHATGPT = "chatgpt"
     GROQ = "groq"
 
+
+class ProviderClient(ABC):
+    """Base adapter that streams completions from one vendor"""
+
+    def __init__(
+        self, provider: LLMProvider, api_key: str, model: str, base_url: str, timeout: float = 60.0
+    ):
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self._client: Optional[ServiceClient] = None
+
+    @property
+    def client(self) -> ServiceClient:
+        if self._client is None:
+            self._client = shared_pool().service(
+                self.provider.value, self.base_url, headers=self.headers(), timeout=self.timeout
+            )
+        return self._client
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    @abstractmethod
+    def stream(self, message: str, **kwargs) -> AsyncIterator[str]:
+        """Yield response text fragments as the vendor produces them"""
+
+    async def complete(self, message: str, **kwargs) -> Dict[str, Any]:
+        """Collect a streamed response into the route_request result shape"""
+        parts = [token async for token in self.stream(message, **kwargs)]
+        return {"content": "".join(parts), "usage": {}, "provider": self.provider.value}
+
+    async def _sse_data(self, path: str, payload: Dict) -> AsyncIterator[Dict]:
+        async with self.client.stream("POST", path, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"{self.provider.value} API error: {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    return
+                yield json.loads(data)
+
+    async def close(self):
+        # Connections belong to the shared pool, which is closed at shutdown
+        self._client = None
+
+
+class OpenAICompatibleClient(ProviderClient):
+    """Chat Completions streaming, used by OpenAI and Groq"""
+
+    async def stream(self, message: str, **kwargs) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": kwargs.get("messages") or [{"role": "user", "content": message}],
+            "max_tokens": kwargs.get("max_tokens", 1024),
+            "stream": True,
+        }
+        async for event in self._sse_data("/chat/completions", payload):
+            for choice in event.get("choices", []):
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
+
+
+class AnthropicClient(ProviderClient):
+    """Anthropic Messages API streaming"""
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json",
+        }
+
+    async def stream(self, message: str, **kwargs) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": kwargs.get("messages") or [{"role": "user", "content": message}],
+            "max_tokens": kwargs.get("max_tokens", 1024),
+            "stream": True,
+        }
+        if kwargs.get("system"):
+            payload["system"] = kwargs["system"]
+        async for event in self._sse_data("/messages", payload):
+            if event.get("type") == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    yield text
+
+
+def clients_from_env() -> Dict[LLMProvider, ProviderClient]:
+    """Build a client for every provider whose API key is configured"""
+    clients: Dict[LLMProvider, ProviderClient] = {}
+    if os.getenv("CLAUDE_API_KEY"):
+        clients[LLMProvider.CLAUDE] = AnthropicClient(
+            LLMProvider.CLAUDE,
+            os.getenv("CLAUDE_API_KEY"),
+            os.getenv("CLAUDE_MODEL", "claude-3-5-haiku-latest"),
+            "https://api.anthropic.com/v1",
+        )
+    if os.getenv("OPENAI_API_KEY"):
+        clients[LLMProvider.CHATGPT] = OpenAICompatibleClient(
+            LLMProvider.CHATGPT,
+            os.getenv("OPENAI_API_KEY"),
+            os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            "https://api.openai.com/v1",
+        )
+    if os.getenv("GROQ_API_KEY"):
+        clients[LLMProvider.GROQ] = OpenAICompatibleClient(
+            LLMProvider.GROQ,
+            os.getenv("GROQ_API_KEY"),
+            os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+            "https://api.groq.com/openai/v1",
+        )
+    return clients
+
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: deque = deque(maxlen=window)
+        self.errors: deque = deque(maxlen=window)
+        self.in_flight = 0
+
+    def record(self, latency: float, error: bool):
+        if not error:
+            self.latencies.append(latency)
+        self.errors.append(error)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(0.50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(0.95)
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    def score(self) -> float:
+        """Lower is better; providers without samples score 0 so they get explored"""
+        p50 = self.p50
+        if p50 is None:
+            return 0.0 if not self.errors else float("inf")
+        return p50 * (1 + 10 * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "p50_ms": round(self.p50 * 1000, 1) if self.p50 is not None else None,
+            "p95_ms": round(self.p95 * 1000, 1) if self.p95 is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "samples": len(self.errors),
+            "in_flight": self.in_flight,
+        }
+
+
 class LLMOrchestrator:
-    def __init__(self):
-        pass
-    
-    async def route_request(self, message: str, provider: LLMProvider, **kwargs):
-        """Route request to LLM provider"""
-        return {"content": "LLM orchestration not fully implemented", "usage": {}}
\ No newline at end of file
+    def __init__(
+        self,
+        clients: Optional[Dict[LLMProvider, ProviderClient]] = None,
+        max_concurrency: Optional[int] = None,
+        hedge: Optional[bool] = None,
+        stats_window: int = 100,
+    ):
+        self.clients = clients if clients is not None else clients_from_env()
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("LLM_MAX_CONCURRENCY_PER_PROVIDER", "8")
+        )
+        self.hedge = (
+            hedge
+            if hedge is not None
+            else (os.getenv("LLM_HEDGE_REQUESTS", "false").lower() == "true")
+        )
+        self.stats = {provider: ProviderStats(stats_window) for provider in self.clients}
+        self.semaphores = {
+            provider: asyncio.Semaphore(self.max_concurrency) for provider in self.clients
+        }
+
+    def rank_providers(self) -> List[LLMProvider]:
+        """Configured providers, fastest and healthiest first; saturated ones last"""
+        return sorted(
+            self.clients, key=lambda p: (self.semaphores[p].locked(), self.stats[p].score())
+        )
+
+    def _record(self, provider: LLMProvider, latency: float, error: bool):
+        self.stats[provider].record(latency, error=error)
+        labels = {"provider": provider.value}
+        metrics.inc(
+            "llm_provider_calls_total", 1, {**labels, "outcome": "error" if error else "ok"}
+        )
+        if not error:
+            metrics.observe("llm_provider_latency_ms", latency * 1000, labels)
+
+    async def _call(self, provider: LLMProvider, message: str, **kwargs) -> Dict[str, Any]:
+        stats = self.stats[provider]
+        async with self.semaphores[provider]:
+            stats.in_flight += 1
+            started = time.perf_counter()
+            try:
+                result = await self.clients[provider].complete(message, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._record(provider, time.perf_counter() - started, error=True)
+                raise
+            else:
+                self._record(provider, time.perf_counter() - started, error=False)
+                return result
+            finally:
+                stats.in_flight -= 1
+
+    async def _hedged_call(
+        self, primary: LLMProvider, secondary: LLMProvider, message: str, **kwargs
+    ) -> Dict[str, Any]:
+        """Send to primary; if it outlives its p95, race a duplicate on secondary"""
+        tasks = {asyncio.create_task(self._call(primary, message, **kwargs))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.stats[primary].p95)
+            if not done:
+                logger.info(f"Hedging {primary.value} request to {secondary.value}")
+                tasks.add(asyncio.create_task(self._call(secondary, message, **kwargs)))
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    @traced("llm.route_request")
+    async def route_request(self, message: str, provider: Optional[LLMProvider] = None, **kwargs):
+        """Route request to LLM provider; provider=None picks the best one"""
+        if provider is not None:
+            if provider not in self.clients:
+                return {"content": PLACEHOLDER_RESPONSE, "usage": {}}
+            return await self._call(provider, message, **kwargs)
+
+        ranked = self.rank_providers()
+        if not ranked:
+            return {"content": PLACEHOLDER_RESPONSE, "usage": {}}
+
+        last_error: Optional[Exception] = None
+        for i, candidate in enumerate(ranked):
+            try:
+                if self.hedge and i + 1 < len(ranked) and self.stats[candidate].p95 is not None:
+                    return await self._hedged_call(candidate, ranked[i + 1], message, **kwargs)
+                return await self._call(candidate, message, **kwargs)
+            except Exception as e:
+                logger.warning(f"LLM provider {candidate.value} failed: {e}")
+                last_error = e
+        raise last_error
+
+    async def stream_request(
+        self, message: str, provider: Optional[LLMProvider] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response tokens; provider=None picks the best one and fails over
+
+        A provider that errors before its first token is replaced by the next ranked one.
+        Once tokens have reached the caller, errors propagate.
+        """
+        if provider is not None:
+            candidates = [provider] if provider in self.clients else []
+        else:
+            candidates = self.rank_providers()
+        if not candidates:
+            yield PLACEHOLDER_RESPONSE
+            return
+
+        last_error: Optional[Exception] = None
+        for candidate in candidates:
+            streamed = False
+            try:
+                async for token in self._stream(candidate, message, **kwargs):
+                    streamed = True
+                    yield token
+                return
+            except Exception as e:
+                if streamed:
+                    raise
+                logger.warning(f"LLM provider {candidate.value} failed before streaming: {e}")
+                last_error = e
+        raise last_error
+
+    async def _stream(self, provider: LLMProvider, message: str, **kwargs) -> AsyncIterator[str]:
+        """Stream from one provider, timing only the waits on the provider
+
+        The caller's work between tokens (TTS, socket sends) is excluded, so routing stats
+        and the first-token/duration histograms reflect the provider alone.
+        """
+        stats = self.stats[provider]
+        labels = {"provider": provider.value}
+        with span("llm.stream", provider=provider.value):
+            async with self.semaphores[provider]:
+                stats.in_flight += 1
+                tokens = self.clients[provider].stream(message, **kwargs)
+                busy = 0.0
+                first = True
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            token = await tokens.__anext__()
+                        except StopAsyncIteration:
+                            busy += time.perf_counter() - started
+                            break
+                        except Exception:
+                            self._record(provider, busy + time.perf_counter() - started, error=True)
+                            raise
+                        busy += time.perf_counter() - started
+                        if first:
+                            first = False
+                            metrics.observe("llm_time_to_first_token_ms", busy * 1000, labels)
+                        yield token
+                    self._record(provider, busy, error=False)
+                    metrics.observe("llm_stream_duration_ms", busy * 1000, labels)
+                finally:
+                    stats.in_flight -= 1
+                    await tokens.aclose()
+
+    def provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling latency/error figures per configured provider"""
+        return {provider.value: stats.to_dict() for provider, stats in self.stats.items()}
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
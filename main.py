@@ -3,89 +3,220 @@ Enhanced FastAPI application for AI-powered bootcamp chatbot
 Supporting web, voice, and telephony interfaces with multi-agent architecture
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, BackgroundTasks
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+from fastapi import (
+    BackgroundTasks,
+    Depends,
+    FastAPI,
+    Form,
+    HTTPException,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import Dict, List, Optional
-import json
-import uuid
-import os
-import logging
 
 # Import our custom modules
-from database import DatabaseManager
-from vector_store import VectorStore
-from llm_orchestrator import LLMOrchestrator, LLMProvider
-from agents.rag_agent import RAGAgent
-from agents.scheduler_agent import SchedulerAgent
-from agents.telephony_agent import TelephonyAgent
-from agents.voice_agent import VoiceAgent
+from admission import AdmissionController, Overloaded, Ticket
 from agents.feedback_agent import FeedbackAgent
 from agents.intent_agent import IntentAgent
+from agents.rag_agent import RAGAgent
+from agents.scheduler_agent import SchedulerAgent
+from connection_hub import ConnectionHub
+from context_manager import ContextManager
+from database import DatabaseManager
+from http_clients import DeadlineMiddleware, close_shared_pool, deadline, shared_pool
 from identity_manager import IdentityManager
-from monitoring import MonitoringService
-from models import ChatMessage, ChatResponse, FeedbackRequest, AppointmentRequest
+from llm_orchestrator import LLMOrchestrator, LLMProvider
+from models import (
+    AppointmentRequest,
+    ChatMessage,
+    ChatResponse,
+    FeedbackRequest,
+    IngestionRequest,
+    IntentType,
+)
+from monitoring import MetricsMiddleware, MonitoringService, metrics
+from startup import LazyComponent, StartupTracker
+from tracing import SamplingProfiler, TracingMiddleware, current_trace
+from vector_store import VectorStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global state for WebSocket connections
-active_connections: Dict[str, WebSocket] = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup application resources"""
+    startup = app.state.startup = StartupTracker()
+    warmup: Optional[asyncio.Task] = None
     try:
-        # Initialize database
+        app.state.admission = AdmissionController.from_env()
+
+        # Independent I/O-bound initializers run concurrently
         app.state.db = DatabaseManager()
-        await app.state.db.initialize()
-        logger.info("Database initialized successfully")
-        
-        # Initialize vector store
         app.state.vector_store = VectorStore()
-        await app.state.vector_store.initialize()
-        logger.info("Vector store initialized successfully")
-        
-        # Initialize LLM orchestrator
+        app.state.connection_hub = ConnectionHub.from_env()
+        await startup.gather(
+            database=app.state.db.initialize(),
+            vector_store=app.state.vector_store.initialize(),
+            connection_hub=app.state.connection_hub.start(),
+        )
+        logger.info("Database, vector store and connection hub initialized")
+
+        started = time.perf_counter()
         app.state.llm_orchestrator = LLMOrchestrator()
-        logger.info("LLM orchestrator initialized")
-        
-        # Initialize all agents
-        app.state.rag_agent = RAGAgent(app.state.vector_store, app.state.db)
+        startup.record("llm_orchestrator", started)
+
+        # Agents on the chat path are built now; voice and telephony load on first use
+        started = time.perf_counter()
+        app.state.rag_agent = RAGAgent(
+            app.state.vector_store, app.state.db, app.state.llm_orchestrator
+        )
         app.state.scheduler_agent = SchedulerAgent(app.state.db)
-        app.state.telephony_agent = TelephonyAgent()
-        app.state.voice_agent = VoiceAgent()
         app.state.feedback_agent = FeedbackAgent(app.state.db)
-        app.state.intent_agent = IntentAgent(app.state.llm_orchestrator)
-        logger.info("All agents initialized successfully")
-        
+        app.state.intent_agent = IntentAgent(app.state.llm_orchestrator, app.state.vector_store)
+        app.state.context_manager = ContextManager(app.state.db, app.state.llm_orchestrator)
+        app.state.telephony_agent = LazyComponent("agents.telephony_agent", "TelephonyAgent")
+        app.state.voice_agent = LazyComponent("agents.voice_agent", "VoiceAgent")
+        startup.record("agents", started)
+
+        # Resume outbound calls saved before a restart; this loads telephony eagerly
+        if os.getenv("TWILIO_ACCOUNT_SID"):
+            try:
+                app.state.telephony_agent.start_outbound()
+            except Exception as e:
+                logger.warning(f"Outbound call workers failed to start: {e}")
+
         # Initialize security and monitoring
+        started = time.perf_counter()
         app.state.identity_manager = IdentityManager()
         app.state.monitoring = MonitoringService()
-        logger.info("Security and monitoring initialized")
-        
+        register_metric_collectors(app)
+        app.state.monitoring.start_snapshot_writer()
+        startup.record("monitoring", started)
+
+        # Serve liveness immediately; readiness waits for the warm-up
+        warmup = asyncio.create_task(warm_up(app))
+
         yield
-        
+
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
         raise
     finally:
         # Cleanup resources
-        if hasattr(app.state, 'db') and app.state.db.pool:
-            await app.state.db.pool.close()
+        if warmup is not None:
+            warmup.cancel()
+            await asyncio.gather(warmup, return_exceptions=True)
+        if hasattr(app.state, "connection_hub"):
+            await app.state.connection_hub.close()
+        if hasattr(app.state, "context_manager"):
+            await app.state.context_manager.close()
+        if hasattr(app.state, "scheduler_agent"):
+            await app.state.scheduler_agent.close()
+        if hasattr(app.state, "telephony_agent") and app.state.telephony_agent.loaded:
+            await app.state.telephony_agent.close()
+        if hasattr(app.state, "monitoring"):
+            await app.state.monitoring.close()
+        if hasattr(app.state, "llm_orchestrator"):
+            await app.state.llm_orchestrator.close()
+        if hasattr(app.state, "vector_store"):
+            await app.state.vector_store.close()
+            logger.info("Vector store closed")
+        if hasattr(app.state, "db"):
+            await app.state.db.close()
             logger.info("Database connections closed")
+        await close_shared_pool()
+
+
+async def warm_up(app: FastAPI):
+    """Move first-request work (intent centroids) off the request path, then mark ready
+
+    Voice phrases are warmed after readiness, and only when the voice agent is already
+    loaded or VOICE_WARMUP opts in, so workers never build it just to warm its cache.
+    """
+    startup = app.state.startup
+    try:
+        await startup.run("scheduler_availability", app.state.scheduler_agent.initialize())
+    except Exception as e:
+        logger.warning(f"Loading bookings failed, availability starts empty: {e}")
+    if os.getenv("STARTUP_WARMUP", "true").lower() == "true":
+        classifier = app.state.intent_agent.embedding_classifier
+        if classifier is not None:
+            try:
+                await startup.run("intent_classifier", classifier.fit())
+            except Exception as e:
+                logger.warning(f"Intent classifier warm-up failed, will fit on demand: {e}")
+    startup.mark_ready()
+
+    voice_agent = app.state.voice_agent
+    if voice_agent.loaded or os.getenv("VOICE_WARMUP", "false").lower() == "true":
+        try:
+            await startup.run("voice_phrases", voice_agent.warm_cache())
+        except Exception as e:
+            logger.warning(f"Voice phrase warm-up failed, phrases synthesize on first use: {e}")
+
+
+def register_metric_collectors(app: FastAPI):
+    """Expose component counters and load gauges through the metrics registry at scrape time"""
+
+    def collect():
+        embedding = app.state.vector_store.embedding_cache.stats()
+        yield "embedding_cache_hits_total", {"tier": "memory"}, embedding["memory_hits"]
+        yield "embedding_cache_hits_total", {"tier": "disk"}, embedding["disk_hits"]
+        yield "embedding_cache_misses_total", {}, embedding["misses"]
+        yield "embedding_batches_total", {}, app.state.vector_store.embedding_batcher.requests_sent
+        semantic = app.state.rag_agent.semantic_cache.stats()
+        yield "semantic_cache_hits_total", {}, semantic["hits"]
+        yield "semantic_cache_misses_total", {}, semantic["misses"]
+        users = app.state.db.user_cache.stats()
+        yield "user_cache_hits_total", {}, users["hits"] + users["negative_hits"]
+        yield "user_cache_misses_total", {}, users["misses"]
+        hub = app.state.connection_hub.stats()
+        yield "websocket_messages_sent_total", {}, hub["messages_sent"]
+        yield "websocket_evictions_total", {"reason": "slow"}, hub["slow_evictions"]
+        yield "websocket_evictions_total", {"reason": "idle"}, hub["idle_evictions"]
+
+    def load():
+        # Totals across workers are what capacity alerts need
+        admission = app.state.admission.stats()
+        yield "admission_in_flight", {}, admission["in_flight"]
+        yield "admission_queued", {}, admission["queued"]
+        yield "websocket_connections", {}, app.state.connection_hub.stats()["connections"]
+
+    def circuits():
+        # 1 when any worker has the upstream's breaker open
+        for upstream, state in shared_pool().stats().items():
+            yield "http_client_circuit_open", {"upstream": upstream}, state["circuit"] == "open"
+
+    metrics.register_collector(collect)
+    metrics.register_collector(load, kind="gauge", aggregate="sum")
+    metrics.register_collector(circuits, kind="gauge", aggregate="max")
+
 
 # Create FastAPI application
 app = FastAPI(
     title="Bootcamp Chatbot API",
     description="Multi-agent AI chatbot for Employability Advantage & AusBiz Consulting",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -97,13 +228,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(DeadlineMiddleware)
+
 # Security
 security = HTTPBearer()
 
+
+def require_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Bearer token must match ADMIN_API_TOKEN; admin routes are off when it is unset"""
+    token = os.getenv("ADMIN_API_TOKEN")
+    if not token or not secrets.compare_digest(credentials.credentials, token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    """Shed requests get a fast 429/503 telling the client when to come back"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+
 @app.get("/")
 async def root():
     """Root endpoint with basic system info"""
@@ -111,27 +265,429 @@ async def root():
         "message": "Bootcamp Chatbot is live",
         "version": "2.0.0",
         "timestamp": datetime.utcnow().isoformat(),
-        "status": "operational"
+        "status": "operational",
     }
 
+
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Comprehensive health check"""
+    """Liveness: the process is up and serving requests"""
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
         "services": {
             "database": "healthy",
             "vector_store": "healthy",
-            "llm_orchestrator": "healthy"
-        }
+            "llm_orchestrator": "healthy",
+        },
     }
 
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: startup and warm-up finished; 503 until then"""
+    startup = getattr(app.state, "startup", None)
+    if startup is None or not startup.ready:
+        detail = startup.to_dict() if startup is not None else {"ready": False}
+        return JSONResponse(status_code=503, content={"status": "starting", "startup": detail})
+    return {"status": "ready", "startup": startup.to_dict()}
+
+
+async def stream_chat(message: ChatMessage) -> AsyncIterator[Dict[str, Any]]:
+    """Run one chat turn, yielding token events and a final ChatResponse event"""
+    started = time.perf_counter()
+    user = await app.state.db.get_or_create_user(message.session_id)
+    user_id = str(user["id"])
+    intent = await app.state.intent_agent.detect_intent(message.message)
+    message_data = message.model_dump()
+
+    result: Dict[str, Any] = {}
+    if intent == IntentType.SCHEDULING.value:
+        result = await app.state.scheduler_agent.handle_request(message_data, user_id)
+        yield {"type": "token", "content": result["message"]}
+    else:
+        message_data["history"] = await app.state.context_manager.build_history(message.session_id)
+        async for event in app.state.rag_agent.stream_request(message_data, user_id):
+            if event["type"] == "token":
+                yield event
+            else:
+                result = event["response"]
+
+    response_time_ms = (time.perf_counter() - started) * 1000
+    app.state.context_manager.record_turn(message.session_id, message.message, result["message"])
+    await app.state.monitoring.log_interaction(user_id, intent, round(response_time_ms, 2))
+    conversation_id = await app.state.db.log_conversation(
+        session_id=message.session_id,
+        message=message.message,
+        response=result["message"],
+        agent_type="scheduler" if intent == IntentType.SCHEDULING.value else "rag",
+        user_id=user_id,
+        intent=intent,
+        confidence_score=result.get("confidence"),
+        response_time_ms=int(response_time_ms),
+        metadata=result.get("metadata", {}),
+    )
+    response = ChatResponse(
+        message=result["message"],
+        session_id=message.session_id,
+        intent=IntentType(intent),
+        confidence=result.get("confidence"),
+        sources=result.get("sources", []),
+        metadata={
+            **result.get("metadata", {}),
+            "conversation_id": conversation_id,
+            "response_time_ms": round(response_time_ms, 2),
+        },
+    )
+    trace = current_trace()
+    if trace is not None and trace.debug:
+        response.metadata["trace"] = trace.breakdown()
+    yield {"type": "final", "response": response.model_dump(mode="json")}
+
+
+async def mirror_turn(session_id: str, response: Dict[str, Any], exclude: Optional[str] = None):
+    """Show a finished turn in the session's other open tabs, on whichever worker holds them"""
+    try:
+        await app.state.connection_hub.publish(
+            session_id, {"type": "turn", "response": response}, exclude=exclude
+        )
+    except Exception as e:
+        logger.warning(f"Mirroring turn to session {session_id} failed: {e}")
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(message: ChatMessage):
+    """Answer a chat message in a single JSON response"""
+    async with app.state.admission.admit("chat", message.session_id):
+        async for event in stream_chat(message):
+            if event["type"] == "final":
+                await mirror_turn(message.session_id, event["response"])
+                return event["response"]
+
+
+class TicketedStreamingResponse(StreamingResponse):
+    """Releases an admission ticket however the response ends
+
+    A generator's finally never runs if the client disconnects before iteration starts,
+    so the release lives on the response's own call path instead.
+    """
+
+    def __init__(self, content, ticket: Ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Answer a chat message as server-sent events: token events then a final event"""
+    # Admit before the response starts so a shed request still gets its 429/503 status
+    ticket = await app.state.admission.acquire("chat", message.session_id)
+
+    async def event_source():
+        try:
+            async for event in stream_chat(message):
+                payload = event["response"] if event["type"] == "final" else event
+                yield f"event: {event['type']}\ndata: {json.dumps(payload)}\n\n"
+                if event["type"] == "final":
+                    await mirror_turn(message.session_id, payload)
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Chat processing failed'})}\n\n"
+        finally:
+            ticket.release()
+
+    return TicketedStreamingResponse(
+        event_source(),
+        ticket,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/ws/{session_id}")
+async def websocket_chat(websocket: WebSocket, session_id: str):
+    """Streaming chat over WebSocket; send {"message": ...}, receive token/final events"""
+    await websocket.accept()
+    connection = app.state.connection_hub.register(websocket, session_id)
+    # Each turn gets the outbound-call budget an HTTP request would
+    budget = float(os.getenv("REQUEST_BUDGET_SECONDS", "30"))
+    try:
+        while True:
+            data = await websocket.receive_json()
+            connection.touch()
+            if data.get("type") == "pong":
+                continue
+            try:
+                message = ChatMessage(**{**data, "session_id": session_id})
+                with deadline(budget):
+                    async with app.state.admission.admit("chat", session_id):
+                        async for event in stream_chat(message):
+                            if not connection.send(event):
+                                break
+                            if event["type"] == "final":
+                                await mirror_turn(
+                                    session_id, event["response"], exclude=connection.id
+                                )
+            except WebSocketDisconnect:
+                raise
+            except Overloaded as e:
+                connection.send({"type": "error", "detail": e.reason, "retry_after": e.retry_after})
+            except Exception as e:
+                logger.error(f"WebSocket chat failed for {session_id}: {e}")
+                connection.send({"type": "error", "detail": "Chat processing failed"})
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket disconnected: {session_id}")
+    finally:
+        await connection.close()
+
+
+@app.websocket("/ws/voice/{session_id}")
+async def voice_chat(websocket: WebSocket, session_id: str):
+    """Streaming voice chat
+
+    Client sends binary audio frames, then {"type": "end"} to close the utterance.
+    Server sends {"type": "transcript", "final": bool} events while audio arrives, token
+    events while the answer is generated, and per sentence an {"type": "audio"} header
+    followed by one binary frame of encoded audio.
+    """
+    await websocket.accept()
+    voice_agent = app.state.voice_agent
+    connection = app.state.connection_hub.register(websocket, session_id)
+    max_frames = int(os.getenv("VOICE_MAX_BUFFERED_FRAMES", "256"))
+    try:
+        while True:
+            frames: asyncio.Queue = asyncio.Queue(maxsize=max_frames)
+
+            async def frame_source():
+                while (frame := await frames.get()) is not None:
+                    yield frame
+
+            async def send_partial(text: str):
+                connection.send({"type": "transcript", "text": text, "final": False})
+
+            transcription = asyncio.create_task(
+                voice_agent.transcribe_stream(frame_source(), on_partial=send_partial)
+            )
+            try:
+                while True:
+                    received = await websocket.receive()
+                    if received["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(received.get("code", 1000))
+                    connection.touch()
+                    if received.get("bytes") is not None:
+                        # A failed engine reads no more; drop the rest of the utterance
+                        if not transcription.done():
+                            frames.put_nowait(received["bytes"])
+                    elif json.loads(received.get("text") or "{}").get("type") == "end":
+                        frames.put_nowait(None)
+                        break
+                transcript = await transcription
+            except (WebSocketDisconnect, asyncio.QueueFull):
+                raise
+            except Exception as e:
+                logger.warning(f"Voice transcription failed for {session_id}: {e}")
+                connection.send({"type": "error", "detail": "Could not transcribe the audio"})
+                continue
+            finally:
+                transcription.cancel()
+
+            connection.send({"type": "transcript", "text": transcript, "final": True})
+            if not transcript:
+                continue
+            await answer_with_speech(connection, voice_agent, session_id, transcript)
+    except asyncio.QueueFull:
+        logger.warning(f"Voice client {session_id} sent audio faster than it was transcribed")
+    except WebSocketDisconnect:
+        logger.info(f"Voice WebSocket disconnected: {session_id}")
+    finally:
+        await connection.close()
+
+
+async def answer_with_speech(connection, voice_agent, session_id: str, transcript: str):
+    """Stream the chat answer as tokens and as sentence-by-sentence audio"""
+
+    async def tokens():
+        async for event in stream_chat(ChatMessage(message=transcript, session_id=session_id)):
+            connection.send(event)
+            if event["type"] == "token":
+                yield event["content"]
+
+    try:
+        with deadline(float(os.getenv("REQUEST_BUDGET_SECONDS", "30"))):
+            async with app.state.admission.admit("voice", session_id):
+                async for sentence, audio in voice_agent.synthesize_stream(tokens()):
+                    connection.send(
+                        {
+                            "type": "audio",
+                            "text": sentence,
+                            "media_type": voice_agent.media_type,
+                            "size": len(audio),
+                        }
+                    )
+                    connection.send(audio)
+    except Overloaded as e:
+        connection.send({"type": "error", "detail": e.reason, "retry_after": e.retry_after})
+    except Exception as e:
+        logger.error(f"Voice answer failed for {session_id}: {e}")
+        connection.send({"type": "error", "detail": "Voice processing failed"})
+
+
+@app.post("/feedback", status_code=201)
+async def submit_feedback(request: FeedbackRequest):
+    """Rate a conversation turn; rating again replaces the earlier rating"""
+    try:
+        stored = await app.state.feedback_agent.store_feedback(
+            request.conversation_id, request.rating, request.comment
+        )
+    except ValueError:
+        stored = False
+    if not stored:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"status": "stored"}
+
+
+@app.get("/feedback/trends")
+async def feedback_trends(days: int = 30):
+    """Satisfaction trends served from the feedback rollups"""
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    async with app.state.admission.admit("batch"):
+        return await app.state.feedback_agent.analyze_feedback_trends(days)
+
+
+@app.post("/appointments", status_code=201)
+async def book_appointment(request: AppointmentRequest):
+    """Book a consultation slot for the session's own user
+
+    403 when the session does not belong to user_id, 400 for past, out-of-range or
+    malformed bookings, 404 for an unknown user and 409 when the slot is taken.
+    """
+    user = await app.state.db.get_user(request.session_id)
+    if user is None or str(user["id"]) != str(request.user_id):
+        raise HTTPException(status_code=403, detail="Session does not belong to this user")
+    try:
+        result = await app.state.scheduler_agent.book_appointment(
+            str(request.user_id),
+            request.preferred_time,
+            request.phone_number,
+            appointment_type=request.appointment_type,
+            notes=request.notes,
+        )
+    except asyncpg.ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail="User not found")
+    except (ValueError, asyncpg.DataError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result["success"]:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "That time is no longer available",
+                "alternatives": result["alternatives"],
+            },
+        )
+    return result["appointment"]
+
+
+@app.delete("/appointments/{appointment_id}")
+async def cancel_appointment(appointment_id: str):
+    try:
+        cancelled = await app.state.scheduler_agent.cancel_appointment(appointment_id)
+    except ValueError:
+        cancelled = False
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return {"status": "cancelled"}
+
+
+@app.post("/telephony/inbound")
+async def inbound_call(CallSid: str = Form(""), From: str = Form("")):
+    """Twilio voice webhook; answers with pre-rendered TwiML"""
+    # Twilio abandons a webhook after 15s; leave room for the response to get back
+    with deadline(10):
+        async with app.state.admission.admit("telephony"):
+            twiml = await app.state.telephony_agent.handle_inbound_call(CallSid, From)
+    return Response(content=twiml, media_type="application/xml")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of this worker (and, with METRICS_DIR, all workers)"""
+    monitoring = getattr(app.state, "monitoring", None) or MonitoringService()
+    return PlainTextResponse(monitoring.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_worker(seconds: float = 5.0, interval_ms: float = 5.0):
+    """Sample this worker's event-loop stack; returns folded stacks for flamegraph tools"""
+    if not 0 < seconds <= 60 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(
+            status_code=400, detail="seconds must be in (0, 60], interval_ms in [1, 1000]"
+        )
+    if getattr(app.state, "profiling", False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    app.state.profiling = True
+    profiler = SamplingProfiler(threading.get_ident(), interval_ms / 1000)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await asyncio.to_thread(profiler.stop)
+        app.state.profiling = False
+    return PlainTextResponse(
+        profiler.folded(),
+        headers={"X-Profile-Samples": str(profiler.sample_count), "X-Worker-Pid": str(os.getpid())},
+    )
+
+
+@app.post("/ingest", status_code=202, dependencies=[Depends(require_admin)])
+async def start_ingestion(request: IngestionRequest, background_tasks: BackgroundTasks):
+    """Start a background ingestion run over files in the uploads directory"""
+    current = getattr(app.state, "ingestion", None)
+    if current is not None and current.stats.finished_at is None:
+        raise HTTPException(status_code=409, detail="Ingestion already running")
+
+    upload_root = os.path.realpath("uploads")
+    for path in request.paths:
+        if os.path.commonpath([upload_root, os.path.realpath(path)]) != upload_root:
+            raise HTTPException(status_code=400, detail=f"Path outside uploads/: {path}")
+
+    from ingestion import IngestionPipeline
+
+    pipeline = IngestionPipeline(
+        app.state.vector_store,
+        batch_size=request.batch_size,
+        concurrency=request.concurrency,
+    )
+    if request.reset:
+        pipeline.reset_checkpoint()
+    app.state.ingestion = pipeline
+    background_tasks.add_task(pipeline.run, request.paths)
+    return {"status": "started", "paths": request.paths}
+
+
+@app.get("/ingest/status")
+async def ingestion_status():
+    """Progress and throughput of the latest ingestion run"""
+    pipeline = getattr(app.state, "ingestion", None)
+    if pipeline is None:
+        return {"status": "idle"}
+    return pipeline.stats.to_dict()
+
+
 if __name__ == "__main__":
     import uvicorn
+
     uvicorn.run(
-        "main:app", 
-        host="0.0.0.0", 
+        "main:app",
+        host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
-        reload=os.getenv("ENVIRONMENT") == "development"
-    )
\ No newline at end of file
+        reload=os.getenv("ENVIRONMENT") == "development",
+    )
@@ -2,10 +2,13 @@
 Pydantic models for the chatbot
 """
 
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, Field
 from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
 
 class IntentType(str, Enum):
     GENERAL = "general"
@@ -13,6 +16,7 @@ class IntentType(str, Enum):
     ENROLLMENT = "enrollment"
     SCHEDULING = "scheduling"
 
+
 class ChatMessage(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
     session_id: str = Field(..., min_length=1, max_length=255)
@@ -20,6 +24,7 @@ class ChatMessage(BaseModel):
     timestamp: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
+
 class ChatResponse(BaseModel):
     message: str
     session_id: str
@@ -29,14 +34,25 @@ class ChatResponse(BaseModel):
     sources: Optional[List[Dict[str, str]]] = Field(default_factory=list)
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
+
 class FeedbackRequest(BaseModel):
     conversation_id: str
     rating: int = Field(..., ge=-1, le=1)
     comment: Optional[str] = None
 
+
 class AppointmentRequest(BaseModel):
-    user_id: str
+    user_id: uuid.UUID
+    # The caller's chat session, which must belong to user_id
+    session_id: str
     preferred_time: str
     phone_number: str
     appointment_type: Optional[str] = "consultation"
-    notes: Optional[str] = None
\ No newline at end of file
+    notes: Optional[str] = None
+
+
+class IngestionRequest(BaseModel):
+    paths: List[str] = Field(default_factory=lambda: ["uploads"])
+    batch_size: int = Field(32, ge=1, le=256)
+    concurrency: int = Field(4, ge=1, le=32)
+    reset: bool = False
@@ -1,24 +1,422 @@
 """
-Monitoring Service placeholder
+Monitoring Service - low-overhead in-process metrics with Prometheus exposition
+Each worker records into its own registry; with METRICS_DIR set, workers write periodic
+snapshots there and /metrics aggregates every live worker's snapshot.
 """
 
+import asyncio
+import bisect
+import glob
+import json
 import logging
-from datetime import datetime
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, LabelKey]
+Collector = Callable[[], Iterable[Tuple[str, Dict, float]]]
+
+# How a gauge's per-worker values combine at /metrics: "sum" for quantities that add up
+# across workers (in-flight requests, connections), "max" for flags, and "worker" to keep
+# one series per worker under a worker="<pid>" label
+GAUGE_AGGREGATIONS = ("sum", "max", "worker")
+
+
+class Histogram:
+    """Fixed-bucket histogram; bounds are inclusive upper edges"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds: List[float] = sorted(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if n and cumulative + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.bounds[-1]
+
+    def merge(self, other: "Histogram"):
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def snapshot(self) -> Dict:
+        """Bucket counts keyed by upper bound, plus count and sum"""
+        buckets = {str(bound): n for bound, n in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+    def to_state(self) -> Dict:
+        return {"bounds": self.bounds, "counts": self.counts, "count": self.count, "sum": self.sum}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "Histogram":
+        histogram = cls(state["bounds"])
+        histogram.counts = list(state["counts"])
+        histogram.count = state["count"]
+        histogram.sum = state["sum"]
+        return histogram
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [
+        k + '="' + v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for k, v in labels
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, labels), plus scrape-time collectors
+
+    Collectors report counters or gauges; gauges go up and down and are never summed
+    across workers unless registered with aggregate="sum".
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.counters: Dict[MetricKey, float] = {}
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self.help: Dict[str, str] = {}
+        self._collectors: List[Tuple[Collector, str]] = []
+        self._gauge_collectors: List[Tuple[Collector, str]] = []
+
+    def describe(self, name: str, help_text: str):
+        self.help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None):
+        key = (name, _label_key(labels))
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        buckets: Optional[Sequence[float]] = None,
+    ):
+        key = (name, _label_key(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets or self.latency_buckets)
+        histogram.observe(value)
+
+    def histogram(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Optional[Histogram]:
+        return self.histograms.get((name, _label_key(labels)))
+
+    def register_collector(
+        self, collector: Collector, kind: str = "counter", aggregate: str = "worker"
+    ):
+        """Add a callable returning (name, labels, value) rows at scrape time
+
+        kind is "counter" or "gauge"; aggregate (one of GAUGE_AGGREGATIONS) applies to gauges.
+        """
+        if kind == "counter":
+            self._collectors.append((collector, kind))
+        elif kind == "gauge":
+            if aggregate not in GAUGE_AGGREGATIONS:
+                raise ValueError(f"Unknown gauge aggregation: {aggregate}")
+            self._gauge_collectors.append((collector, aggregate))
+        else:
+            raise ValueError(f"Unknown collector kind: {kind}")
+
+    def clear(self):
+        self.counters.clear()
+        self.histograms.clear()
+        self._collectors.clear()
+        self._gauge_collectors.clear()
+
+    @staticmethod
+    def _collect(collectors: List[Tuple[Collector, str]]) -> Iterable[Tuple[str, Dict, float, str]]:
+        for collector, mode in collectors:
+            try:
+                rows = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, labels, value in rows:
+                yield name, labels, value, mode
+
+    def state(self) -> Dict:
+        """Serialisable view of every metric, including collector values"""
+        counters = dict(self.counters)
+        for name, labels, value, _ in self._collect(self._collectors):
+            key = (name, _label_key(labels))
+            counters[key] = counters.get(key, 0.0) + value
+        return {
+            "pid": os.getpid(),
+            "counters": [
+                [name, list(map(list, labels)), value] for (name, labels), value in counters.items()
+            ],
+            "gauges": [
+                [name, list(map(list, _label_key(labels))), float(value), mode]
+                for name, labels, value, mode in self._collect(self._gauge_collectors)
+            ],
+            "histograms": [
+                [name, list(map(list, labels)), histogram.to_state()]
+                for (name, labels), histogram in self.histograms.items()
+            ],
+            "help": self.help,
+        }
+
+    @staticmethod
+    def aggregate(states: Iterable[Dict]) -> Dict:
+        """Sum counters, merge histograms and combine gauges across worker states"""
+        counters: Dict[MetricKey, float] = {}
+        gauges: Dict[MetricKey, float] = {}
+        histograms: Dict[MetricKey, Histogram] = {}
+        help_text: Dict[str, str] = {}
+        for state in states:
+            help_text.update(state.get("help", {}))
+            for name, labels, value in state["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            worker = ("worker", str(state.get("pid", "")))
+            for name, labels, value, mode in state.get("gauges", []):
+                labels = tuple(map(tuple, labels))
+                if mode == "worker":
+                    labels = tuple(sorted(labels + (worker,)))
+                key = (name, labels)
+                if key not in gauges:
+                    gauges[key] = value
+                elif mode == "sum":
+                    gauges[key] += value
+                else:
+                    gauges[key] = max(gauges[key], value)
+            for name, labels, hist_state in state["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                incoming = Histogram.from_state(hist_state)
+                if key in histograms:
+                    histograms[key].merge(incoming)
+                else:
+                    histograms[key] = incoming
+        return {
+            "counters": [[n, list(map(list, l)), v] for (n, l), v in counters.items()],
+            "gauges": [[n, list(map(list, l)), v] for (n, l), v in gauges.items()],
+            "histograms": [
+                [n, list(map(list, l)), h.to_state()] for (n, l), h in histograms.items()
+            ],
+            "help": help_text,
+        }
+
+    @staticmethod
+    def render_prometheus(state: Dict) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        help_text = state.get("help", {})
+
+        for kind, rows in (("counter", state["counters"]), ("gauge", state.get("gauges", []))):
+            grouped: Dict[str, List] = {}
+            for name, labels, value, *_ in rows:
+                grouped.setdefault(name, []).append((labels, value))
+            for name in sorted(grouped):
+                if name in help_text:
+                    lines.append(f"# HELP {name} {help_text[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(grouped[name]):
+                    lines.append(f"{name}{_format_labels(map(tuple, labels))} {value:g}")
+
+        grouped = {}
+        for name, labels, hist_state in state["histograms"]:
+            grouped.setdefault(name, []).append((labels, hist_state))
+        for name in sorted(grouped):
+            if name in help_text:
+                lines.append(f"# HELP {name} {help_text[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist_state in sorted(grouped[name], key=lambda item: item[0]):
+                labels = [tuple(label) for label in labels]
+                cumulative = 0
+                for bound, n in zip(hist_state["bounds"] + ["+Inf"], hist_state["counts"]):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {hist_state['sum']:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {hist_state['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by every component
+metrics = MetricsRegistry()
+
+
 class MonitoringService:
-    def __init__(self):
-        self.metrics = {}
-    
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.metrics = registry or metrics
+        self.metrics_dir = os.getenv("METRICS_DIR")
+        self.snapshot_interval = float(os.getenv("METRICS_SNAPSHOT_INTERVAL_SECONDS", "5"))
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+        self.metrics.describe("chat_response_time_ms", "End-to-end chat turn latency by agent")
+        self.metrics.describe("http_request_duration_ms", "HTTP request latency by endpoint")
+        self.metrics.describe("http_requests_total", "HTTP requests by endpoint and status")
+
     async def log_interaction(self, user_id: str, agent_type: str, response_time: float):
         """Log user interaction"""
-        logger.info(f"Interaction: {user_id} | {agent_type} | {response_time}ms")
-    
+        self.metrics.observe("chat_response_time_ms", response_time, {"agent_type": agent_type})
+        logger.debug(f"Interaction: {user_id} | {agent_type} | {response_time}ms")
+
+    def latency_summary(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Dict:
+        """p50/p95/p99 for one histogram series"""
+        histogram = self.metrics.histogram(name, labels)
+        if histogram is None:
+            return {"count": 0, "p50": None, "p95": None, "p99": None}
+        return {
+            "count": histogram.count,
+            "p50": histogram.quantile(0.50),
+            "p95": histogram.quantile(0.95),
+            "p99": histogram.quantile(0.99),
+        }
+
     async def get_comprehensive_stats(self):
         """Get system statistics"""
+        total = 0
+        total_time = 0.0
+        by_agent = {}
+        for (name, labels), histogram in list(self.metrics.histograms.items()):
+            if name != "chat_response_time_ms":
+                continue
+            total += histogram.count
+            total_time += histogram.sum
+            by_agent[dict(labels).get("agent_type", "unknown")] = self.latency_summary(
+                name, dict(labels)
+            )
         return {
-            "total_interactions": 0,
-            "avg_response_time": 0,
-            "system_health": "healthy"
-        }
\ No newline at end of file
+            "total_interactions": total,
+            "avg_response_time": total_time / total if total else 0,
+            "response_time_by_agent": by_agent,
+            "system_health": "healthy",
+        }
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.metrics_dir, f"metrics_{pid}.json")
+
+    def write_snapshot(self):
+        """Publish this worker's metrics for aggregation by other workers"""
+        if not self.metrics_dir:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics.state(), f)
+        os.replace(tmp_path, path)
+
+    def collect_state(self) -> Dict:
+        """This worker's live metrics merged with every other live worker's snapshot"""
+        states = [self.metrics.state()]
+        if self.metrics_dir:
+            own = self._snapshot_path(os.getpid())
+            for path in glob.glob(os.path.join(self.metrics_dir, "metrics_*.json")):
+                if path == own or not _pid_alive(path):
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        states.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+        return MetricsRegistry.aggregate(states)
+
+    def render_prometheus(self) -> str:
+        return MetricsRegistry.render_prometheus(self.collect_state())
+
+    def start_snapshot_writer(self):
+        if self.metrics_dir and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def _snapshot_loop(self):
+        while True:
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
+            await asyncio.sleep(self.snapshot_interval)
+
+    async def close(self):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        if self.metrics_dir:
+            try:
+                os.remove(self._snapshot_path(os.getpid()))
+            except OSError:
+                pass
+
+
+def _pid_alive(path: str) -> bool:
+    try:
+        pid = int(os.path.basename(path)[len("metrics_") : -len(".json")])
+        os.kill(pid, 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and status per endpoint"""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = scope.get("endpoint")
+            name = getattr(
+                endpoint, "__name__", type(endpoint).__name__ if endpoint else "unmatched"
+            )
+            self.registry.observe(
+                "http_request_duration_ms",
+                (time.perf_counter() - started) * 1000,
+                {"endpoint": name},
+            )
+            self.registry.inc(
+                "http_requests_total", 1, {"endpoint": name, "status": status["code"]}
+            )
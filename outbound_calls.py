@@ -0,0 +1,302 @@
+"""
+Outbound call queue - persistent SQLite job queue drained by a rate-limited worker pool
+Jobs survive restarts and are claimed under a lease, so a job held by a live process is
+never dialed twice and one held by a dead process is retried once its lease expires.
+Dial times are reserved in the same file, so the rate (Twilio accounts default to one call
+per second) holds across every process sharing the queue; failed dials are retried with
+exponential backoff.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+
+class OutboundCallQueue:
+    """Durable FIFO of call jobs with per-job retry scheduling and claim leases"""
+
+    def __init__(self, path: str, lease_seconds: float = 300.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbound_calls (
+                id TEXT PRIMARY KEY,
+                to_number TEXT NOT NULL,
+                twiml TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                call_sid TEXT,
+                last_error TEXT,
+                claimed_at REAL
+            )
+        """
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(outbound_calls)")}
+        if "claimed_at" not in columns:
+            self._db.execute("ALTER TABLE outbound_calls ADD COLUMN claimed_at REAL")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS outbound_calls_due "
+            "ON outbound_calls (status, next_attempt_at)"
+        )
+        # Single row holding the next free dial time, shared by every process
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbound_rate (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                next_slot REAL NOT NULL
+            )
+        """
+        )
+        self._db.execute("INSERT OR IGNORE INTO outbound_rate (id, next_slot) VALUES (0, 0)")
+        self._db.commit()
+
+    def enqueue(
+        self,
+        to_number: str,
+        twiml: str,
+        payload: Optional[Dict] = None,
+        not_before: Optional[float] = None,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbound_calls "
+                "(id, to_number, twiml, payload, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    to_number,
+                    twiml,
+                    json.dumps(payload or {}),
+                    PENDING,
+                    not_before or now,
+                    now,
+                ),
+            )
+            self._db.commit()
+        return job_id
+
+    def claim(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest due job, or one whose claim lease has expired"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE outbound_calls SET status = ?, attempts = attempts + 1, claimed_at = ? "
+                "WHERE id = (SELECT id FROM outbound_calls "
+                "WHERE (status = ? AND next_attempt_at <= ?) "
+                "OR (status = ? AND (claimed_at IS NULL OR claimed_at <= ?)) "
+                "ORDER BY next_attempt_at LIMIT 1) RETURNING *",
+                (IN_PROGRESS, now, PENDING, now, IN_PROGRESS, now - self.lease_seconds),
+            ).fetchone()
+            self._db.commit()
+        return dict(row) if row is not None else None
+
+    def reserve_slot(self, interval: float, now: Optional[float] = None) -> float:
+        """Reserve the next dial time; slots are interval apart across all processes"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE outbound_rate SET next_slot = MAX(next_slot, ?) + ? WHERE id = 0 "
+                "RETURNING next_slot",
+                (now, interval),
+            ).fetchone()
+            self._db.commit()
+        return row[0] - interval
+
+    def complete(self, job_id: str, call_sid: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbound_calls SET status = ?, call_sid = ?, last_error = NULL "
+                "WHERE id = ?",
+                (DONE, call_sid, job_id),
+            )
+            self._db.commit()
+
+    def fail(self, job_id: str, error: str, retry_at: Optional[float] = None):
+        """Reschedule the job, or mark it failed when retry_at is None"""
+        status = PENDING if retry_at is not None else FAILED
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbound_calls SET status = ?, last_error = ?, next_attempt_at = ? "
+                "WHERE id = ?",
+                (status, error, retry_at or time.time(), job_id),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM outbound_calls WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def next_due_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM outbound_calls WHERE status = ?", (PENDING,)
+            ).fetchone()
+        return row[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM outbound_calls GROUP BY status"
+            ).fetchall()
+        counts = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TwilioCallClient:
+    """Places calls with the Twilio REST API (the SDK is synchronous, so in a thread)"""
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        from twilio.rest import Client
+
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+
+    async def create_call(self, to_number: str, twiml: str) -> str:
+        call = await asyncio.to_thread(
+            self.client.calls.create, to=to_number, from_=self.from_number, twiml=twiml
+        )
+        return call.sid
+
+
+class OutboundCallWorkerPool:
+    """Worker tasks that claim due jobs, wait for a reserved dial slot and dial
+
+    calls_per_second is the total for every process sharing the queue file, not per worker.
+    Queue calls can wait on another process's SQLite lock, so they run in threads.
+    """
+
+    def __init__(
+        self,
+        queue: OutboundCallQueue,
+        client,
+        workers: int = 4,
+        calls_per_second: float = 1.0,
+        max_attempts: int = 3,
+        backoff_seconds: float = 30.0,
+        poll_interval: float = 1.0,
+    ):
+        self.queue = queue
+        self.client = client
+        self.workers = workers
+        self.interval = 1.0 / calls_per_second
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    def notify(self):
+        """Wake idle workers after an enqueue"""
+        self._wakeup.set()
+
+    async def _worker(self, number: int):
+        while not self._stopping:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                slot = await asyncio.to_thread(self.queue.reserve_slot, self.interval)
+                await asyncio.sleep(max(0.0, slot - time.time()))
+            except asyncio.CancelledError:
+                await asyncio.to_thread(
+                    self.queue.fail, job["id"], "Worker stopped", retry_at=time.time()
+                )
+                raise
+            await self._dial(job)
+
+    async def _dial(self, job: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            call_sid = await self.client.create_call(job["to_number"], job["twiml"])
+        except asyncio.CancelledError:
+            await asyncio.to_thread(
+                self.queue.fail, job["id"], "Worker stopped", retry_at=time.time()
+            )
+            raise
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                await asyncio.to_thread(self.queue.fail, job["id"], str(e))
+                metrics.inc("outbound_calls_total", labels={"status": "failed"})
+                logger.error(f"Outbound call {job['id']} failed permanently: {e}")
+            else:
+                delay = self.backoff_seconds * 2 ** (job["attempts"] - 1)
+                delay *= random.uniform(0.8, 1.2)
+                await asyncio.to_thread(
+                    self.queue.fail, job["id"], str(e), retry_at=time.time() + delay
+                )
+                metrics.inc("outbound_calls_total", labels={"status": "retry"})
+                logger.warning(f"Outbound call {job['id']} failed, retrying in {delay:.0f}s: {e}")
+            return
+        finally:
+            metrics.observe("outbound_call_latency_ms", (time.perf_counter() - started) * 1000)
+
+        await asyncio.to_thread(self.queue.complete, job["id"], call_sid)
+        metrics.inc("outbound_calls_total", labels={"status": "completed"})
+
+    async def drain(self, timeout: float = 30.0):
+        """Wait until no job is pending or in progress and due now"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # Due time first: a claim landing in between then shows up as in progress
+            due = await asyncio.to_thread(self.queue.next_due_at)
+            counts = await asyncio.to_thread(self.queue.counts)
+            if counts[IN_PROGRESS] == 0 and (due is None or due > time.time()):
+                return
+            await asyncio.sleep(0.01)
+
+    async def close(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,352 @@
+"""
+Quantized vector index - int8 or 1-bit codes in RAM, full-precision rows on disk
+Candidates are found with vectorized int8 dot products or Hamming distance over the
+codes, then reranked exactly against float32 rows read from a memory-mapped file.
+Uses the same versioned layout as LocalVectorIndex, so either can load a directory the
+other saved; a loaded version's codes are memory-mapped and shared between workers.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from index_versions import (
+    is_mapped,
+    lookup_rows,
+    open_rows,
+    publish,
+    read_header,
+    resolve,
+    write_header,
+    write_rows,
+)
+from vector_index import METADATA_FILE, VECTORS_FILE
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("int8", "binary")
+CODES_FILE = "codes_{}.npy"
+SCALES_FILE = "scales_int8.npy"
+
+# Rows decoded per step when scanning codes, bounding temporary memory
+BLOCK_ROWS = 1024
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class QuantizedVectorIndex:
+    """Approximate candidate search over compact codes with an exact float rerank"""
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        quantization: str = "int8",
+        rerank_candidates: int = 100,
+        initial_capacity: int = 1024,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.dimension = dimension
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+
+        capacity = max(initial_capacity, 1)
+        if quantization == "int8":
+            self._codes = np.zeros((capacity, dimension), dtype=np.int8)
+        else:
+            self._codes = np.zeros((capacity, (dimension + 7) // 8), dtype=np.uint8)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+
+        # Saved full-precision rows (memory-mapped) plus rows changed since the last save
+        self._full: Optional[np.ndarray] = None
+        self._pending: Dict[int, np.ndarray] = {}
+
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._positions
+
+    @property
+    def resident_bytes(self) -> int:
+        """RAM held for vectors: the codes, their scales and unsaved float rows"""
+        size = len(self._ids)
+        scales = self._scales[:size].nbytes if self.quantization == "int8" else 0
+        return self._codes[:size].nbytes + scales + len(self._pending) * self.dimension * 4
+
+    def _normalise(self, vectors: Any) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[np.newaxis, :]
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}"
+            )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Codes and per-row scales (scales are unused for binary codes)"""
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=1), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, np.newaxis]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _make_writable(self):
+        """Copy memory-mapped codes and rows into RAM before the first modification"""
+        if not is_mapped(self._ids):
+            return
+        size = len(self._ids)
+        codes = np.zeros((max(size, 1), self._codes.shape[1]), dtype=self._codes.dtype)
+        codes[:size] = self._codes[:size]
+        scales = np.zeros(max(size, 1), dtype=np.float32)
+        scales[:size] = self._scales[:size]
+        self._codes, self._scales = codes, scales
+        self._ids = list(self._ids)
+        self._metadata = list(self._metadata)
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+
+    def _ensure_capacity(self, required: int):
+        capacity = self._codes.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        size = len(self._ids)
+        codes = np.zeros((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+        codes[:size] = self._codes[:size]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:size] = self._scales[:size]
+        self._codes, self._scales = codes, scales
+
+    def _full_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Exact float32 rows, from pending writes or the memory-mapped file"""
+        out = np.empty((len(rows), self.dimension), dtype=np.float32)
+        on_disk = []
+        for i, row in enumerate(rows):
+            pending = self._pending.get(int(row))
+            if pending is not None:
+                out[i] = pending
+            else:
+                on_disk.append(i)
+        if on_disk:
+            on_disk = np.asarray(on_disk)
+            # Sorted reads touch each mapped page once
+            order = np.argsort(rows[on_disk])
+            out[on_disk[order]] = self._full[rows[on_disk][order]]
+        return out
+
+    def upsert(self, ids: List[str], vectors: Any, metadata: Optional[List[Dict[str, Any]]] = None):
+        """Insert or overwrite rows for the given chunk ids"""
+        if not ids:
+            return
+        normalised = self._normalise(vectors)
+        if len(ids) != normalised.shape[0]:
+            raise ValueError("ids and vectors must have the same length")
+        metadata = metadata or [{} for _ in ids]
+        codes, scales = self._encode(normalised)
+
+        self._make_writable()
+        self._ensure_capacity(len(self._ids) + len(ids))
+        for chunk_id, row, code, scale, meta in zip(ids, normalised, codes, scales, metadata):
+            position = self._positions.get(chunk_id)
+            if position is None:
+                position = len(self._ids)
+                self._positions[chunk_id] = position
+                self._ids.append(chunk_id)
+                self._metadata.append(meta)
+            else:
+                self._metadata[position] = meta
+            self._codes[position] = code
+            self._scales[position] = scale
+            self._pending[position] = row
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove rows by swapping the last row into the freed slot"""
+        self._make_writable()
+        removed = 0
+        for chunk_id in ids:
+            position = self._positions.pop(chunk_id, None)
+            if position is None:
+                continue
+            last = len(self._ids) - 1
+            if position != last:
+                self._pending[position] = self._full_rows(np.array([last]))[0]
+                self._codes[position] = self._codes[last]
+                self._scales[position] = self._scales[last]
+                self._ids[position] = self._ids[last]
+                self._metadata[position] = self._metadata[last]
+                self._positions[self._ids[position]] = position
+            self._pending.pop(last, None)
+            self._ids.pop()
+            self._metadata.pop()
+            removed += 1
+        return removed
+
+    def _approximate_scores(
+        self, query: np.ndarray, codes: np.ndarray, scales: np.ndarray
+    ) -> np.ndarray:
+        if self.quantization == "binary":
+            query_bits = np.packbits(query > 0)
+            distance = _POPCOUNT[np.bitwise_xor(codes, query_bits)].sum(axis=1, dtype=np.int32)
+            return -distance.astype(np.float32)
+        return (codes.astype(np.float32) @ query) * scales
+
+    def search(
+        self, query_vector: Any, top_k: int = 5, candidates: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float, Dict]]:
+        """Return (chunk_id, score, metadata) for the top_k most similar rows
+
+        Scores are exact cosine similarities of the reranked candidates.
+        """
+        size = len(self._ids)
+        if size == 0 or top_k <= 0:
+            return []
+
+        query = self._normalise(query_vector)[0]
+        if candidates is None:
+            rows = np.arange(size)
+            codes, scales = self._codes[:size], self._scales[:size]
+            approximate = np.concatenate(
+                [
+                    self._approximate_scores(
+                        query, codes[start : start + BLOCK_ROWS], scales[start : start + BLOCK_ROWS]
+                    )
+                    for start in range(0, size, BLOCK_ROWS)
+                ]
+            )
+        else:
+            rows = lookup_rows(self._positions, candidates)
+            if rows.size == 0:
+                return []
+            approximate = self._approximate_scores(query, self._codes[rows], self._scales[rows])
+
+        shortlist_size = min(max(self.rerank_candidates, top_k), rows.size)
+        if shortlist_size < rows.size:
+            shortlist = rows[np.argpartition(-approximate, shortlist_size - 1)[:shortlist_size]]
+        else:
+            shortlist = rows
+        exact = self._full_rows(shortlist) @ query
+
+        k = min(top_k, shortlist.size)
+        if k < shortlist.size:
+            selected = np.argpartition(-exact, k - 1)[:k]
+        else:
+            selected = np.arange(shortlist.size)
+        ranked = selected[np.argsort(-exact[selected], kind="stable")]
+        return [
+            (self._ids[shortlist[i]], float(exact[i]), self._metadata[shortlist[i]]) for i in ranked
+        ]
+
+    def write(self, directory: str):
+        """Write rows, codes and metadata into directory (a version, or a part of one)"""
+        size = len(self._ids)
+        full = np.lib.format.open_memmap(
+            os.path.join(directory, VECTORS_FILE),
+            mode="w+",
+            dtype=np.float32,
+            shape=(size, self.dimension),
+        )
+        for start in range(0, size, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, size)
+            full[start:stop] = self._full_rows(np.arange(start, stop))
+        full.flush()
+        del full
+        np.save(
+            os.path.join(directory, CODES_FILE.format(self.quantization)),
+            np.ascontiguousarray(self._codes[:size]),
+        )
+        if self.quantization == "int8":
+            np.save(os.path.join(directory, SCALES_FILE), np.ascontiguousarray(self._scales[:size]))
+        write_rows(directory, self._ids, self._metadata)
+        write_header(directory, {"dimension": self.dimension, "count": size})
+
+    def save(self, path: str) -> str:
+        """Publish rows, codes and metadata as a new version; returns its directory
+
+        Afterwards full rows are served from the saved file.
+        """
+        size = len(self._ids)
+        directory = publish(path, self.write)
+        self._full = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        self._pending.clear()
+        logger.info(f"Saved {self.quantization} vector index with {size} vectors to {directory}")
+        return directory
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        dimension: int = 1024,
+        quantization: str = "int8",
+        rerank_candidates: int = 100,
+    ) -> "QuantizedVectorIndex":
+        """Open the current version (quantized or LocalVectorIndex), or an empty index
+
+        Saved codes are memory-mapped; a version without codes for this quantization
+        is encoded block by block into RAM.
+        """
+        directory = resolve(path)
+        index = cls(
+            dimension=dimension, quantization=quantization, rerank_candidates=rerank_candidates
+        )
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        header = read_header(directory)
+        if header is not None:
+            stored_dimension = header["dimension"]
+            ids, metadata, positions = open_rows(directory)
+        elif os.path.exists(vectors_path) and os.path.exists(
+            os.path.join(directory, METADATA_FILE)
+        ):
+            with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            stored_dimension = stored.get("dimension", dimension)
+            ids, metadata = list(stored["ids"]), list(stored["metadata"])
+            positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        else:
+            return index
+        if stored_dimension != dimension:
+            raise ValueError(
+                f"Index at {path} has dimension {stored_dimension}, expected {dimension}"
+            )
+        full = np.load(vectors_path, mmap_mode="r")
+        size = len(ids)
+
+        codes_path = os.path.join(directory, CODES_FILE.format(quantization))
+        scales_path = os.path.join(directory, SCALES_FILE)
+        codes = np.load(codes_path, mmap_mode="r") if os.path.exists(codes_path) else None
+        scales = np.ones(size, dtype=np.float32)
+        if quantization == "int8":
+            scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+        if codes is None or scales is None or len(codes) != size or len(scales) != size:
+            # No codes for this quantization yet: encode the saved rows block by block
+            logger.info(f"Encoding {size} vectors at {directory} as {quantization}")
+            encoded = [
+                index._encode(np.asarray(full[start : start + BLOCK_ROWS]))
+                for start in range(0, size, BLOCK_ROWS)
+            ]
+            codes = np.concatenate([c for c, _ in encoded]) if encoded else index._codes[:0]
+            scales = np.concatenate([s for _, s in encoded]) if encoded else scales
+
+        if is_mapped(ids):
+            index._codes, index._scales = codes, scales
+        else:
+            index._ensure_capacity(size)
+            index._codes[:size] = codes
+            index._scales[:size] = scales
+        index._full = full
+        index._ids, index._metadata, index._positions = ids, metadata, positions
+        logger.info(
+            f"Loaded {quantization} vector index with {len(index)} vectors from {directory}"
+        )
+        return index
@@ -0,0 +1,108 @@
+"""
+Semantic answer cache keyed by query embedding
+A new query whose cosine similarity to a cached query clears the threshold reuses its answer
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Bounded, TTL-expiring nearest-neighbour cache of recent answers"""
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 512,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._embeddings = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._answers: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._generation: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalise(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_generation(self, generation: Optional[int]):
+        # Re-ingestion bumps the store generation; cached answers may cite stale content
+        if generation != self._generation:
+            if self._generation is not None:
+                self.invalidate()
+            self._generation = generation
+
+    def lookup(
+        self, embedding: Any, generation: Optional[int] = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (answer, similarity) for the closest live entry above threshold"""
+        self._check_generation(generation)
+        now = time.monotonic()
+        live = self._expires_at > now
+        if not live.any():
+            self.misses += 1
+            return None
+
+        scores = self._embeddings @ self._normalise(embedding)
+        scores[~live] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self._last_used[best] = now
+        self.hits += 1
+        return self._answers[best], float(scores[best])
+
+    def store(self, embedding: Any, answer: Dict[str, Any], generation: Optional[int] = None):
+        """Cache an answer, evicting an expired or least recently used slot if full"""
+        self._check_generation(generation)
+        now = time.monotonic()
+        free = np.flatnonzero(self._expires_at <= now)
+        if free.size:
+            slot = int(free[0])
+            if self._answers[slot] is not None:
+                self.evictions += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        self._embeddings[slot] = self._normalise(embedding)
+        self._answers[slot] = answer
+        self._expires_at[slot] = now + self.ttl_seconds
+        self._last_used[slot] = now
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        self._expires_at[:] = 0
+        self._answers = [None] * self.max_entries
+        logger.info("Semantic answer cache invalidated")
+
+    def __len__(self) -> int:
+        return int((self._expires_at > time.monotonic()).sum())
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+"""
+Startup helpers - per-component timing, lazy components and readiness state
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTracker:
+    """Records how long each component took to start and whether the app is ready"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.timings_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready = False
+        self.ready_after_ms: Optional[float] = None
+
+    async def run(self, component: str, awaitable: Awaitable) -> Any:
+        """Await one initializer, recording its duration even if it fails"""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        except Exception as e:
+            self.errors[component] = str(e)
+            raise
+        finally:
+            self.record(component, started)
+
+    def record(self, component: str, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.timings_ms[component] = round(elapsed_ms, 2)
+        metrics.observe("startup_duration_ms", elapsed_ms, {"component": component})
+
+    async def gather(self, **initializers: Awaitable):
+        """Run independent initializers concurrently; raise the first failure once all settle"""
+        results = await asyncio.gather(
+            *(self.run(name, aw) for name, aw in initializers.items()), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after_ms = round((time.perf_counter() - self.started_at) * 1000, 2)
+        slowest = sorted(self.timings_ms.items(), key=lambda item: -item[1])
+        logger.info(
+            f"Ready after {self.ready_after_ms:.0f}ms; "
+            + ", ".join(f"{name}={ms:.0f}ms" for name, ms in slowest)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "ready_after_ms": self.ready_after_ms,
+            "components_ms": dict(self.timings_ms),
+            "errors": dict(self.errors),
+        }
+
+
+class LazyComponent:
+    """Imports and constructs a component on first attribute access"""
+
+    def __init__(self, module: str, class_name: str, *args, **kwargs):
+        self._module = module
+        self._class_name = class_name
+        self._args = args
+        self._kwargs = kwargs
+        self._instance = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            started = time.perf_counter()
+            cls = getattr(importlib.import_module(self._module), self._class_name)
+            self._instance = cls(*self._args, **self._kwargs)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("startup_duration_ms", elapsed_ms, {"component": self._class_name})
+            logger.info(f"Lazily loaded {self._class_name} in {elapsed_ms:.0f}ms")
+        return self._instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
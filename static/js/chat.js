@@ -23,8 +23,10 @@ class ChatBot {
         this.addMessage(message, 'user');
         this.input.value = '';
         
+        const botMessage = this.addMessage('', 'bot');
+        
         try {
-            const response = await fetch('/chat', {
+            const response = await fetch('/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -35,10 +37,49 @@ class ChatBot {
                 })
             });
             
-            const data = await response.json();
-            this.addMessage(data.message, 'bot');
+            if (!response.ok || !response.body) {
+                throw new Error(`Chat request failed: ${response.status}`);
+            }
+            
+            await this.readEventStream(response.body, (event, data) => {
+                if (event === 'token') {
+                    botMessage.textContent += data.content;
+                } else if (event === 'final') {
+                    botMessage.textContent = data.message;
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+                this.messages.scrollTop = this.messages.scrollHeight;
+            });
         } catch (error) {
-            this.addMessage('Sorry, there was an error processing your message.', 'bot');
+            botMessage.textContent = 'Sorry, there was an error processing your message.';
+        }
+    }
+    
+    async readEventStream(body, onEvent) {
+        // Parse server-sent events ("event: x\ndata: {...}\n\n") as chunks arrive
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
         }
     }
     
@@ -48,6 +89,7 @@ class ChatBot {
         messageDiv.textContent = text;
         this.messages.appendChild(messageDiv);
         this.messages.scrollTop = this.messages.scrollHeight;
+        return messageDiv;
     }
 }
 
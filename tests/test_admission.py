@@ -0,0 +1,89 @@
+"""
+Tests for admission control
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority():
+    admission = AdmissionController(max_concurrent=1)
+    holder = await admission.acquire("chat")
+    order = []
+
+    async def request(priority):
+        async with admission.admit(priority):
+            order.append(priority)
+
+    tasks = [asyncio.create_task(request(p)) for p in ("batch", "chat", "telephony", "voice")]
+    await asyncio.sleep(0.01)
+    assert admission.stats()["queued"] == 4
+
+    holder.release()
+    await asyncio.gather(*tasks)
+    assert order == ["telephony", "voice", "chat", "batch"]
+    assert admission.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_session_limit_returns_429():
+    admission = AdmissionController(max_per_session=2)
+    first = await admission.acquire("chat", "s1")
+    await admission.acquire("chat", "s1")
+    with pytest.raises(Overloaded) as shed:
+        await admission.acquire("chat", "s1")
+    assert shed.value.status_code == 429
+    assert shed.value.retry_after >= 1
+
+    # Other sessions are unaffected, and releasing frees the session's slot
+    await admission.acquire("chat", "s2")
+    first.release()
+    first.release()
+    await admission.acquire("chat", "s1")
+    assert admission.in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_sheds_early_once_measured_delay_nears_budget():
+    admission = AdmissionController(max_concurrent=1, max_queue_delay_ms={"chat": 100})
+    holder = await admission.acquire("telephony")
+
+    # The first waiter runs out its budget and is shed at its deadline
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as shed:
+        await admission.acquire("chat", "s1")
+    assert shed.value.status_code == 503
+    assert time.monotonic() - started >= 0.1
+
+    # That measured delay makes the next arrival fail fast without queueing
+    started = time.monotonic()
+    with pytest.raises(Overloaded):
+        await admission.acquire("chat", "s1")
+    assert time.monotonic() - started < 0.01
+
+    # Higher classes have their own budget and still queue for the slot
+    call = asyncio.create_task(admission.acquire("telephony"))
+    await asyncio.sleep(0.01)
+    holder.release()
+    (await call).release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_do_not_leak_slots():
+    admission = AdmissionController(max_concurrent=1, max_per_session=1)
+    holder = await admission.acquire("chat")
+    waiting = asyncio.create_task(admission.acquire("voice", "s1"))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    holder.release()
+    assert admission.in_flight == 0
+    (await admission.acquire("voice", "s1")).release()
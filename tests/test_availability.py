@@ -0,0 +1,176 @@
+import asyncio
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+import asyncpg
+import pytest
+
+from agents.scheduler_agent import SchedulerAgent
+from availability import AvailabilityIndex
+
+SYDNEY = ZoneInfo("Australia/Sydney")
+MONDAY = date(2024, 3, 4)
+
+
+def make_index(advisors=("a", "b"), **kwargs):
+    return AvailabilityIndex(
+        advisors,
+        time(9),
+        time(17),
+        {0, 1, 2, 3, 4},
+        SYDNEY,
+        slot_minutes=30,
+        horizon_days=14,
+        today=MONDAY,
+        **kwargs,
+    )
+
+
+def at(day, hour, minute=0):
+    return datetime(2024, 3, day, hour, minute, tzinfo=SYDNEY)
+
+
+def test_next_free_skips_taken_slots_weekends_and_full_days():
+    index = make_index(advisors=("a",))
+    assert index.next_free(at(4, 8, 10)) == [("a", at(4, 9))]
+    assert index.next_free(at(4, 9, 10)) == [("a", at(4, 9, 30))]
+
+    assert index.reserve("a", at(4, 9, 30))
+    assert not index.reserve("a", at(4, 9, 30))
+    assert index.next_free(at(4, 9, 10)) == [("a", at(4, 10))]
+
+    # Friday fully booked: the next slot is Monday morning
+    for slot in index.free_slots(date(2024, 3, 8)):
+        assert index.reserve("a", slot)
+    assert index.next_free(at(8, 9)) == [("a", at(11, 9))]
+
+    index.release("a", at(8, 16, 30))
+    assert index.next_free(at(8, 9)) == [("a", at(8, 16, 30))]
+
+
+def test_slots_outside_business_hours_are_rejected():
+    index = make_index()
+    with pytest.raises(ValueError):
+        index.reserve("a", at(4, 17))
+    with pytest.raises(ValueError):
+        index.reserve("a", at(9, 10))  # Saturday
+    with pytest.raises(ValueError):
+        index.is_free("a", at(4, 10, 15))
+
+
+def test_any_advisor_search_and_load():
+    index = make_index()
+    assert index.load([("a", at(4, 9)), ("zz", at(4, 9)), ("b", at(30, 9))]) == 1
+    assert index.next_free(at(4, 9), limit=3) == [
+        ("b", at(4, 9)),
+        ("a", at(4, 9, 30)),
+        ("b", at(4, 9, 30)),
+    ]
+    assert at(4, 9) in index.free_slots(MONDAY)
+    assert at(4, 9) not in index.free_slots(MONDAY, advisor="a")
+    assert index.stats()["booked"] == 1
+
+
+class FakeDatabase:
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+        self.appointments = []
+
+    async def get_booked_appointments(self, since):
+        return [{"advisor_id": a, "starts_at": s} for a, s in self.taken if s >= since]
+
+    async def create_appointment(self, user_id, advisor_id, starts_at, ends_at, **kwargs):
+        await asyncio.sleep(0)
+        if (advisor_id, starts_at) in self.taken:
+            raise asyncpg.UniqueViolationError("duplicate key")
+        self.taken.add((advisor_id, starts_at))
+        appointment = {"advisor_id": advisor_id, "starts_at": starts_at, "ends_at": ends_at}
+        self.appointments.append(appointment)
+        return appointment
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bookings_never_double_book():
+    # Advisor "a" was booked by another worker after this index was loaded
+    db = FakeDatabase(taken={("a", at(5, 10))})
+    agent = SchedulerAgent(db, make_index())
+    results = await asyncio.gather(
+        *(
+            agent.book_appointment("user", at(5, 10).isoformat(), "+61400000000", now=at(4, 9))
+            for _ in range(3)
+        )
+    )
+
+    booked = [r["appointment"]["advisor_id"] for r in results if r["success"]]
+    assert booked == ["b"]
+    assert [r for r in results if not r["success"]][0]["alternatives"][0]["starts_at"] == (
+        at(5, 10, 30).isoformat()
+    )
+    assert not agent.availability.is_free("a", at(5, 10))
+
+
+@pytest.mark.asyncio
+async def test_database_decides_and_refresh_picks_up_other_workers():
+    db = FakeDatabase(taken={("a", at(5, 10))})
+    agent = SchedulerAgent(db, make_index(advisors=("a",)))
+    await agent.refresh(MONDAY)
+    assert not agent.availability.is_free("a", at(5, 10))
+    assert agent.availability.is_free("a", at(5, 11))
+
+    # Another worker cancels 10:00 and books 11:00
+    db.taken = {("a", at(5, 11))}
+    result = await agent.book_appointment("user", at(5, 10).isoformat(), "+614", now=at(4, 9))
+    assert result["success"]
+    await agent.refresh(MONDAY)
+    assert not agent.availability.is_free("a", at(5, 10))
+    assert not agent.availability.is_free("a", at(5, 11))
+    assert agent.availability.is_free("a", at(5, 12))
+
+
+@pytest.mark.asyncio
+async def test_unknown_advisor_is_rejected():
+    agent = SchedulerAgent(None, make_index())
+    with pytest.raises(ValueError, match="Unknown advisor"):
+        await agent.book_appointment(
+            "user", at(5, 10).isoformat(), "+614", now=at(4, 9), advisor_id="z"
+        )
+
+
+@pytest.mark.asyncio
+async def test_past_and_out_of_horizon_slots_are_rejected():
+    agent = SchedulerAgent(None, make_index())
+    with pytest.raises(ValueError, match="in the past"):
+        await agent.book_appointment("user", at(4, 9).isoformat(), "+614", now=at(4, 10, 5))
+    with pytest.raises(ValueError, match="days ahead"):
+        await agent.book_appointment("user", at(18, 9).isoformat(), "+614", now=at(4, 10))
+    result = await agent.book_appointment(
+        "user", at(4, 10, 30).isoformat(), "+614", now=at(4, 10, 5)
+    )
+    assert result["success"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Can I book a call?", [at(4, 10, 30), at(4, 11), at(4, 11, 30)]),
+        ("Anything on Thursday afternoon?", [at(7, 12), at(7, 12, 30), at(7, 13)]),
+        ("How about tomorrow at 3:30pm", [at(5, 15, 30), at(5, 16), at(5, 16, 30)]),
+        ("Do you have 16:30 on friday", [at(8, 16, 30)]),
+    ],
+)
+async def test_offers_follow_the_requested_day_and_time(message, expected):
+    agent = SchedulerAgent(None, make_index(advisors=("a",)))
+    result = await agent.handle_request({"message": message}, "user", now=at(4, 10, 5))
+    starts = [slot["starts_at"] for slot in result["metadata"]["slots"]]
+    assert starts == [start.isoformat() for start in expected]
+
+
+@pytest.mark.asyncio
+async def test_full_day_falls_back_to_the_next_free_times():
+    agent = SchedulerAgent(None, make_index(advisors=("a",)))
+    for slot in agent.availability.free_slots(date(2024, 3, 5)):
+        agent.availability.reserve("a", slot)
+    result = await agent.handle_request({"message": "tomorrow?"}, "user", now=at(4, 16, 10))
+    assert result["message"].startswith("There are no free times matching that.")
+    assert "Mon 4 Mar, 4:30 PM" in result["message"]
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+
+from connection_hub import CLOSE_TRY_AGAIN_LATER, ConnectionHub, InMemoryBroker, RedisBroker
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay=0.0):
+        self.send_delay = send_delay
+        self.sent = []
+        self.closed_with = None
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+async def wait_for_sent(websocket, count, timeout=1.0):
+    """Poll until the fake socket has been written count messages"""
+    await asyncio.wait_for(_sent(websocket, count), timeout)
+
+
+async def _sent(websocket, count):
+    while len(websocket.sent) < count:
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_messages_are_sent_in_order():
+    hub = ConnectionHub(queue_size=8)
+    websocket = FakeWebSocket()
+    connection = hub.register(websocket, "s1")
+    for i in range(5):
+        assert connection.send({"n": i})
+    await wait_for_sent(websocket, 5)
+    assert [m["n"] for m in websocket.sent] == list(range(5))
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_client_is_evicted_when_queue_fills():
+    hub = ConnectionHub(queue_size=2)
+    slow = FakeWebSocket(send_delay=10)
+    fast = FakeWebSocket()
+    slow_connection = hub.register(slow, "slow")
+    fast_connection = hub.register(fast, "fast")
+
+    results = [slow_connection.send({"n": i}) for i in range(5)]
+    fast_connection.send({"n": 0})
+    await asyncio.sleep(0.01)
+
+    assert results[-1] is False
+    assert slow.closed_with == CLOSE_TRY_AGAIN_LATER
+    assert "slow" not in hub
+    assert fast.sent == [{"n": 0}]
+    assert hub.stats()["slow_evictions"] >= 1
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_send_timeout_evicts_stalled_client():
+    hub = ConnectionHub(queue_size=8, send_timeout=0.01)
+    stalled = FakeWebSocket(send_delay=10)
+    connection = hub.register(stalled, "s1")
+    connection.send({"n": 0})
+    await asyncio.sleep(0.05)
+    assert connection.closed
+    assert stalled.closed_with == CLOSE_TRY_AGAIN_LATER
+
+
+@pytest.mark.asyncio
+async def test_reap_closes_idle_and_pings_active():
+    hub = ConnectionHub(idle_timeout=60)
+    idle, active = FakeWebSocket(), FakeWebSocket()
+    idle_connection = hub.register(idle, "idle")
+    hub.register(active, "active")
+    idle_connection.last_seen -= 120
+
+    hub.reap()
+    await asyncio.sleep(0.01)
+
+    assert idle_connection.closed
+    assert "idle" not in hub
+    assert active.sent == [{"type": "ping"}]
+    assert hub.stats()["idle_evictions"] == 1
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_session_on_another_worker():
+    broker = InMemoryBroker()
+    worker_a, worker_b = ConnectionHub(broker=broker), ConnectionHub(broker=broker)
+    await worker_a.start()
+    await worker_b.start()
+    websocket = FakeWebSocket()
+    connection = worker_b.register(websocket, "s1")
+
+    await worker_a.publish("s1", {"type": "notice", "text": "Your booking is confirmed"})
+    await worker_a.publish("other", {"type": "notice"})
+    await wait_for_sent(websocket, 1)
+
+    assert websocket.sent == [{"type": "notice", "text": "Your booking is confirmed"}]
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_publish_can_skip_the_originating_connection():
+    """A turn mirrored to other tabs is not echoed back to the tab that asked"""
+    broker = InMemoryBroker()
+    worker_a, worker_b = ConnectionHub(broker=broker), ConnectionHub(broker=broker)
+    await worker_a.start()
+    await worker_b.start()
+    asking, other_tab, remote_tab = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    origin = worker_a.register(asking, "s1")
+    worker_a.register(other_tab, "s1")
+    worker_b.register(remote_tab, "s1")
+
+    await worker_a.publish("s1", {"type": "turn"}, exclude=origin.id)
+    await asyncio.sleep(0.01)
+    assert asking.sent == [] and other_tab.sent == [{"type": "turn"}]
+    assert remote_tab.sent == [{"type": "turn"}]
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_eviction_closes_are_tracked_until_done():
+    """Background closes stay referenced by the hub instead of floating free"""
+    hub = ConnectionHub(queue_size=1)
+    connection = hub.register(FakeWebSocket(send_delay=10), "s1")
+    for i in range(3):
+        connection.send({"n": i})
+    assert hub._tasks
+    await asyncio.sleep(0.01)
+    assert connection.closed and not hub._tasks
+    await hub.close()
+
+
+class FlakyPubSub:
+    """Fails its first listen and the first resubscribe, then delivers one message"""
+
+    def __init__(self):
+        self.subscribe_failures = 1
+        self.subscribes = 0
+        self.listens = 0
+
+    async def psubscribe(self, pattern):
+        if self.subscribe_failures:
+            self.subscribe_failures -= 1
+            raise ConnectionError("redis is down")
+        self.subscribes += 1
+
+    async def listen(self):
+        self.listens += 1
+        if self.listens == 1:
+            raise ConnectionError("connection lost")
+        yield {"type": "pmessage", "channel": b"ws:session:s1", "data": '{"n": 1}'}
+        await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_redis_listener_survives_a_failed_resubscribe(monkeypatch):
+    """The listener keeps retrying the subscription while Redis is down"""
+    broker = RedisBroker.__new__(RedisBroker)
+    broker.channel_prefix = "ws:session:"
+    sleeps = []
+
+    async def fast_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr("connection_hub.asyncio.sleep", fast_sleep)
+    received = []
+    pubsub = FlakyPubSub()
+    listener = asyncio.ensure_future(
+        broker._listen(pubsub, lambda session, message: received.append((session, message)))
+    )
+    for _ in range(10):
+        if received:
+            break
+        await asyncio.wait([listener], timeout=0.01)
+
+    assert received == [("s1", {"n": 1})]
+    assert pubsub.subscribes == 1 and sleeps == [1.0, 2.0]
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
@@ -0,0 +1,152 @@
+"""
+Tests for the token-budgeted conversation context manager
+"""
+
+import asyncio
+
+import pytest
+
+from context_manager import ContextManager, estimate_tokens
+
+
+class FakeContextStore:
+    def __init__(self, record=None):
+        self.record = record
+        self.reads = 0
+        self.writes = []
+
+    async def get_conversation_context(self, session_id):
+        self.reads += 1
+        return self.record
+
+    async def save_conversation_context(
+        self, session_id, summary, recent_turns, summarized, expected_version=0
+    ):
+        version = (self.record or {}).get("version", 0)
+        if version != expected_version:
+            return None
+        self.record = {
+            "summary": summary,
+            "recent_turns": list(recent_turns),
+            "summarized_turns": summarized,
+            "version": version + 1,
+        }
+        self.writes.append(self.record)
+        return version + 1
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.prompts = []
+
+    async def route_request(self, message, provider=None, **kwargs):
+        self.prompts.append(message)
+        return {"content": f"summary v{len(self.prompts)}"}
+
+
+@pytest.fixture
+def context_env(monkeypatch):
+    monkeypatch.setenv("CONTEXT_MAX_TURNS", "2")
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "60")
+    monkeypatch.setenv("CONTEXT_SUMMARY_TOKENS", "20")
+
+
+@pytest.mark.asyncio
+async def test_old_turns_fold_into_summary_incrementally(context_env):
+    store, llm = FakeContextStore(), FakeSummarizer()
+    manager = ContextManager(store, llm)
+
+    for n in range(4):
+        await manager.append_turn("s1", f"question {n}", f"answer {n}")
+
+    context = await manager.get("s1")
+    assert [t["user"] for t in context.turns] == ["question 2", "question 3"]
+    assert context.summary == "summary v2"
+    assert context.summarized_turns == 2
+    # Each summary call only carries the previous summary plus the newly folded turn
+    assert "question 0" not in llm.prompts[1]
+    assert "summary v1" in llm.prompts[1] and "question 1" in llm.prompts[1]
+    assert store.record["summarized_turns"] == 2
+
+
+@pytest.mark.asyncio
+async def test_history_is_cached_and_within_budget(context_env):
+    store = FakeContextStore(
+        {
+            "summary": "Asked about Data Science fees.",
+            "recent_turns": [
+                {"user": "x" * 400, "assistant": "long"},
+                {"user": "When does it start?", "assistant": "March."},
+            ],
+            "summarized_turns": 3,
+        }
+    )
+    manager = ContextManager(store)
+
+    history = await manager.build_history("s1")
+    await manager.build_history("s1")
+
+    assert store.reads == 1
+    assert estimate_tokens(history) <= manager.token_budget
+    assert history.startswith("Summary of earlier conversation: Asked about Data Science fees.")
+    assert history.endswith("User: When does it start?\nAssistant: March.")
+    assert "xxxx" not in history
+
+
+@pytest.mark.asyncio
+async def test_extractive_summary_without_llm(context_env):
+    store = FakeContextStore()
+    manager = ContextManager(store)
+    for n in range(3):
+        manager.record_turn("s1", f"question {n}", f"answer {n}")
+    await manager.close()
+
+    context = await manager.get("s1")
+    assert context.summary == "question 0"
+    assert len(store.writes) == 3
+    assert manager._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_stale_worker_reloads_instead_of_overwriting(context_env, monkeypatch):
+    monkeypatch.setenv("CONTEXT_MAX_TURNS", "6")
+    store = FakeContextStore()
+    first, second = ContextManager(store), ContextManager(store)
+
+    await first.append_turn("s1", "question 0", "answer 0")
+    await second.get("s1")  # second caches version 1
+    await first.append_turn("s1", "question 1", "answer 1")
+    await second.append_turn("s1", "question 2", "answer 2")
+
+    assert [t["user"] for t in store.record["recent_turns"]] == [
+        "question 0",
+        "question 1",
+        "question 2",
+    ]
+    assert store.record["version"] == 3
+    assert (await second.get("s1")).version == 3
+
+
+@pytest.mark.asyncio
+async def test_folded_turns_stay_visible_while_summarizing(context_env):
+    release = asyncio.Event()
+
+    class SlowSummarizer(FakeSummarizer):
+        async def route_request(self, message, provider=None, **kwargs):
+            await release.wait()
+            return await super().route_request(message, provider, **kwargs)
+
+    manager = ContextManager(FakeContextStore(), SlowSummarizer())
+    for n in range(2):
+        await manager.append_turn("s1", f"question {n}", f"answer {n}")
+
+    manager.record_turn("s1", "question 2", "answer 2")
+    await asyncio.sleep(0)
+    context = await manager.get("s1")
+    assert [t["user"] for t in context.turns] == ["question 0", "question 1", "question 2"]
+
+    release.set()
+    await manager.close()
+    context = await manager.get("s1")
+    assert [t["user"] for t in context.turns] == ["question 1", "question 2"]
+    assert context.summary == "summary v1"
@@ -0,0 +1,190 @@
+"""
+Tests for DatabaseManager against an in-process stand-in for the asyncpg pool
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+from database import CONVERSATION_COLUMNS, DatabaseManager
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetchrow(self, query, *args):
+        self.pool.queries.append(query)
+        await asyncio.sleep(0)
+        session_id = args[0]
+        if query.lstrip().startswith("INSERT"):
+            row = self.pool.users.setdefault(
+                session_id, {"id": f"id-{len(self.pool.users)}", "session_id": session_id}
+            )
+            return row
+        return self.pool.users.get(session_id)
+
+    async def copy_records_to_table(self, table, records, columns):
+        if any(record[1] in self.pool.missing_users for record in records):
+            raise asyncpg.exceptions.ForeignKeyViolationError("user_id is not present")
+        if self.pool.fail_next:
+            self.pool.fail_next -= 1
+            raise ConnectionError("connection reset")
+        await asyncio.sleep(self.pool.latency)
+        self.pool.copies.append((table, list(records), columns))
+
+
+class FakePool:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.missing_users = set()
+        self.copies = []
+        self.queries = []
+        self.users = {}
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setenv("NEON_DATABASE_URL", "postgresql://fake")
+    manager = DatabaseManager()
+    manager.pool = FakePool()
+    manager.conversation_flush_interval = 0.01
+    return manager
+
+
+async def _log(db, n):
+    return await db.log_conversation(
+        session_id=f"s{n}",
+        message="hi",
+        response="hello",
+        agent_type="rag",
+        intent="general",
+        response_time_ms=12,
+        metadata={"n": n},
+    )
+
+
+@pytest.mark.asyncio
+async def test_conversations_are_flushed_in_bulk(db):
+    """Many queued turns reach Postgres in a few COPY batches"""
+    db.conversation_flush_batch = 50
+    db.start_conversation_writer()
+    ids = await asyncio.gather(*(_log(db, n) for n in range(120)))
+    await db.close()
+
+    written = [record for _, records, _ in db.pool.copies for record in records]
+    assert len(written) == 120
+    assert len(db.pool.copies) <= 4
+    assert db.pool.copies[0][0] == "conversations"
+    assert db.pool.copies[0][2] == CONVERSATION_COLUMNS
+    assert {str(record[0]) for record in written} == set(ids)
+    assert db.pool.closed
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_applies_backpressure(db):
+    """Producers wait for the flusher once the buffer is full"""
+    db.pool.latency = 0.05
+    db.conversation_buffer_size = 2
+    db.conversation_flush_batch = 2
+    db.start_conversation_writer()
+
+    await _log(db, 0)
+    await _log(db, 1)
+    await asyncio.sleep(0.02)
+    await _log(db, 2)
+    await _log(db, 3)
+    blocked = asyncio.create_task(_log(db, 4))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    await blocked
+    await db.close()
+    assert db.conversation_stats["written"] == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried(db):
+    """A transient COPY failure is retried rather than dropping records"""
+    db.pool.fail_next = 1
+    db.start_conversation_writer()
+    await _log(db, 0)
+    await db.close()
+
+    assert db.conversation_stats == {"queued": 1, "written": 1, "batches": 1, "dropped": 0}
+
+
+@pytest.mark.asyncio
+async def test_rejected_record_only_drops_itself(db):
+    """One row failing a constraint is isolated instead of failing the whole COPY"""
+    ghost_user = uuid.uuid4()
+    db.pool.missing_users.add(ghost_user)
+    db.conversation_flush_batch = 50
+    db.start_conversation_writer()
+    await asyncio.gather(*(_log(db, n) for n in range(4)))
+    ghost = await db.log_conversation(
+        session_id="s-ghost",
+        message="hi",
+        response="hello",
+        agent_type="rag",
+        intent="general",
+        response_time_ms=12,
+        user_id=str(ghost_user),
+    )
+    await asyncio.gather(*(_log(db, n) for n in range(4, 8)))
+    await db.close()
+
+    written = [str(record[0]) for _, records, _ in db.pool.copies for record in records]
+    assert len(written) == 8 and ghost not in written
+    assert db.conversation_stats["dropped"] == 1
+    assert db.conversation_stats["written"] == 8
+
+
+@pytest.mark.asyncio
+async def test_log_after_close_is_rejected(db):
+    db.start_conversation_writer()
+    await db.close()
+    with pytest.raises(RuntimeError):
+        await _log(db, 0)
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_is_one_upsert_then_cached(db):
+    """A new session costs one INSERT ... ON CONFLICT round trip, repeats are memory hits"""
+    first = await db.get_or_create_user("s1", {"name": "Ada"})
+    second = await db.get_or_create_user("s1")
+
+    assert first == second == {"id": "id-0", "session_id": "s1"}
+    assert len(db.pool.queries) == 1
+    assert "ON CONFLICT (session_id)" in db.pool.queries[0]
+    assert db.user_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_requests_share_one_user(db):
+    """Racing requests for a new session resolve to the same row"""
+    users = await asyncio.gather(*(db.get_or_create_user("race") for _ in range(5)))
+    assert len({user["id"] for user in users}) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_user_caches_missing_sessions(db):
+    """Unknown sessions are cached negatively but creation still goes through"""
+    assert await db.get_user("ghost") is None
+    assert await db.get_user("ghost") is None
+    assert len(db.pool.queries) == 1
+
+    created = await db.get_or_create_user("ghost")
+    assert await db.get_user("ghost") == created
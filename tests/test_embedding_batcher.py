@@ -0,0 +1,88 @@
+"""
+Tests for the embedding micro-batcher
+"""
+
+import asyncio
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher
+from monitoring import metrics
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_request():
+    """Concurrent callers are coalesced and each gets its own vector"""
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=16, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.embed("x" * n) for n in range(1, 6)))
+
+    assert results == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(calls) == 1
+    stats = batcher.stats()
+    assert stats["requests_sent"] == 1
+    assert stats["batch_size"]["count"] == 1
+    assert stats["queue_wait_ms"]["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_batches_are_exported_as_histograms():
+    """Batch sizes and queue waits reach the registry rendered at /metrics"""
+    before = metrics.histogram("embedding_batch_size")
+    before_count = before.count if before else 0
+
+    async def embed_batch(texts):
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=8, max_wait_ms=5)
+    await asyncio.gather(*(batcher.embed(str(n)) for n in range(3)))
+    assert metrics.histogram("embedding_batch_size").count == before_count + 1
+    rendered = metrics.render_prometheus(metrics.state())
+    assert "# TYPE embedding_batch_size histogram" in rendered
+    assert 'embedding_queue_wait_ms_bucket{le="+Inf"}' in rendered
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting():
+    """Reaching max_batch_size sends immediately and splits the remainder"""
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=2, max_wait_ms=10_000)
+    await asyncio.wait_for(asyncio.gather(*(batcher.embed(str(n)) for n in range(4))), timeout=1)
+    assert calls == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_texts_are_sent_once():
+    """Identical texts in a batch occupy one input slot"""
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_wait_ms=5)
+    results = await asyncio.gather(batcher.embed("same"), batcher.embed("same"))
+    assert results == [[1.0], [1.0]]
+    assert calls == [["same"]]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    """An API error is raised in each waiting caller"""
+
+    async def embed_batch(texts):
+        raise Exception("Mixbread API error: 429")
+
+    batcher = EmbeddingBatcher(embed_batch, max_wait_ms=1)
+    results = await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+    assert all(str(r) == "Mixbread API error: 429" for r in results)
@@ -0,0 +1,93 @@
+"""
+Tests for the two-tier embedding cache
+"""
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+from vector_store import VectorStore
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used():
+    """The memory tier stays bounded and counts evictions"""
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert (await cache.get("m", "a")).tolist() == [1.0]
+    cache.put("m", "c", [3.0])
+
+    assert await cache.get("m", "b") is None
+    assert (await cache.get("m", "a")).tolist() == [1.0]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_include_model():
+    """The same text under a different model is a separate entry"""
+    cache = EmbeddingCache()
+    cache.put("model-a", "hello", [1.0])
+    assert await cache.get("model-b", "hello") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """Entries written by one cache instance are served from disk by the next"""
+    path = str(tmp_path / "embeddings.sqlite3")
+    first = EmbeddingCache(disk_path=path)
+    first.put("m", "hello", [0.5, 0.25])
+    first.close()
+
+    second = EmbeddingCache(disk_path=path)
+    from_disk = await second.get("m", "hello")
+    assert from_disk.dtype == np.float32 and from_disk.tolist() == [0.5, 0.25]
+    assert await second.get("m", "hello") is from_disk
+    assert second.stats()["disk_hits"] == 1
+    assert second.stats()["memory_hits"] == 1
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_writes_are_batched_off_the_loop_and_failures_logged(tmp_path, caplog):
+    """Puts on the event loop share one background write; a write error is not raised"""
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(disk_path=path)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert (await cache.get("m", "a")).tolist() == [1.0]
+    await cache._flush_task
+    reader = EmbeddingCache(max_entries=1, disk_path=path)
+    assert (await reader.get("m", "a")).tolist() == [1.0]
+    assert (await reader.get("m", "b")).tolist() == [2.0]
+    reader.close()
+
+    cache._writer.execute("DROP TABLE embeddings")
+    cache.put("m", "c", [3.0])
+    await cache._flush_task
+    assert "write of 1 entries failed" in caplog.text
+    assert (await cache.get("m", "c")).tolist() == [3.0]
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_create_embedding_uses_cache(monkeypatch):
+    """Repeated texts only reach the embeddings API once"""
+    monkeypatch.setenv("VECTOR_STORE_MODE", "local")
+    monkeypatch.setenv("MIXBREAD_API_KEY", "test")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    store = VectorStore()
+    calls = []
+
+    async def fake_request(texts):
+        calls.append(texts)
+        return [[0.1, 0.2] for _ in texts]
+
+    monkeypatch.setattr(store.embedding_batcher, "embed_batch", fake_request)
+    first = await store.create_embedding("test")
+    assert first.dtype == np.float32 and first.tolist() == pytest.approx([0.1, 0.2])
+    assert await store.create_embedding("test") is first
+    assert calls == [["test"]]
@@ -0,0 +1,129 @@
+"""
+Feedback rollups maintained by DatabaseManager.store_feedback, read by FeedbackAgent
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from agents.feedback_agent import FeedbackAgent
+from database import DatabaseManager, latency_bucket
+
+
+class FakeConnection:
+    """Just enough of asyncpg to run the feedback statements against dicts"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetchrow(self, query, *args):
+        return self.pool.conversations.get(args[0])
+
+    async def fetchval(self, query, *args):
+        if query.lstrip().startswith("INSERT INTO feedback"):
+            if args[0] in self.pool.feedback:
+                return None
+            self.pool.feedback[args[0]] = {"rating": args[1], "comment": args[2]}
+            return uuid.uuid4()
+        return self.pool.feedback[args[0]]["rating"]
+
+    async def execute(self, query, *args):
+        if query.lstrip().startswith("UPDATE feedback"):
+            self.pool.feedback[args[0]] = {"rating": args[1], "comment": args[2]}
+            return
+        key, deltas = args[:4], args[4:]
+        row = self.pool.rollups.setdefault(key, [0] * len(deltas))
+        self.pool.rollups[key] = [a + b for a, b in zip(row, deltas)]
+
+    async def fetch(self, query, *args):
+        self.pool.rollup_reads += 1
+        columns = (
+            "feedback_count",
+            "rating_sum",
+            "positive_count",
+            "negative_count",
+            "response_time_ms_sum",
+            "timed_count",
+        )
+        return [
+            {
+                "day": day,
+                "agent_type": agent,
+                "intent": intent,
+                "latency_bucket": bucket,
+                **dict(zip(columns, values)),
+            }
+            for (day, agent, intent, bucket), values in sorted(self.pool.rollups.items())
+            if day >= args[0]
+        ]
+
+
+class FakePool:
+    def __init__(self):
+        self.conversations = {}
+        self.feedback = {}
+        self.rollups = {}
+        self.rollup_reads = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setenv("NEON_DATABASE_URL", "postgresql://fake")
+    manager = DatabaseManager()
+    manager.pool = FakePool()
+    return manager
+
+
+def add_conversation(db, agent_type, intent, response_time_ms):
+    conversation_id = uuid.uuid4()
+    db.pool.conversations[conversation_id] = {
+        "agent_type": agent_type,
+        "intent": intent,
+        "response_time_ms": response_time_ms,
+        "created_at": datetime.utcnow(),
+    }
+    return str(conversation_id)
+
+
+def test_latency_buckets():
+    assert latency_bucket(None) == "unknown"
+    assert latency_bucket(120) == "<500"
+    assert latency_bucket(1500) == "<2000"
+    assert latency_bucket(9000) == ">=5000"
+
+
+@pytest.mark.asyncio
+async def test_rerating_adjusts_rollups_instead_of_double_counting(db):
+    agent = FeedbackAgent(db)
+    fast = add_conversation(db, "rag", "course_info", 300)
+    slow = add_conversation(db, "rag", "course_info", 6000)
+    booking = add_conversation(db, "scheduler", "scheduling", None)
+
+    assert await agent.store_feedback(fast, 1)
+    assert await agent.store_feedback(slow, 1)
+    assert await agent.store_feedback(slow, -1, "too slow")
+    assert await agent.store_feedback(booking, 0)
+    assert not await agent.store_feedback(str(uuid.uuid4()), 1)
+
+    trends = await agent.analyze_feedback_trends(days=7)
+    assert db.pool.rollup_reads == 1
+    assert trends["total_feedback"] == 3
+    assert trends["avg_rating"] == 0
+    assert trends["by_agent"]["rag"]["positive_rate"] == 0.5
+    assert trends["by_agent"]["rag"]["avg_response_time_ms"] == 3150.0
+    assert [(b["bucket"], b["avg_rating"]) for b in trends["by_latency"]] == [
+        ("<500", 1.0),
+        (">=5000", -1.0),
+        ("unknown", 0.0),
+    ]
+    assert trends["by_day"][0]["count"] == 3
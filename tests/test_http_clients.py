@@ -0,0 +1,134 @@
+"""
+Tests for the shared outbound HTTP client layer
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from http_clients import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    HTTPClientPool,
+    RetryBudget,
+    deadline,
+)
+from monitoring import metrics
+
+
+def _pool(handler):
+    return HTTPClientPool(http2=False, transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_statuses_within_budget():
+    statuses = iter([503, 502, 200, 503, 503, 503])
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(next(statuses))
+
+    pool = _pool(handler)
+    service = pool.service(
+        "vendor",
+        "https://vendor.test/v1",
+        {"Authorization": "Bearer k"},
+        backoff=0.001,
+        retry_budget=RetryBudget(ratio=0.1, max_tokens=3),
+    )
+    assert (await service.post("/embed", json={})).status_code == 200
+    assert len(calls) == 3
+    assert calls[0].url == "https://vendor.test/v1/embed"
+    assert calls[0].headers["Authorization"] == "Bearer k"
+
+    # Two retries spent most of the budget; the next request gets only one more
+    response = await service.post("/embed", json={})
+    assert response.status_code == 503
+    assert len(calls) == 5
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_fails_fast_and_recovers_after_probe():
+    healthy = {"up": False}
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if not healthy["up"]:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200)
+
+    pool = _pool(handler)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    service = pool.service("vendor", "https://vendor.test", breaker=breaker, max_retries=0)
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await service.get("/")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        await service.get("/")
+    assert len(calls) == 3
+
+    await asyncio.sleep(0.06)
+    healthy["up"] = True
+    assert (await service.get("/")).status_code == 200
+    assert breaker.state == "closed"
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_are_bounded_by_the_inbound_deadline():
+    async def slow(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200)
+
+    pool = _pool(slow)
+    service = pool.service("slow", "https://slow.test", timeout=30.0, backoff=0.001)
+    loop = asyncio.get_running_loop()
+    with deadline(0.05):
+        started = loop.time()
+        with pytest.raises(TimeoutError):
+            await service.get("/")
+        assert loop.time() - started < 0.5
+        with pytest.raises(DeadlineExceeded):
+            await service.get("/")
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_services_share_one_pool_per_host_and_reuse_connections():
+    async def respond(reader, writer):
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(respond, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pool = HTTPClientPool(http2=False)
+    first = pool.service("reuse-a", f"http://127.0.0.1:{port}/a")
+    second = pool.service("reuse-b", f"http://127.0.0.1:{port}/b")
+    assert pool.client_for(first.base_url) is pool.client_for(second.base_url)
+
+    for service in (first, second, first):
+        assert (await service.get("/")).text == "ok"
+    counts = {
+        (dict(labels)["upstream"], dict(labels)["reused"]): value
+        for (name, labels), value in metrics.counters.items()
+        if name == "http_client_connections_total"
+    }
+    assert counts.get(("reuse-a", "false")) == 1
+    assert counts.get(("reuse-a", "true")) == 1 and counts.get(("reuse-b", "true")) == 1
+    assert ("reuse-b", "false") not in counts
+    assert metrics.histogram("http_client_pool_wait_ms", {"upstream": "reuse-a"}).count == 2
+
+    await pool.close()
+    server.close()
+    await server.wait_closed()
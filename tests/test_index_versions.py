@@ -0,0 +1,181 @@
+"""
+Tests for versioned, memory-mapped index files
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from index_versions import (
+    VERSIONS_DIR,
+    MappedLookup,
+    MappedRecords,
+    MappedStrings,
+    current_version,
+    publish,
+    resolve,
+)
+from lexical_index import BM25Index
+from vector_index import LocalVectorIndex
+from vector_store import VectorStore
+
+
+def _write_marker(value):
+    def write(directory):
+        with open(os.path.join(directory, "marker"), "w") as f:
+            f.write(value)
+
+    return write
+
+
+def test_publish_swaps_current_and_prunes_old_versions(tmp_path):
+    root = str(tmp_path)
+    assert resolve(root) == root
+
+    directories = [publish(root, _write_marker(str(i)), keep=2, grace=0) for i in range(3)]
+    assert resolve(root) == directories[-1]
+    assert current_version(root) == os.path.basename(directories[-1])
+    assert sorted(os.listdir(tmp_path / VERSIONS_DIR)) == [
+        os.path.basename(d) for d in directories[1:]
+    ]
+
+    def fail(directory):
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        publish(root, fail)
+    assert resolve(root) == directories[-1]
+    assert len(os.listdir(tmp_path / VERSIONS_DIR)) == 2
+
+
+def test_recently_superseded_versions_survive_pruning(tmp_path):
+    root = str(tmp_path)
+    first = publish(root, _write_marker("0"), keep=1)
+    for i in range(1, 3):
+        publish(root, _write_marker(str(i)), keep=1)
+    # A reader that resolved the first version just before it was replaced can still open it
+    assert os.path.exists(os.path.join(first, "marker"))
+    publish(root, _write_marker("3"), keep=1, grace=0)
+    assert len(os.listdir(tmp_path / VERSIONS_DIR)) == 1
+
+
+def test_mapped_tables_round_trip(tmp_path):
+    MappedStrings.write(str(tmp_path), "ids", ["a", "ünïcode", ""])
+    MappedRecords.write(str(tmp_path), "meta", [{"n": 1}, {}])
+    MappedLookup.write(str(tmp_path), "lookup", ["pear", "apple", "fig"])
+
+    ids = MappedStrings.open(str(tmp_path), "ids")
+    assert list(ids) == ["a", "ünïcode", ""] and ids[-2] == "ünïcode"
+    assert MappedRecords.open(str(tmp_path), "meta")[0] == {"n": 1}
+
+    lookup = MappedLookup.open(str(tmp_path), "lookup")
+    assert lookup["pear"] == 0 and lookup["fig"] == 2
+    assert "pea" not in lookup and "pears" not in lookup and lookup.get("kiwi") is None
+    assert sorted(lookup) == ["apple", "fig", "pear"]
+    assert lookup.rows(["fig", "kiwi", "apple"]).tolist() == [2, 1]
+
+
+def test_readers_share_pages_and_survive_new_versions(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(4, 8)).astype(np.float32)
+    writer = LocalVectorIndex(8)
+    writer.upsert([f"c{i}" for i in range(4)], vectors, [{"n": i} for i in range(4)])
+    writer.save(str(tmp_path))
+
+    first = LocalVectorIndex.load(str(tmp_path), dimension=8)
+    second = LocalVectorIndex.load(str(tmp_path), dimension=8)
+    assert isinstance(first._vectors, np.memmap) and isinstance(second._vectors, np.memmap)
+    assert first._vectors.filename == second._vectors.filename
+    assert first.search(vectors[2], 1)[0][:1] == ("c2",)
+
+    # A writer copies on write, and readers keep their version until they reopen
+    writer = LocalVectorIndex.load(str(tmp_path), dimension=8)
+    writer.delete(["c2"])
+    writer.upsert(["c9"], vectors[2:3], [{"n": 9}])
+    assert isinstance(first._vectors, np.memmap)
+    for _ in range(4):
+        writer.save(str(tmp_path))
+    assert first.search(vectors[2], 1)[0][0] == "c2"
+    assert LocalVectorIndex.load(str(tmp_path), dimension=8).search(vectors[2], 1)[0][0] == "c9"
+
+
+def _store(monkeypatch, tmp_path) -> VectorStore:
+    monkeypatch.setenv("VECTOR_STORE_MODE", "local")
+    monkeypatch.setenv("MIXBREAD_API_KEY", "test")
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setenv("VECTOR_INDEX_PATH", str(tmp_path / "vector"))
+    monkeypatch.setenv("LEXICAL_INDEX_PATH", str(tmp_path / "lexical"))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setenv("INDEX_REFRESH_SECONDS", "0")
+    store = VectorStore()
+    store.embedding_dimension = 4
+    return store
+
+
+@pytest.mark.asyncio
+async def test_store_swaps_in_versions_published_elsewhere(monkeypatch, tmp_path):
+    reader = _store(monkeypatch, tmp_path)
+    await reader.initialize()
+    assert not await reader.refresh_indexes()
+
+    # Another process ingests and publishes both indexes as one version
+    writer = _store(monkeypatch, tmp_path)
+    await writer.initialize()
+    writer.lexical_index.upsert("d1#0", "refund policy", {"document_id": "d1"})
+    writer.local_index.upsert(["d1#0"], np.ones((1, 4), dtype=np.float32), [{"document_id": "d1"}])
+    writer.save_index()
+    assert sorted(os.listdir(resolve(str(tmp_path / "index")))) == ["lexical", "vector"]
+
+    generation = reader.index_generation
+    assert await reader.refresh_indexes()
+    assert reader.index_generation > generation
+    assert "d1#0" in reader.lexical_index and len(reader.local_index) == 1
+    assert not await reader.refresh_indexes()
+    await reader.close()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_store_reads_separately_saved_indexes_until_the_first_combined_save(
+    monkeypatch, tmp_path
+):
+    lexical = BM25Index()
+    lexical.upsert("d1#0", "refund policy", {"document_id": "d1"})
+    lexical.save(str(tmp_path / "lexical"))
+    vectors = LocalVectorIndex(4)
+    vectors.upsert(["d1#0"], np.ones((1, 4), dtype=np.float32), [{"document_id": "d1"}])
+    vectors.save(str(tmp_path / "vector"))
+
+    store = _store(monkeypatch, tmp_path)
+    await store.initialize()
+    assert "d1#0" in store.lexical_index and len(store.local_index) == 1
+    store.save_index()
+    assert current_version(str(tmp_path / "index")) is not None
+    assert "d1#0" in store.lexical_index and len(store.local_index) == 1
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_store_retries_a_version_removed_while_opening(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    await store.initialize()
+    store.lexical_index.upsert("d1#0", "refund policy", {"document_id": "d1"})
+    store.save_index()
+    stale = resolve(str(tmp_path / "index"))
+    store.lexical_index.upsert("d2#0", "enrolment dates", {"document_id": "d2"})
+    store.save_index()
+
+    # The first resolve still names the superseded version, which is then pruned
+    shutil.rmtree(stale)
+    resolved = iter(
+        [(os.path.basename(stale), os.path.join(stale, "vector"), os.path.join(stale, "lexical"))]
+    )
+    real_paths = store._index_paths
+    monkeypatch.setattr(store, "_index_paths", lambda: next(resolved, None) or real_paths())
+
+    version, _, lexical_index = store._open_indexes()
+    assert version == current_version(str(tmp_path / "index"))
+    assert "d2#0" in lexical_index
+    await store.close()
@@ -0,0 +1,147 @@
+"""
+Tests for the streaming ingestion pipeline
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ingestion import IngestionPipeline, chunk_text, iter_files, iter_lines
+
+
+class RecordingVectorStore:
+    """Minimal vector store that records calls and tracks concurrency"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.chunks = {}
+        self.embedding_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_embeddings(self, texts):
+        self.embedding_calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return [[float(len(text))] for text in texts]
+
+    async def upsert_chunks(self, chunks):
+        for chunk in chunks:
+            self.chunks[chunk["id"]] = chunk
+
+    async def delete_chunks(self, ids):
+        for chunk_id in ids:
+            self.chunks.pop(chunk_id, None)
+
+
+def test_chunk_text_streams_with_overlap():
+    """Chunks respect the size limit and overlap across line boundaries"""
+    lines = (f"word{n} " for n in range(500))
+    chunks = list(chunk_text(lines, chunk_size=100, overlap=20))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+    assert chunks[-1].endswith("word499")
+
+
+def test_iter_files_filters_extensions(tmp_path):
+    """Only text-like files are yielded, recursively"""
+    (tmp_path / "a.md").write_text("a")
+    (tmp_path / "b.bin").write_bytes(b"\x00")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.txt").write_text("c")
+
+    assert [p.rsplit("/", 1)[-1] for p in iter_files([str(tmp_path)])] == ["a.md", "c.txt"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_and_bounds_concurrency(tmp_path):
+    """Chunks are embedded in batches with at most `concurrency` batches in flight"""
+    doc = tmp_path / "catalogue.txt"
+    doc.write_text("".join(f"course {n} covers python and sql. " for n in range(400)))
+    store = RecordingVectorStore(delay=0.01)
+
+    pipeline = IngestionPipeline(
+        store,
+        batch_size=4,
+        concurrency=2,
+        chunk_size=200,
+        chunk_overlap=40,
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+    )
+    stats = await pipeline.run([str(tmp_path)])
+
+    assert stats.documents == 1
+    assert stats.chunks == len(store.chunks)
+    assert store.embedding_calls == -(-stats.chunks // 4)
+    assert store.max_in_flight == 2
+    first = store.chunks[f"{doc}#0"]["metadata"]
+    assert first["document_id"] == str(doc)
+    assert first["title"] == "catalogue"
+    assert stats.to_dict()["chunks_per_sec"] > 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_checkpoint(tmp_path):
+    """Unchanged files are skipped and shrunk files drop stale chunks"""
+    doc = tmp_path / "fees.md"
+    doc.write_text("fees " * 400)
+    checkpoint = str(tmp_path / "state" / "checkpoint.json")
+    store = RecordingVectorStore()
+
+    await IngestionPipeline(
+        store, chunk_size=100, chunk_overlap=10, checkpoint_path=checkpoint
+    ).run([str(doc)])
+    before = len(store.chunks)
+
+    rerun = await IngestionPipeline(
+        store, chunk_size=100, chunk_overlap=10, checkpoint_path=checkpoint
+    ).run([str(doc)])
+    assert rerun.skipped == 1 and rerun.documents == 0
+
+    doc.write_text("fees " * 30)
+    await IngestionPipeline(
+        store, chunk_size=100, chunk_overlap=10, checkpoint_path=checkpoint
+    ).run([str(doc)])
+    assert 0 < len(store.chunks) < before
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_waits_for_index_save(tmp_path):
+    """A failed index save leaves the checkpoint untouched so the files are re-ingested"""
+    doc = tmp_path / "fees.md"
+    doc.write_text("fees " * 400)
+    checkpoint = tmp_path / "checkpoint.json"
+    store = RecordingVectorStore()
+
+    def failing_save():
+        raise OSError("disk full")
+
+    store.save_index = failing_save
+    pipeline = IngestionPipeline(
+        store, chunk_size=100, chunk_overlap=10, checkpoint_path=str(checkpoint)
+    )
+    with pytest.raises(OSError):
+        await pipeline.run([str(doc)])
+    assert not checkpoint.exists()
+
+    saves = []
+    store.save_index = lambda: saves.append(checkpoint.exists())
+    stats = await IngestionPipeline(
+        store, chunk_size=100, chunk_overlap=10, checkpoint_path=str(checkpoint)
+    ).run([str(doc)])
+    assert stats.documents == 1 and saves == [False]
+    assert str(doc) in json.loads(checkpoint.read_text())
+
+
+def test_iter_lines_caps_line_length(tmp_path):
+    """A file without newlines is streamed in bounded pieces"""
+    path = tmp_path / "one-line.txt"
+    path.write_text("x" * 2500 + "\nend\n")
+    pieces = list(iter_lines(str(path), max_line_chars=1000))
+    assert [len(piece) for piece in pieces] == [1000, 1000, 501, 4]
+    assert "".join(pieces) == path.read_text()
@@ -0,0 +1,97 @@
+"""
+Tests for the compiled intent matcher and embedding fallback
+"""
+
+import pytest
+
+from agents.intent_agent import INTENT_KEYWORDS, IntentAgent, KeywordIntentMatcher
+from benchmarks.bench_intent import run
+from models import IntentType
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Can I book a call?", "scheduling"),
+        ("I'd like to reschedule my appointment", "scheduling"),
+        ("Tell me about your courses", "course_info"),
+        ("How do I sign up?", "enrollment"),
+        ("When is registration open?", "enrollment"),
+        ("I lost my notebook", "general"),
+        ("Which books should I read before starting?", "general"),
+        ("I'd like to get booked in for Friday", "scheduling"),
+        ("What are the bootcamp fees?", "general"),
+        ("Hello!", "general"),
+    ],
+)
+async def test_detect_intent_matches_whole_tokens(message, expected):
+    agent = IntentAgent(None)
+    assert await agent.detect_intent(message) == expected
+
+
+def test_priority_breaks_ties():
+    """Equal scores keep the original order: scheduling, course info, enrollment"""
+    matcher = KeywordIntentMatcher(INTENT_KEYWORDS)
+    assert matcher.match("enroll in the course") == IntentType.COURSE_INFO
+    assert matcher.match("book the course") == IntentType.SCHEDULING
+    assert matcher.scores("enroll enroll course") == [0, 1, 2]
+
+
+class FakeVectorStore:
+    """Embeds by counting marker words so centroids are predictable"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create_embeddings(self, texts):
+        self.calls += 1
+        markers = ("advisor", "learn", "join", "hello")
+        return [[float(m in t.lower()) + 0.01 for m in markers] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_detect_intents_batches_embedding_fallback():
+    """Keyword misses are classified by nearest centroid in one embedding call"""
+    store = FakeVectorStore()
+    agent = IntentAgent(None, vector_store=store, embedding_fallback=True)
+    agent.embedding_classifier.examples = {
+        IntentType.SCHEDULING: ["advisor"],
+        IntentType.COURSE_INFO: ["learn"],
+        IntentType.ENROLLMENT: ["join"],
+        IntentType.GENERAL: ["hello"],
+    }
+
+    intents = await agent.detect_intents(
+        [
+            "Can an advisor ring me?",
+            "book me in",
+            "What will I learn?",
+            "Can I join?",
+        ]
+    )
+    assert intents == ["scheduling", "scheduling", "course_info", "enrollment"]
+    assert store.calls == 2  # fit + one batched classify
+
+    await agent.detect_intents(["another advisor question"])
+    assert store.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_embedding_fallback_is_opt_in(monkeypatch):
+    """Without INTENT_EMBEDDING_FALLBACK, keyword misses stay general and embed nothing"""
+    store = FakeVectorStore()
+    agent = IntentAgent(None, vector_store=store)
+    assert agent.embedding_classifier is None
+    assert await agent.detect_intent("Can an advisor ring me?") == "general"
+    assert store.calls == 0
+
+    monkeypatch.setenv("INTENT_EMBEDDING_FALLBACK", "true")
+    assert IntentAgent(None, vector_store=store).embedding_classifier is not None
+
+
+def test_per_message_cost_is_flat_in_vocabulary_size():
+    """Cost stays in microseconds even with ~100x more keywords"""
+    results = run(message_count=2000)
+    assert results[-1]["vocabulary_size"] > 100 * results[0]["vocabulary_size"]
+    assert all(r["us_per_message"] < 100 for r in results)
@@ -0,0 +1,117 @@
+"""
+Tests for the BM25 inverted index and hybrid retrieval in VectorStore
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from index_versions import resolve
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from vector_store import VectorStore
+
+CHUNKS = {
+    "ds#0": "Data Science DS-101 covers Python, pandas and statistics.",
+    "ds#1": "DS-101 tuition is $4,500 with payment plans available.",
+    "web#0": "Web Development WD-200 covers JavaScript, React and Node.",
+    "ux#0": "UX Design teaches research, wireframes and prototyping in Figma.",
+}
+
+
+def _index() -> BM25Index:
+    index = BM25Index()
+    for chunk_id, text in CHUNKS.items():
+        index.upsert(chunk_id, text, {"document_id": chunk_id.split("#")[0], "content": text})
+    return index
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert tokenize("Course DS-101!") == ["course", "ds-101", "ds", "101"]
+
+
+def test_exact_course_code_ranks_first():
+    results = _index().search("how much is ds-101", top_k=3)
+    assert [chunk_id for chunk_id, _ in results][:2] == ["ds#1", "ds#0"]
+    assert _index().search("quantum chromodynamics") == []
+
+
+def test_incremental_upsert_and_delete():
+    index = _index()
+    index.upsert("ux#0", "UX Design now includes accessibility audits.")
+    index.delete(["web#0"])
+    assert len(index) == 3
+    assert index.search("figma") == []
+    assert [c for c, _ in index.search("accessibility")] == ["ux#0"]
+    assert index.search("react") == []
+
+
+def test_save_compacts_and_loads_memory_mapped(tmp_path):
+    index = _index()
+    index.delete(["web#0"])
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+    assert isinstance(loaded._base_docs, np.memmap)
+    assert len(loaded) == 3
+    assert "react" not in loaded._base_terms
+    assert [c for c, _ in loaded.search("pandas statistics")] == ["ds#0"]
+    assert loaded.metadata("ds#1")["document_id"] == "ds"
+
+    # Updates after loading go to the delta segment and tombstone the base posting
+    loaded.upsert("web#1", "React Native mobile apps")
+    loaded.delete(["ds#0"])
+    assert [c for c, _ in loaded.search("react pandas")] == ["web#1"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]], k=60)
+    assert max(fused, key=fused.get) == "b"
+    assert fused["d"] == pytest.approx(1 / 63)
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_finds_exact_codes_and_uses_shortlist(monkeypatch, tmp_path):
+    monkeypatch.setenv("VECTOR_STORE_MODE", "local")
+    monkeypatch.setenv("MIXBREAD_API_KEY", "test")
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setenv("HYBRID_PREFILTER_MIN_CHUNKS", "1")
+    monkeypatch.setenv("HYBRID_PREFILTER_SHORTLIST", "4")
+
+    store = VectorStore()
+    store.embedding_dimension = 8
+    await store.initialize()
+    rng = np.random.default_rng(0)
+    await store.upsert_chunks(
+        [
+            {
+                "id": chunk_id,
+                "embedding": rng.standard_normal(8),
+                "metadata": {
+                    "document_id": chunk_id.split("#")[0],
+                    "title": chunk_id,
+                    "content": text,
+                },
+            }
+            for chunk_id, text in CHUNKS.items()
+        ]
+    )
+
+    scored = []
+    original_search = store.local_index.search
+
+    def recording_search(query, top_k, candidates=None):
+        scored.append(candidates)
+        return original_search(query, top_k, candidates=candidates)
+
+    monkeypatch.setattr(store.local_index, "search", recording_search)
+    results = await store.search_documents(
+        "WD-200 react", top_k=2, query_embedding=rng.standard_normal(8).tolist()
+    )
+
+    assert results[0]["document_id"] == "web"
+    assert scored == [["web#0"]]
+    await store.close()
+    saved = os.path.join(resolve(str(tmp_path / "index")), "lexical")
+    assert BM25Index.load(saved).search("react")[0][0] == "web#0"
@@ -0,0 +1,219 @@
+"""
+Tests for LLM provider clients and orchestration
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from http_clients import HTTPClientPool
+from llm_orchestrator import (
+    PLACEHOLDER_RESPONSE,
+    AnthropicClient,
+    LLMOrchestrator,
+    LLMProvider,
+    OpenAICompatibleClient,
+    ProviderClient,
+)
+
+
+def _sse(*events: str) -> bytes:
+    return "".join(f"data: {event}\n\n" for event in events).encode()
+
+
+def _mock_client(client, body: bytes):
+    pool = HTTPClientPool(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+    client._client = pool.service(client.provider.value, client.base_url, client.headers())
+    return client
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_stream_yields_deltas():
+    """Chat Completions deltas are yielded in order until [DONE]"""
+    client = _mock_client(
+        OpenAICompatibleClient(LLMProvider.GROQ, "key", "model", "https://groq.test"),
+        _sse(
+            '{"choices": [{"delta": {"role": "assistant"}}]}',
+            '{"choices": [{"delta": {"content": "Hel"}}]}',
+            '{"choices": [{"delta": {"content": "lo"}}]}',
+            "[DONE]",
+        ),
+    )
+    assert [t async for t in client.stream("hi")] == ["Hel", "lo"]
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_anthropic_stream_yields_text_deltas():
+    """Only content_block_delta events carry text"""
+    client = _mock_client(
+        AnthropicClient(LLMProvider.CLAUDE, "key", "model", "https://anthropic.test"),
+        _sse(
+            '{"type": "message_start", "message": {}}',
+            '{"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}}',
+            '{"type": "content_block_delta", "delta": {"type": "text_delta", "text": "!"}}',
+            '{"type": "message_stop"}',
+        ),
+    )
+    result = await client.complete("hi")
+    assert result["content"] == "Hi!"
+    assert result["provider"] == "claude"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_unconfigured_provider_falls_back_to_placeholder():
+    """Without API keys the orchestrator keeps answering"""
+    orchestrator = LLMOrchestrator(clients={})
+    assert (await orchestrator.route_request("hi", LLMProvider.CLAUDE))[
+        "content"
+    ] == PLACEHOLDER_RESPONSE
+    assert [t async for t in orchestrator.stream_request("hi", LLMProvider.GROQ)] == [
+        PLACEHOLDER_RESPONSE
+    ]
+
+
+def test_provider_client_requires_a_stream_implementation():
+    """Adapters must implement stream(); the base class cannot be used directly"""
+    with pytest.raises(TypeError):
+        ProviderClient(LLMProvider.GROQ, "key", "model", "https://groq.test")
+
+
+class FakeProvider(OpenAICompatibleClient):
+    """Local stand-in with injected latency and failures"""
+
+    def __init__(self, provider, latency, fail=False):
+        super().__init__(provider, "key", "fake", "http://fake.test")
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def stream(self, message, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise Exception(f"{self.provider.value} API error: 503")
+        yield self.provider.value
+
+
+def _orchestrator(**providers):
+    clients = {LLMProvider[name]: provider for name, provider in providers.items()}
+    return LLMOrchestrator(clients=clients, max_concurrency=2, hedge=False)
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_provider_after_warmup():
+    """Once every provider has samples, traffic goes to the lowest p50"""
+    slow = FakeProvider(LLMProvider.CLAUDE, 0.05)
+    fast = FakeProvider(LLMProvider.GROQ, 0.001)
+    orchestrator = _orchestrator(CLAUDE=slow, GROQ=fast)
+
+    for _ in range(2):
+        await orchestrator.route_request("hi")
+    results = [await orchestrator.route_request("hi") for _ in range(5)]
+
+    assert all(r["content"] == "groq" for r in results)
+    assert orchestrator.provider_stats()["groq"]["p50_ms"] < 50
+
+
+@pytest.mark.asyncio
+async def test_failing_provider_is_skipped_and_demoted():
+    """Errors fail over to the next provider and push the failing one down the ranking"""
+    broken = FakeProvider(LLMProvider.CLAUDE, 0.0, fail=True)
+    healthy = FakeProvider(LLMProvider.CHATGPT, 0.01)
+    orchestrator = _orchestrator(CLAUDE=broken, CHATGPT=healthy)
+
+    assert (await orchestrator.route_request("hi"))["content"] == "chatgpt"
+    assert orchestrator.rank_providers()[0] == LLMProvider.CHATGPT
+    assert orchestrator.provider_stats()["claude"]["error_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cancels_the_slower_provider():
+    """A primary that outlives its p95 is raced against the secondary"""
+    primary = FakeProvider(LLMProvider.CLAUDE, 0.01)
+    secondary = FakeProvider(LLMProvider.GROQ, 0.03)
+    orchestrator = _orchestrator(CLAUDE=primary, GROQ=secondary)
+    orchestrator.hedge = True
+    for _ in range(3):
+        await orchestrator.route_request("warm", LLMProvider.CLAUDE)
+        await orchestrator.route_request("warm", LLMProvider.GROQ)
+    assert orchestrator.rank_providers()[0] == LLMProvider.CLAUDE
+
+    primary.latency = 0.5
+    secondary.latency = 0.01
+    result = await orchestrator.route_request("hi")
+
+    assert result["content"] == "groq"
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_limits_in_flight_calls():
+    """No more than max_concurrency requests reach one provider at once"""
+    provider = FakeProvider(LLMProvider.CLAUDE, 0.02)
+    orchestrator = _orchestrator(CLAUDE=provider)
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        for _ in range(20):
+            peak = max(peak, orchestrator.stats[LLMProvider.CLAUDE].in_flight)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(watch(), *(orchestrator.route_request("hi") for _ in range(6)))
+    assert peak == 2
+
+
+class FakeStreamingProvider(FakeProvider):
+    """Yields several tokens, optionally failing after the first"""
+
+    def __init__(self, provider, latency, fail=False, fail_after_first=False):
+        super().__init__(provider, latency, fail)
+        self.fail_after_first = fail_after_first
+
+    async def stream(self, message, **kwargs):
+        async for token in super().stream(message, **kwargs):
+            yield token
+        if self.fail_after_first:
+            raise Exception(f"{self.provider.value} stream reset")
+        yield "!"
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_the_first_token():
+    """A provider failing before any token is replaced; one failing mid-stream is not"""
+    broken = FakeStreamingProvider(LLMProvider.CLAUDE, 0.0, fail=True)
+    healthy = FakeStreamingProvider(LLMProvider.GROQ, 0.0)
+    orchestrator = _orchestrator(CLAUDE=broken, GROQ=healthy)
+    orchestrator.stats[LLMProvider.GROQ].record(1.0, error=False)
+    assert orchestrator.rank_providers()[0] == LLMProvider.CLAUDE
+
+    assert [t async for t in orchestrator.stream_request("hi")] == ["groq", "!"]
+    assert orchestrator.provider_stats()["claude"]["error_rate"] == 1.0
+
+    resetting = FakeStreamingProvider(LLMProvider.CHATGPT, 0.0, fail_after_first=True)
+    orchestrator = _orchestrator(CHATGPT=resetting, GROQ=healthy)
+    tokens = []
+    with pytest.raises(Exception, match="stream reset"):
+        async for token in orchestrator.stream_request("hi", LLMProvider.CHATGPT):
+            tokens.append(token)
+    assert tokens == ["chatgpt"] and healthy.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_latency_excludes_consumer_time():
+    """Time the caller spends between tokens does not count against the provider"""
+    provider = FakeStreamingProvider(LLMProvider.GROQ, 0.01)
+    orchestrator = _orchestrator(GROQ=provider)
+    async for _ in orchestrator.stream_request("hi"):
+        await asyncio.sleep(0.1)
+    assert orchestrator.provider_stats()["groq"]["p50_ms"] < 80
@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.load_test import LoadTestConfig, ServiceProfile, compare, run_load_test
+
+
+@pytest.mark.asyncio
+async def test_load_test_reports_every_workload():
+    config = LoadTestConfig(
+        duration=0.5,
+        concurrency=2,
+        postgres=ServiceProfile(),
+        upstash=ServiceProfile(1.0),
+        mixbread=ServiceProfile(1.0),
+        llm=ServiceProfile(5.0),
+        llm_token_interval_ms=0.0,
+    )
+    report = await run_load_test(config)
+
+    stages = report["client_stages"]
+    for stage in (
+        "chat.total",
+        "chat_stream.first_token",
+        "chat_stream.total",
+        "websocket.first_token",
+        "websocket.total",
+        "health.total",
+    ):
+        assert stages[stage]["requests"] > 0
+        assert stages[stage]["errors"] == 0
+        assert stages[stage]["latency_ms"]["p95"] is not None
+    assert any(key.startswith("chat_response_time_ms") for key in report["server_stages"])
+    assert report["upstream_requests"]["mixbread"] > 0
+
+    assert compare(report, report)[0].endswith("(+0.0)")
@@ -2,12 +2,101 @@
 Basic tests for the main application
 """
 
+import json
+
 import pytest
 from fastapi.testclient import TestClient
+
+from admission import AdmissionController
+from agents.intent_agent import IntentAgent
+from agents.rag_agent import RAGAgent
+from agents.scheduler_agent import SchedulerAgent
+from connection_hub import ConnectionHub
+from context_manager import ContextManager
+from llm_orchestrator import LLMOrchestrator
 from main import app
+from monitoring import MonitoringService
 
 client = TestClient(app)
 
+USER_ID = "6f1c2a4e-8d3b-4f7a-9c1e-2b5d7e9f0a13"
+
+
+class FakeVectorStore:
+    embedding_dimension = 2
+    index_generation = 0
+
+    async def create_embedding(self, text):
+        return [1.0, 0.0]
+
+    async def search_documents(self, query, top_k=5, query_embedding=None):
+        return [
+            {
+                "document_id": "courses.md",
+                "max_score": 0.9,
+                "chunks": [{"score": 0.9, "metadata": {"content": "We teach Python."}}],
+                "metadata": {"title": "courses"},
+            }
+        ]
+
+
+class FakeOrchestrator(LLMOrchestrator):
+    def __init__(self):
+        super().__init__(clients={})
+
+    async def stream_request(self, message, provider, **kwargs):
+        for token in ("We ", "teach ", "Python."):
+            yield token
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.conversations = []
+
+    async def get_or_create_user(self, session_id, user_data=None):
+        return {"id": f"user-{session_id}", "session_id": session_id}
+
+    async def get_user(self, session_id):
+        return {"id": USER_ID, "session_id": session_id} if session_id == "s1" else None
+
+    async def get_conversation_context(self, session_id):
+        return None
+
+    async def save_conversation_context(
+        self, session_id, summary, recent_turns, summarized, expected_version=0
+    ):
+        return expected_version + 1
+
+    async def log_conversation(self, **record):
+        self.conversations.append(record)
+        return f"conv-{len(self.conversations)}"
+
+
+@pytest.fixture
+def chat_state(monkeypatch):
+    """Populate app.state with in-process agents instead of running the lifespan
+
+    monkeypatch restores (or removes) every attribute afterwards so state does not leak
+    into later tests.
+    """
+    orchestrator = FakeOrchestrator()
+    db = FakeDatabase()
+    components = {
+        "llm_orchestrator": orchestrator,
+        "db": db,
+        "intent_agent": IntentAgent(orchestrator),
+        "rag_agent": RAGAgent(FakeVectorStore(), None, orchestrator),
+        "scheduler_agent": SchedulerAgent(None),
+        "monitoring": MonitoringService(),
+        "connection_hub": ConnectionHub(),
+        "context_manager": ContextManager(db),
+        "admission": AdmissionController(),
+    }
+    for name, component in components.items():
+        monkeypatch.setattr(app.state, name, component, raising=False)
+    yield app.state
+
+
 def test_root_endpoint():
     """Test the root endpoint"""
     response = client.get("/")
@@ -16,6 +105,7 @@ def test_root_endpoint():
     assert "message" in data
     assert data["message"] == "Bootcamp Chatbot is live"
 
+
 def test_health_endpoint():
     """Test the health check endpoint"""
     response = client.get("/health")
@@ -24,8 +114,257 @@ def test_health_endpoint():
     assert "status" in data
     assert data["status"] == "healthy"
 
+
+def test_readiness_is_separate_from_liveness(monkeypatch):
+    """/health/ready returns 503 until startup marks the app ready"""
+    from startup import StartupTracker
+
+    monkeypatch.setattr(app.state, "startup", StartupTracker(), raising=False)
+    assert client.get("/health/live").status_code == 200
+    assert client.get("/health/ready").status_code == 503
+
+    app.state.startup.mark_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["startup"]["ready"] is True
+
+
+@pytest.mark.asyncio
+async def test_warm_up_leaves_an_unloaded_voice_agent_alone(monkeypatch):
+    """Voice phrases are warmed after readiness, only when loaded or opted in"""
+    from types import SimpleNamespace
+
+    from main import warm_up
+    from startup import StartupTracker
+
+    warmed = []
+
+    class FakeVoiceAgent:
+        loaded = False
+
+        async def warm_cache(self):
+            warmed.append(state.startup.ready)
+
+    async def initialize():
+        return None
+
+    state = SimpleNamespace(
+        startup=StartupTracker(),
+        scheduler_agent=SimpleNamespace(initialize=initialize),
+        intent_agent=SimpleNamespace(embedding_classifier=None),
+        voice_agent=FakeVoiceAgent(),
+    )
+    monkeypatch.delenv("VOICE_WARMUP", raising=False)
+    await warm_up(SimpleNamespace(state=state))
+    assert state.startup.ready and warmed == []
+
+    monkeypatch.setenv("VOICE_WARMUP", "true")
+    await warm_up(SimpleNamespace(state=state))
+    assert warmed == [True]
+
+
+def test_appointment_booking_checks_the_user(chat_state, monkeypatch):
+    """Bookings need a UUID user owned by the session; database rejections become 4xx"""
+    import asyncpg
+
+    booking = {"preferred_time": "2030-01-01T10:00", "phone_number": "+61400000000"}
+    bad_id = client.post("/appointments", json={**booking, "user_id": "1", "session_id": "s1"})
+    assert bad_id.status_code == 422
+    other = client.post("/appointments", json={**booking, "user_id": USER_ID, "session_id": "s2"})
+    assert other.status_code == 403
+
+    async def missing_user(*args, **kwargs):
+        raise asyncpg.ForeignKeyViolationError("user_id not present in users")
+
+    monkeypatch.setattr(chat_state.scheduler_agent, "book_appointment", missing_user)
+    response = client.post(
+        "/appointments", json={**booking, "user_id": USER_ID, "session_id": "s1"}
+    )
+    assert response.status_code == 404
+
+
 @pytest.mark.asyncio
-async def test_chat_endpoint():
+async def test_chat_endpoint(chat_state):
     """Test the chat endpoint"""
-    # This would need proper setup with mock database
-    pass
\ No newline at end of file
+    response = client.post("/chat", json={"message": "Which course?", "session_id": "s1"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "We teach Python."
+    assert data["intent"] == "course_info"
+    assert data["sources"] == [{"document_id": "courses.md", "title": "courses"}]
+    assert data["metadata"]["conversation_id"] == "conv-1"
+    assert chat_state.db.conversations[0]["agent_type"] == "rag"
+
+
+def test_http_turns_are_mirrored_to_the_sessions_websockets(chat_state, monkeypatch):
+    """Answers given over HTTP are published to the session's tabs on any worker"""
+    published = []
+
+    async def publish(session_id, message, exclude=None):
+        published.append((session_id, message["type"], exclude))
+
+    monkeypatch.setattr(chat_state.connection_hub, "publish", publish)
+    client.post("/chat", json={"message": "Which course?", "session_id": "s1"})
+    with client.stream("POST", "/chat/stream", json={"message": "hi", "session_id": "s2"}) as r:
+        r.read()
+    assert published == [("s1", "turn", None), ("s2", "turn", None)]
+
+
+@pytest.mark.asyncio
+async def test_stream_ticket_is_released_when_the_client_never_reads(chat_state):
+    """A client gone before the first event must not keep its admission slot"""
+    from main import chat_stream
+    from models import ChatMessage
+
+    admission = chat_state.admission = AdmissionController(max_per_session=1)
+    response = await chat_stream(ChatMessage(message="hi", session_id="s1"))
+    assert admission.in_flight == 1
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    with pytest.raises(OSError):
+        await response({"type": "http"}, receive, send)
+    assert admission.in_flight == 0
+    (await admission.acquire("chat", "s1")).release()
+
+
+def test_chat_stream_endpoint(chat_state):
+    """Tokens arrive as separate SSE events before the final response"""
+    with client.stream("POST", "/chat/stream", json={"message": "hi", "session_id": "s1"}) as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (
+                block.split("\n")[0][len("event: ") :],
+                json.loads(block.split("\n")[1][len("data: ") :]),
+            )
+            for block in r.read().decode().strip().split("\n\n")
+        ]
+
+    assert [e[1]["content"] for e in events if e[0] == "token"] == ["We ", "teach ", "Python."]
+    assert events[-1][0] == "final"
+    assert events[-1][1]["message"] == "We teach Python."
+
+
+def test_websocket_chat(chat_state):
+    """The WebSocket endpoint streams tokens and registers the connection"""
+    hub = chat_state.connection_hub
+
+    with client.websocket_connect("/ws/s2") as websocket:
+        websocket.send_json({"message": "hello"})
+        events = []
+        while not events or events[-1]["type"] != "final":
+            events.append(websocket.receive_json())
+        assert "s2" in hub
+
+    assert [e["content"] for e in events[:-1]] == ["We ", "teach ", "Python."]
+    assert events[-1]["response"]["session_id"] == "s2"
+    assert "s2" not in hub
+
+
+def test_voice_websocket_streams_transcripts_tokens_and_audio(chat_state, tmp_path):
+    """Audio frames in, partial transcripts, tokens and per-sentence audio out"""
+    from agents.voice_agent import FakeSpeechToText, FakeTextToSpeech, PhraseAudioCache, VoiceAgent
+
+    chat_state.voice_agent = VoiceAgent(
+        FakeSpeechToText(), FakeTextToSpeech(), PhraseAudioCache(str(tmp_path))
+    )
+    with client.websocket_connect("/ws/voice/v1") as websocket:
+        websocket.send_bytes(b"which")
+        websocket.send_bytes(b"course")
+        websocket.send_json({"type": "end"})
+
+        events = []
+        while True:
+            event = websocket.receive_json()
+            events.append(event)
+            if event["type"] == "audio":
+                assert websocket.receive_bytes() == b"FAKEAUDIO:" + event["text"].encode()
+                if event["text"].endswith("Python."):
+                    break
+
+    transcripts = [e for e in events if e["type"] == "transcript"]
+    assert transcripts[-1] == {"type": "transcript", "text": "which course", "final": True}
+    assert [e["text"] for e in events if e["type"] == "audio"] == ["We teach Python."]
+    assert [e for e in events if e["type"] == "final"][0]["response"]["intent"] == "course_info"
+
+
+def test_voice_websocket_reports_transcription_errors_and_stays_open(chat_state, tmp_path):
+    """A failing STT engine gets an error event; the next utterance is still served"""
+    from agents.voice_agent import FakeSpeechToText, FakeTextToSpeech, PhraseAudioCache, VoiceAgent
+
+    class FlakySpeechToText(FakeSpeechToText):
+        async def transcribe(self, frames):
+            async for frame in frames:
+                if frame == b"garbled":
+                    raise RuntimeError("recognition connection failed")
+                yield {"text": frame.decode(), "final": False}
+            yield {"text": "", "final": True}
+
+    chat_state.voice_agent = VoiceAgent(
+        FlakySpeechToText(), FakeTextToSpeech(), PhraseAudioCache(str(tmp_path))
+    )
+    with client.websocket_connect("/ws/voice/v1") as websocket:
+        websocket.send_bytes(b"garbled")
+        websocket.send_bytes(b"more")
+        websocket.send_json({"type": "end"})
+        assert websocket.receive_json()["type"] == "error"
+
+        websocket.send_json({"type": "end"})
+        assert websocket.receive_json() == {"type": "transcript", "text": "", "final": True}
+
+
+@pytest.mark.asyncio
+async def test_debug_trace_breaks_down_chat_stages(chat_state):
+    """In debug mode the final response carries per-stage span timings"""
+    from main import stream_chat
+    from models import ChatMessage
+    from tracing import start_trace
+
+    message = ChatMessage(message="Which course?", session_id="t1")
+    with start_trace("POST /chat", debug=True):
+        events = [event async for event in stream_chat(message)]
+
+    trace = events[-1]["response"]["metadata"]["trace"]
+    assert {"agent.intent", "agent.rag"} <= set(trace["stages_ms"])
+    assert trace["total_ms"] >= trace["stages_ms"]["agent.rag"]
+
+
+def test_admin_profile_requires_token(monkeypatch):
+    """The profiler is admin-only and returns folded stacks"""
+    monkeypatch.setenv("ADMIN_API_TOKEN", "secret")
+    denied = client.get("/admin/profile", headers={"Authorization": "Bearer nope"})
+    assert denied.status_code == 403
+
+    response = client.get(
+        "/admin/profile?seconds=0.2&interval_ms=2", headers={"Authorization": "Bearer secret"}
+    )
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    assert response.text.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_ingest_requires_admin_token(monkeypatch):
+    """Starting a paid re-embedding run is admin-only"""
+    monkeypatch.setenv("ADMIN_API_TOKEN", "secret")
+    response = client.post(
+        "/ingest", json={"paths": ["uploads"]}, headers={"Authorization": "Bearer nope"}
+    )
+    assert response.status_code == 403
+    assert client.post("/ingest", json={"paths": ["uploads"]}).status_code == 403
+
+
+def test_shed_chat_gets_503_with_retry_after(chat_state):
+    """A saturated worker answers chat with a fast 503 instead of running it"""
+    admission = chat_state.admission = AdmissionController(
+        max_concurrent=1, max_queue_delay_ms={"chat": 10}
+    )
+    admission.in_flight = 1
+
+    response = client.post("/chat", json={"message": "Hi", "session_id": "s1"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert chat_state.db.conversations == []
@@ -0,0 +1,116 @@
+"""
+Tests for the metrics core and Prometheus exposition
+"""
+
+import json
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from monitoring import Histogram, MetricsRegistry, MonitoringService
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram([10, 20, 50, 100])
+    for value in range(1, 101):
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.10) == 10
+    assert 40 <= histogram.quantile(0.50) <= 50
+    assert 90 <= histogram.quantile(0.99) <= 100
+
+
+def test_prometheus_rendering_is_cumulative():
+    registry = MetricsRegistry(latency_buckets=[5, 50])
+    registry.describe("req_ms", "Request latency")
+    for value in (1, 10, 100):
+        registry.observe("req_ms", value, {"endpoint": "chat"})
+    registry.inc("calls_total", 2, {"provider": "groq"})
+    registry.register_collector(lambda: [("cache_hits_total", {}, 7)])
+
+    text = MetricsRegistry.render_prometheus(registry.state())
+
+    assert "# TYPE req_ms histogram" in text
+    assert 'req_ms_bucket{endpoint="chat",le="5"} 1' in text
+    assert 'req_ms_bucket{endpoint="chat",le="50"} 2' in text
+    assert 'req_ms_bucket{endpoint="chat",le="+Inf"} 3' in text
+    assert 'req_ms_count{endpoint="chat"} 3' in text
+    assert 'calls_total{provider="groq"} 2' in text
+    assert "cache_hits_total 7" in text
+
+
+def test_snapshots_from_other_workers_are_aggregated(tmp_path, monkeypatch):
+    """Counters sum and histograms merge across live worker snapshot files"""
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    other = MetricsRegistry(latency_buckets=[10])
+    other.inc("chats_total", 3)
+    other.observe("chat_ms", 5)
+    with open(tmp_path / f"metrics_{os.getppid()}.json", "w") as f:
+        json.dump(other.state(), f)
+    with open(tmp_path / "metrics_999999999.json", "w") as f:
+        json.dump(other.state(), f)
+
+    local = MetricsRegistry(latency_buckets=[10])
+    local.inc("chats_total", 1)
+    local.observe("chat_ms", 7)
+    service = MonitoringService(registry=local)
+    service.write_snapshot()
+
+    text = service.render_prometheus()
+    assert "chats_total 4" in text
+    assert "chat_ms_count 2" in text
+
+
+def test_gauges_render_as_gauges_and_are_not_summed_blindly(tmp_path, monkeypatch):
+    """Gauges keep their type; per-worker values sum, take the max, or stay separate"""
+
+    def worker(in_flight, circuit_open, queued):
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: [("in_flight", {}, in_flight)], "gauge", "sum")
+        registry.register_collector(
+            lambda: [("circuit_open", {"upstream": "groq"}, circuit_open)], "gauge", "max"
+        )
+        registry.register_collector(lambda: [("queued", {}, queued)], "gauge")
+        return registry
+
+    local = worker(3, False, 1)
+    text = MetricsRegistry.render_prometheus(local.state())
+    assert "# TYPE in_flight gauge" in text and "in_flight 3" in text
+
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    other = worker(2, True, 4).state()
+    other["pid"] = os.getppid()
+    with open(tmp_path / f"metrics_{os.getppid()}.json", "w") as f:
+        json.dump(other, f)
+
+    text = MonitoringService(registry=local).render_prometheus()
+    assert "in_flight 5" in text
+    assert 'circuit_open{upstream="groq"} 1' in text
+    assert f'queued{{worker="{os.getpid()}"}} 1' in text
+    assert f'queued{{worker="{os.getppid()}"}} 4' in text
+    assert "# TYPE queued gauge" in text and "# TYPE queued counter" not in text
+
+
+def test_recording_stays_in_microseconds():
+    registry = MetricsRegistry()
+    labels = {"agent_type": "rag"}
+    iterations = 20000
+    started = time.perf_counter()
+    for i in range(iterations):
+        registry.observe("chat_response_time_ms", i % 500, labels)
+    per_call_us = (time.perf_counter() - started) / iterations * 1e6
+    assert per_call_us < 20
+
+
+def test_metrics_endpoint_reports_http_latency():
+    client = TestClient(app)
+    client.get("/")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_ms_count{endpoint="root"}' in response.text
+    assert 'http_requests_total{endpoint="root",status="200"}' in response.text
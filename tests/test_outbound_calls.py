@@ -0,0 +1,153 @@
+import asyncio
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from agents.telephony_agent import TelephonyAgent
+from benchmarks.fakes import FakeTwilioClient, FaultInjector
+from outbound_calls import (
+    DONE,
+    FAILED,
+    IN_PROGRESS,
+    PENDING,
+    OutboundCallQueue,
+    OutboundCallWorkerPool,
+)
+
+
+@pytest.mark.asyncio
+async def test_call_rate_is_shared_by_processes_using_the_queue(tmp_path):
+    path = str(tmp_path / "calls.sqlite3")
+    client = FakeTwilioClient()
+    # Two processes' pools, each with its own connection to the same queue file
+    pools = [
+        OutboundCallWorkerPool(
+            OutboundCallQueue(path), client, workers=4, calls_per_second=20.0, poll_interval=0.01
+        )
+        for _ in range(2)
+    ]
+    for n in range(6):
+        pools[0].queue.enqueue(f"+6140000000{n}", "<Response/>")
+    for pool in pools:
+        pool.start()
+    for pool in pools:
+        await pool.drain(timeout=5)
+    for pool in pools:
+        await pool.close()
+
+    assert pools[0].queue.counts()[DONE] == 6
+    times = sorted(call["at"] for call in client.calls)
+    # 20/s in total across both pools: six calls need at least 0.25s
+    assert times[-1] - times[0] >= 0.2
+    for pool in pools:
+        pool.queue.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_calls_retry_with_backoff_then_fail(tmp_path):
+    queue = OutboundCallQueue(str(tmp_path / "calls.sqlite3"))
+    client = FakeTwilioClient(FaultInjector(error_rate=1.0))
+    pool = OutboundCallWorkerPool(
+        queue,
+        client,
+        workers=1,
+        calls_per_second=100.0,
+        max_attempts=3,
+        backoff_seconds=0.01,
+        poll_interval=0.01,
+    )
+    job_id = queue.enqueue("+61400000000", "<Response/>")
+    pool.start()
+    for _ in range(200):
+        if queue.get(job_id)["status"] == FAILED:
+            break
+        await asyncio.sleep(0.01)
+    await pool.close()
+
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+    assert "Injected twilio failure" in job["last_error"]
+    queue.close()
+
+
+def test_queue_survives_restart_and_reclaims_expired_leases(tmp_path):
+    path = str(tmp_path / "calls.sqlite3")
+    queue = OutboundCallQueue(path, lease_seconds=60)
+    first = queue.enqueue("+61400000001", "<Response/>", {"name": "Sam"})
+    second = queue.enqueue("+61400000002", "<Response/>")
+    assert queue.claim()["id"] == first
+    queue.close()
+
+    # Another process starting up leaves a job with a live lease alone
+    reopened = OutboundCallQueue(path, lease_seconds=60)
+    assert reopened.counts()[IN_PROGRESS] == 1
+    assert reopened.claim()["id"] == second
+    assert reopened.claim() is None
+
+    # Once the lease runs out, the job is retried
+    reclaimed = reopened.claim(now=time.time() + 61)
+    assert reclaimed["id"] == first and reclaimed["attempts"] == 2
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_inbound_twiml_is_rendered_once_per_variant(monkeypatch):
+    monkeypatch.setenv("BUSINESS_TIMEZONE", "Australia/Sydney")
+    agent = TelephonyAgent()
+    sydney = ZoneInfo("Australia/Sydney")
+    open_at = datetime(2024, 3, 4, 10, 0, tzinfo=sydney)  # Monday
+    closed_at = datetime(2024, 3, 9, 10, 0, tzinfo=sydney)  # Saturday
+
+    first = await agent.handle_inbound_call("CA1", "+61400000001", now=open_at)
+    second = await agent.handle_inbound_call("CA2", "+61400000002", now=open_at)
+    closed = await agent.handle_inbound_call("CA3", "+61400000003", now=closed_at)
+
+    assert first is second
+    assert "<Record" in closed and "available from 9:00 AM" in closed
+    assert agent.renderer.cache_info().misses == 2
+    assert agent.renderer.cache_info().hits == 1
+
+
+@pytest.mark.asyncio
+async def test_outbound_reminder_goes_through_the_queue(tmp_path):
+    client = FakeTwilioClient()
+    agent = TelephonyAgent(
+        call_client=client, queue=OutboundCallQueue(str(tmp_path / "calls.sqlite3"))
+    )
+    job_id = await agent.make_outbound_call("+61400000000", {"name": "Sam & Co", "when": "Friday"})
+    await agent._pool.drain(timeout=5)
+
+    assert agent.outbound_stats()[DONE] == 1
+    assert client.calls[0]["to"] == "+61400000000"
+    assert "Sam &amp; Co" in client.calls[0]["twiml"]
+    assert agent._pool.queue.get(job_id)["call_sid"] == client.calls[0]["sid"]
+    await agent.close()
+
+
+@pytest.mark.asyncio
+async def test_closed_notice_follows_working_days(monkeypatch):
+    monkeypatch.setenv("WORKING_DAYS", "0,2,4")
+    monkeypatch.setenv("BUSINESS_HOURS_END", "13:30")
+    agent = TelephonyAgent()
+    assert agent.hours_notice().startswith(
+        "Our advisors are available from 9:00 AM to 1:30 PM, Monday, Wednesday and Friday."
+    )
+    monkeypatch.setenv("WORKING_DAYS", "1,2,3,4,5")
+    assert "Tuesday to Saturday" in TelephonyAgent().hours_notice()
+
+
+@pytest.mark.asyncio
+async def test_start_outbound_resumes_saved_jobs(tmp_path):
+    queue = OutboundCallQueue(str(tmp_path / "calls.sqlite3"))
+    job_id = queue.enqueue("+61400000000", "<Response/>")
+    client = FakeTwilioClient()
+    agent = TelephonyAgent(call_client=client, queue=queue)
+
+    agent.start_outbound()
+    await agent._pool.drain(timeout=5)
+
+    assert queue.get(job_id)["status"] == DONE
+    await agent.close()
@@ -0,0 +1,64 @@
+"""
+Tests for the quantized vector index
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_quantization import synthetic_corpus
+from quantized_index import QuantizedVectorIndex
+from vector_index import LocalVectorIndex
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return synthetic_corpus(2000, 64, latent=16, clusters=32)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_recall_after_exact_rerank(corpus, quantization, tmp_path):
+    ids = [f"c{i}" for i in range(len(corpus))]
+    exact = LocalVectorIndex(dimension=64)
+    exact.upsert(ids, corpus)
+    index = QuantizedVectorIndex(dimension=64, quantization=quantization, rerank_candidates=100)
+    index.upsert(ids, corpus)
+
+    queries = corpus[:50] + 0.05 * np.random.default_rng(1).standard_normal((50, 64))
+    hits = 0
+    for query in queries:
+        expected = exact.search(query, 10)
+        results = index.search(query, 10)
+        hits += len({r[0] for r in expected} & {r[0] for r in results})
+        # Scores are exact cosine similarities, not approximations
+        assert results[0][1] == pytest.approx(expected[0][1], abs=1e-5)
+    assert hits / 500 >= 0.95
+
+    # Until saved, full rows are held in RAM; afterwards only the codes are
+    index.save(str(tmp_path))
+    assert index.resident_bytes < exact.vectors.nbytes / 3
+
+
+def test_save_serves_full_rows_from_memory_map(corpus, tmp_path):
+    ids = [f"c{i}" for i in range(len(corpus))]
+    index = QuantizedVectorIndex(dimension=64, quantization="int8")
+    index.upsert(ids, corpus, [{"n": i} for i in range(len(corpus))])
+    index.delete(["c0", "c5"])
+    index.save(str(tmp_path))
+    assert index.resident_bytes == len(index) * (64 + 4)
+
+    loaded = QuantizedVectorIndex.load(str(tmp_path), dimension=64, quantization="int8")
+    assert isinstance(loaded._full, np.memmap)
+    assert len(loaded) == 1998 and "c5" not in loaded
+    assert loaded.search(corpus[7], 1)[0][:1] == ("c7",)
+    assert loaded.search(corpus[7], 1, candidates=["c7", "c8"])[0][2] == {"n": 7}
+
+
+def test_loads_a_float_index_and_encodes_it(corpus, tmp_path):
+    ids = [f"c{i}" for i in range(200)]
+    exact = LocalVectorIndex(dimension=64)
+    exact.upsert(ids, corpus[:200])
+    exact.save(str(tmp_path))
+
+    index = QuantizedVectorIndex.load(str(tmp_path), dimension=64, quantization="binary")
+    assert len(index) == 200
+    assert [r[0] for r in index.search(corpus[3], 3)] == [r[0] for r in exact.search(corpus[3], 3)]
@@ -0,0 +1,136 @@
+"""
+Tests for the RAG agent and its semantic answer cache
+"""
+
+import time
+
+import pytest
+
+from agents.rag_agent import RAGAgent
+from llm_orchestrator import LLMOrchestrator
+from semantic_cache import SemanticCache
+
+
+class FakeVectorStore:
+    embedding_dimension = 3
+
+    def __init__(self):
+        self.index_generation = 0
+        self.searches = 0
+        self.embeddings = {
+            "what are the fees?": [1.0, 0.0, 0.0],
+            "what are the fees": [0.99, 0.05, 0.0],
+            "when does it start?": [0.0, 1.0, 0.0],
+        }
+
+    async def create_embedding(self, text):
+        return self.embeddings[text]
+
+    async def search_documents(self, query, top_k=5, query_embedding=None):
+        self.searches += 1
+        return [
+            {
+                "document_id": "fees.md",
+                "max_score": 0.87,
+                "chunks": [{"score": 0.87, "metadata": {"content": "Fees are $5,000."}}],
+                "metadata": {"title": "fees"},
+            }
+        ]
+
+
+class FakeOrchestrator:
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_request(self, message, provider, **kwargs):
+        self.calls += 1
+        for token in ("The bootcamp ", "costs ", "$5,000."):
+            yield token
+
+
+def test_semantic_cache_threshold_and_ttl(monkeypatch):
+    """Lookups hit above the threshold and expire after the TTL"""
+    cache = SemanticCache(dimension=2, threshold=0.9, ttl_seconds=10, max_entries=2)
+    cache.store([1.0, 0.0], {"message": "a"})
+
+    assert cache.lookup([1.0, 0.1])[0] == {"message": "a"}
+    assert cache.lookup([0.0, 1.0]) is None
+
+    now = time.monotonic()
+    monkeypatch.setattr("semantic_cache.time.monotonic", lambda: now + 11)
+    assert cache.lookup([1.0, 0.0]) is None
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    """A full cache replaces the entry that was used longest ago"""
+    cache = SemanticCache(dimension=2, threshold=0.99, max_entries=2)
+    cache.store([1.0, 0.0], {"message": "x"})
+    cache.store([0.0, 1.0], {"message": "y"})
+    cache.lookup([1.0, 0.0])
+    cache.store([1.0, 1.0], {"message": "z"})
+
+    assert cache.lookup([1.0, 0.0])[0] == {"message": "x"}
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_repeat_question_skips_retrieval_and_llm():
+    """Near-identical questions are answered from the cache"""
+    store, llm = FakeVectorStore(), FakeOrchestrator()
+    agent = RAGAgent(store, None, llm)
+
+    first = await agent.handle_request({"message": "what are the fees?"}, "u1")
+    second = await agent.handle_request({"message": "what are the fees"}, "u2")
+
+    assert first["metadata"]["cache"] == "miss"
+    assert second["metadata"]["cache"] == "hit"
+    assert second["message"] == first["message"] == "The bootcamp costs $5,000."
+    assert second["sources"] == [{"document_id": "fees.md", "title": "fees"}]
+    assert store.searches == 1 and llm.calls == 1
+
+    await agent.handle_request({"message": "when does it start?"}, "u3")
+    assert store.searches == 2
+
+
+@pytest.mark.asyncio
+async def test_reingestion_invalidates_cache():
+    """A new index generation forces a fresh answer"""
+    store, llm = FakeVectorStore(), FakeOrchestrator()
+    agent = RAGAgent(store, None, llm)
+
+    await agent.handle_request({"message": "what are the fees?"}, "u1")
+    store.index_generation += 1
+    result = await agent.handle_request({"message": "what are the fees?"}, "u1")
+
+    assert result["metadata"]["cache"] == "miss"
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_follow_up_with_history_bypasses_cache():
+    """Answers that depend on conversation history bypass the semantic cache"""
+    store, llm = FakeVectorStore(), FakeOrchestrator()
+    agent = RAGAgent(store, None, llm)
+    history = "User: Tell me about Data Science\nAssistant: It runs 12 weeks."
+
+    await agent.handle_request({"message": "what are the fees?"}, "u1")
+    result = await agent.handle_request({"message": "what are the fees?", "history": history}, "u1")
+
+    assert result["metadata"]["cache"] == "miss"
+    assert llm.calls == 2
+    assert "Conversation so far:\n" + history in agent.build_prompt("q", [], history)
+
+
+@pytest.mark.asyncio
+async def test_placeholder_answers_are_not_cached():
+    """Answers given without a working provider must not outlive the provider coming up"""
+    store = FakeVectorStore()
+    for orchestrator in (None, LLMOrchestrator()):
+        agent = RAGAgent(store, None, orchestrator)
+        await agent.handle_request({"message": "what are the fees?"}, "u1")
+        assert len(agent.semantic_cache) == 0
+
+    agent.llm_orchestrator = FakeOrchestrator()
+    result = await agent.handle_request({"message": "what are the fees?"}, "u1")
+    assert result["message"] == "The bootcamp costs $5,000."
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from startup import LazyComponent, StartupTracker
+
+
+@pytest.mark.asyncio
+async def test_gather_runs_initializers_concurrently_and_times_each():
+    tracker = StartupTracker()
+
+    async def init(delay):
+        await asyncio.sleep(delay)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await tracker.gather(database=init(0.05), vector_store=init(0.05))
+
+    assert loop.time() - started < 0.09
+    assert set(tracker.timings_ms) == {"database", "vector_store"}
+    assert all(ms >= 40 for ms in tracker.timings_ms.values())
+    assert not tracker.ready
+
+
+@pytest.mark.asyncio
+async def test_gather_waits_for_all_then_raises_first_failure():
+    tracker = StartupTracker()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        finished.append("slow")
+
+    async def broken():
+        raise ConnectionError("database unreachable")
+
+    with pytest.raises(ConnectionError):
+        await tracker.gather(database=broken(), vector_store=slow())
+    assert finished == ["slow"]
+    assert tracker.errors == {"database": "database unreachable"}
+
+
+def test_mark_ready_reports_components():
+    tracker = StartupTracker()
+    tracker.timings_ms["database"] = 12.5
+    tracker.mark_ready()
+    report = tracker.to_dict()
+    assert report["ready"] is True
+    assert report["components_ms"] == {"database": 12.5}
+    assert report["ready_after_ms"] >= 0
+
+
+def test_lazy_component_constructs_on_first_use():
+    lazy = LazyComponent("collections", "Counter", "aab")
+    assert not lazy.loaded
+    assert lazy.most_common(1) == [("a", 2)]
+    assert lazy.loaded
+    assert lazy.get() is lazy.get()
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from tracing import SamplingProfiler, TraceExporter, current_trace, span, start_trace, traced
+
+
+@traced("work")
+async def work(delay):
+    await asyncio.sleep(delay)
+    with span("inner", step=1):
+        await asyncio.sleep(delay)
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_and_are_isolated_per_task():
+    assert current_trace() is None
+    with span("ignored") as nothing:
+        assert nothing is None
+
+    with start_trace("request") as trace:
+        await asyncio.gather(work(0.01), work(0.01))
+
+    assert current_trace() is None
+    names = [s.name for s in trace.spans]
+    assert sorted(names) == ["inner", "inner", "work", "work"]
+    works = {s.span_id for s in trace.spans if s.name == "work"}
+    # Concurrent tasks each parent their inner span to their own outer span
+    assert {s.parent_id for s in trace.spans if s.name == "inner"} == works
+
+    breakdown = trace.breakdown()
+    assert breakdown["stages_ms"]["work"] >= breakdown["stages_ms"]["inner"] >= 20
+    assert breakdown["spans"][-1]["attributes"] == {"step": 1}
+
+
+@pytest.mark.asyncio
+async def test_exported_file_loads_as_chrome_trace(tmp_path):
+    path = tmp_path / "traces" / "trace.json"
+    exporter = TraceExporter(str(path), flush_every=2)
+    for _ in range(3):
+        with start_trace("request", exporter=exporter):
+            await work(0)
+    exporter.flush()
+
+    # Viewers accept the unterminated array; close it to parse strictly here
+    events = json.loads(path.read_text().rstrip().rstrip(",") + "]")
+    assert len(events) == 3 * 3
+    assert {e["ph"] for e in events} == {"X"}
+    assert {e["name"] for e in events} == {"request", "work", "inner"}
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_folds_stacks():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,))
+    thread.start()
+    profiler = SamplingProfiler(thread.ident, interval=0.001)
+    profiler.start()
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    thread.join()
+
+    assert profiler.sample_count > 10
+    lines = profiler.folded().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "busy_loop (test_tracing.py" in stack.split(";")[-1]
+    assert int(count) > 0
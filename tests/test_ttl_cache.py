@@ -0,0 +1,32 @@
+"""
+Tests for the bounded TTL cache
+"""
+
+import time
+
+from ttl_cache import TTLCache
+
+
+def test_entries_expire(monkeypatch):
+    cache = TTLCache(ttl_seconds=10, negative_ttl_seconds=1)
+    cache.set("user", {"id": 1})
+    cache.set_negative("ghost")
+    assert cache.get("user") == (True, {"id": 1})
+    assert cache.get("ghost") == (True, None)
+
+    now = time.monotonic()
+    monkeypatch.setattr("ttl_cache.time.monotonic", lambda: now + 5)
+    assert cache.get("ghost") == (False, None)
+    assert cache.get("user") == (True, {"id": 1})
+
+
+def test_size_is_bounded_by_lru():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()["evictions"] == 1
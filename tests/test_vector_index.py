@@ -0,0 +1,99 @@
+"""
+Tests for the in-process vector index and local VectorStore mode
+"""
+
+import numpy as np
+import pytest
+
+from vector_index import LocalVectorIndex
+from vector_store import VectorStore
+
+
+def _random_vectors(count: int, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+
+
+def test_search_returns_top_k_in_score_order():
+    """Top-k results match a full sort of the cosine scores"""
+    vectors = _random_vectors(200)
+    index = LocalVectorIndex(dimension=16, initial_capacity=8)
+    index.upsert([f"c{i}" for i in range(200)], vectors, [{"n": i} for i in range(200)])
+
+    query = vectors[42]
+    results = index.search(query, top_k=5)
+
+    normalised = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalised @ (query / np.linalg.norm(query))))[:5]
+    assert [r[0] for r in results] == [f"c{i}" for i in expected]
+    assert results[0][0] == "c42"
+    assert results[0][2] == {"n": 42}
+
+
+def test_upsert_overwrites_and_delete_compacts():
+    """Re-upserting an id replaces its row and delete keeps ids consistent"""
+    vectors = _random_vectors(3)
+    index = LocalVectorIndex(dimension=16)
+    index.upsert(["a", "b", "c"], vectors)
+    index.upsert(["a"], vectors[2:3], [{"replaced": True}])
+    assert len(index) == 3
+
+    assert index.delete(["a", "missing"]) == 1
+    assert len(index) == 2
+    assert index.search(vectors[2], top_k=1)[0][0] == "c"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """An index saved to disk loads back with identical results"""
+    vectors = _random_vectors(50)
+    index = LocalVectorIndex(dimension=16)
+    index.upsert([f"c{i}" for i in range(50)], vectors, [{"n": i} for i in range(50)])
+    index.save(str(tmp_path))
+
+    loaded = LocalVectorIndex.load(str(tmp_path), dimension=16)
+    assert len(loaded) == 50
+    assert loaded.search(vectors[7], top_k=3) == index.search(vectors[7], top_k=3)
+
+
+@pytest.mark.asyncio
+async def test_local_mode_groups_chunks_by_document(monkeypatch, tmp_path):
+    """search_documents keeps the per-document max_score/chunks shape"""
+    monkeypatch.setenv("VECTOR_STORE_MODE", "local")
+    monkeypatch.setenv("MIXBREAD_API_KEY", "test")
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+
+    store = VectorStore()
+    store.embedding_dimension = 16
+    await store.initialize()
+    vectors = _random_vectors(3)
+    await store.upsert_chunks(
+        [
+            {
+                "id": "d1#0",
+                "embedding": vectors[0],
+                "metadata": {"document_id": "d1", "title": "One"},
+            },
+            {
+                "id": "d1#1",
+                "embedding": vectors[1],
+                "metadata": {"document_id": "d1", "title": "One"},
+            },
+            {
+                "id": "d2#0",
+                "embedding": vectors[2],
+                "metadata": {"document_id": "d2", "title": "Two"},
+            },
+        ]
+    )
+
+    async def fake_embedding(text):
+        return vectors[0].tolist()
+
+    monkeypatch.setattr(store, "create_embedding", fake_embedding)
+    results = await store.search_documents("anything", top_k=2)
+
+    assert results[0]["document_id"] == "d1"
+    assert results[0]["max_score"] == pytest.approx(1.0, abs=1e-5)
+    assert len(results[0]["chunks"]) == 2
+    assert results[0]["metadata"] == {"title": "One"}
+    await store.close()
@@ -0,0 +1,158 @@
+"""
+Tests for the streaming voice agent and phrase audio cache
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from agents.voice_agent import (
+    FakeSpeechToText,
+    FakeTextToSpeech,
+    PhraseAudioCache,
+    VoiceAgent,
+    split_sentences,
+)
+
+
+def _agent(tmp_path, delay=0.0) -> VoiceAgent:
+    return VoiceAgent(FakeSpeechToText(), FakeTextToSpeech(delay), PhraseAudioCache(str(tmp_path)))
+
+
+async def _iterate(items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+def test_split_sentences_keeps_remainder():
+    sentences, rest = split_sentences("Fees are $4.5k. Classes start in March! Payment")
+    assert sentences == ["Fees are $4.5k.", "Classes start in March!"]
+    assert rest == "Payment"
+
+
+@pytest.mark.asyncio
+async def test_transcribe_stream_emits_partials(tmp_path):
+    partials = []
+
+    async def on_partial(text):
+        partials.append(text)
+
+    agent = _agent(tmp_path)
+    final = await agent.transcribe_stream(_iterate([b"what are", b"the fees"]), on_partial)
+    assert partials == ["what are", "what are the fees"]
+    assert final == "what are the fees"
+    assert await agent.speech_to_text(b"hello there") == "hello there"
+
+
+@pytest.mark.asyncio
+async def test_audio_starts_before_generation_finishes(tmp_path):
+    """The first sentence is synthesized while later tokens are still arriving"""
+    agent = _agent(tmp_path)
+    consumed = []
+
+    async def tokens():
+        for token in ["Hello ", "there. ", "Fees are ", "$5,000. ", "Bye"]:
+            consumed.append(token)
+            await asyncio.sleep(0.01)
+            yield token
+
+    results = []
+    async for sentence, audio in agent.synthesize_stream(tokens()):
+        results.append((sentence, audio, len(consumed)))
+
+    assert [r[0] for r in results] == ["Hello there.", "Fees are $5,000.", "Bye"]
+    assert results[0][1] == b"FAKEAUDIO:Hello there."
+    assert results[0][2] < 5
+
+
+@pytest.mark.asyncio
+async def test_phrase_cache_is_content_addressed(tmp_path):
+    agent = _agent(tmp_path)
+    await agent.warm_cache(["Hi, how can I help?"])
+    assert await agent.text_to_speech("Hi,   how can I help?") == b"FAKEAUDIO:Hi, how can I help?"
+    assert agent.tts.calls == 1
+    assert agent.cache.stats() == {"hits": 1, "misses": 1}
+
+    # A different engine never reuses another engine's audio
+    assert agent.cache.get("other-engine", "Hi, how can I help?") is None
+
+
+def test_enforce_limit_removes_oldest(tmp_path):
+    cache = PhraseAudioCache(str(tmp_path), max_bytes=10)
+    cache.put("fake", "first", b"123456")
+    cache.put("fake", "second", b"123456")
+    old = cache._path(cache.key("fake", "first"))
+    os.utime(old, (1, 1))
+    cache.enforce_limit()
+    assert cache.get("fake", "first") is None
+    assert cache.get("fake", "second") == b"123456"
+
+
+@pytest.mark.asyncio
+async def test_only_registered_phrases_are_written_to_disk(tmp_path):
+    agent = _agent(tmp_path)
+    await agent.text_to_speech("Your appointment with Sam is at 3pm.")
+    await agent.text_to_speech("Sorry, I didn't catch that.  Could you say it again?")
+    assert agent.cache.get("fake", "Your appointment with Sam is at 3pm.") is None
+    assert agent.cache.get("fake", "Sorry, I didn't catch that. Could you say it again?")
+
+
+def test_hours_phrase_follows_business_hours(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DAYS", "1,3")
+    monkeypatch.setenv("BUSINESS_HOURS_START", "08:30")
+    monkeypatch.setenv("BUSINESS_HOURS_END", "16:00")
+    monkeypatch.setenv("BUSINESS_TIMEZONE", "America/New_York")
+    agent = _agent(tmp_path)
+    hours = "Our advisors are available Tuesday and Thursday, 8:30 AM to 4:00 PM New York time."
+    assert hours in agent.phrases
+    assert agent.cache.cacheable(hours)
+
+
+def test_zero_lookahead_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setenv("VOICE_TTS_LOOKAHEAD", "0")
+    with pytest.raises(ValueError):
+        _agent(tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_synthesis_runs_a_bounded_number_of_sentences_ahead(tmp_path, monkeypatch):
+    monkeypatch.setenv("VOICE_TTS_LOOKAHEAD", "2")
+    agent = _agent(tmp_path, delay=0.01)
+    active, peak = 0, 0
+    synthesize = agent.tts.synthesize
+
+    async def tracked(text):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await synthesize(text)
+        finally:
+            active -= 1
+
+    agent.tts.synthesize = tracked
+    sentences = [f"Sentence {n}. " for n in range(8)]
+    results = [s async for s, _ in agent.synthesize_stream(_iterate(sentences))]
+
+    assert results == [s.strip() for s in sentences]
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_process_voice_conversation_answers_a_recording(tmp_path):
+    agent = _agent(tmp_path)
+
+    async def respond(transcript):
+        return f"You asked: {transcript}. Fees are listed online."
+
+    result = await agent.process_voice_conversation(b"what are the fees", respond)
+    assert result["success"] and result["transcript"] == "what are the fees"
+    assert [s["text"] for s in result["segments"]] == [
+        "You asked: what are the fees.",
+        "Fees are listed online.",
+    ]
+    assert result["segments"][1]["audio"] == b"FAKEAUDIO:Fees are listed online."
+    assert not (await agent.process_voice_conversation(b"", respond))["success"]
@@ -0,0 +1,287 @@
+"""
+Tracing - per-request spans carried in context variables, plus a sampling profiler
+A trace is started per HTTP request by TracingMiddleware; span() blocks anywhere below
+it record their timing into that trace and cost almost nothing when none is active.
+Finished traces can be appended to a Chrome trace-event file (chrome://tracing, Perfetto).
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = id(self)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+
+class Trace:
+    """All spans recorded for one request"""
+
+    def __init__(self, name: str, debug: bool = False):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.debug = debug
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Per-stage timings in ms: totals by span name and the individual spans"""
+        end = self.end or time.perf_counter()
+        by_name: Dict[str, float] = {}
+        spans = []
+        for s in self.spans:
+            duration = ((s.end or end) - s.start) * 1000
+            by_name[s.name] = round(by_name.get(s.name, 0.0) + duration, 2)
+            spans.append(
+                {
+                    "name": s.name,
+                    "start_ms": round((s.start - self.start) * 1000, 2),
+                    "duration_ms": round(duration, 2),
+                    **({"attributes": s.attributes} if s.attributes else {}),
+                }
+            )
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((end - self.start) * 1000, 2),
+            "stages_ms": by_name,
+            "spans": spans,
+        }
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        """Chrome trace-event "complete" events; one pseudo-thread per trace"""
+        end = self.end or time.perf_counter()
+        base_us = self.started_at * 1e6
+        tid = int(self.trace_id[:8], 16)
+        events = [
+            {
+                "name": self.name,
+                "ph": "X",
+                "pid": os.getpid(),
+                "tid": tid,
+                "ts": base_us,
+                "dur": (end - self.start) * 1e6,
+                "args": {"trace_id": self.trace_id},
+            }
+        ]
+        for s in self.spans:
+            events.append(
+                {
+                    "name": s.name,
+                    "ph": "X",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "ts": base_us + (s.start - self.start) * 1e6,
+                    "dur": ((s.end or end) - s.start) * 1e6,
+                    "args": s.attributes,
+                }
+            )
+        return events
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span, if a trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent is not None else None, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # An async generator finalized from another context
+            pass
+        metrics.observe("span_duration_ms", (current.end - current.start) * 1000, {"span": name})
+
+
+def traced(name: str):
+    """Decorator wrapping an async function in a span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TraceExporter:
+    """Appends trace events to a JSON array file, the format chrome://tracing loads
+
+    The closing bracket is never written; trace viewers accept the open array, which
+    lets every flush be a plain append.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self._pending: List[Dict[str, Any]] = []
+        self._traces = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def export(self, trace: Trace):
+        with self._lock:
+            self._pending.extend(trace.trace_events())
+            self._traces += 1
+            if self._traces % self.flush_every == 0:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write("[\n")
+            f.writelines(json.dumps(event) + ",\n" for event in self._pending)
+        self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+@contextmanager
+def start_trace(
+    name: str, debug: bool = False, exporter: Optional[TraceExporter] = None
+) -> Iterator[Trace]:
+    """Make a new trace current for the enclosed block, exporting it at the end"""
+    trace = Trace(name, debug=debug)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if exporter is not None:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace for a sample of HTTP requests
+
+    TRACE_SAMPLE_RATE picks the fraction traced (1% by default; raise it while
+    investigating), TRACE_DEBUG attaches each trace's breakdown to chat responses, and
+    TRACE_EXPORT_PATH appends traces to a file.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: Optional[float] = None,
+        debug: Optional[bool] = None,
+        export_path: Optional[str] = None,
+    ):
+        self.app = app
+        self.sample_rate = (
+            sample_rate
+            if sample_rate is not None
+            else float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        )
+        self.debug = (
+            debug if debug is not None else (os.getenv("TRACE_DEBUG", "false").lower() == "true")
+        )
+        export_path = export_path if export_path is not None else os.getenv("TRACE_EXPORT_PATH")
+        self.exporter = TraceExporter(export_path) if export_path else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.sample_rate < 1.0 and random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+        with start_trace(f"{scope['method']} {scope['path']}", self.debug, self.exporter):
+            await self.app(scope, receive, send)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread
+
+    Output is the folded-stack format ("outer;inner;leaf count" per line) that
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
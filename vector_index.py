@@ -0,0 +1,217 @@
+"""
+In-process vector index backed by a contiguous NumPy float32 matrix
+Used by VectorStore when VECTOR_STORE_MODE=local. Saved versions are opened memory-mapped
+and read-only, so every worker shares one copy; the first write copies rows into RAM.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from index_versions import (
+    is_mapped,
+    lookup_rows,
+    open_rows,
+    publish,
+    read_header,
+    resolve,
+    write_header,
+    write_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+
+
+class LocalVectorIndex:
+    """Exact cosine-similarity index over L2-normalised float32 rows"""
+
+    def __init__(self, dimension: int = 1024, initial_capacity: int = 1024):
+        self.dimension = dimension
+        self._vectors = np.zeros((max(initial_capacity, 1), dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._positions
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the populated rows (no copy)"""
+        return self._vectors[: len(self._ids)]
+
+    def _normalise(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[np.newaxis, :]
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}"
+            )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _make_writable(self):
+        """Copy a memory-mapped version into RAM before the first modification"""
+        if not is_mapped(self._ids):
+            return
+        self._vectors = np.array(self._vectors[: len(self._ids)])
+        if self._vectors.shape[0] == 0:
+            self._vectors = np.zeros((1, self.dimension), dtype=np.float32)
+        self._ids = list(self._ids)
+        self._metadata = list(self._metadata)
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+
+    def _ensure_capacity(self, required: int):
+        capacity = self._vectors.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[: len(self._ids)] = self._vectors[: len(self._ids)]
+        self._vectors = grown
+
+    def upsert(
+        self,
+        ids: List[str],
+        vectors: Any,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Insert or overwrite rows for the given chunk ids"""
+        if not ids:
+            return
+        normalised = self._normalise(vectors)
+        if len(ids) != normalised.shape[0]:
+            raise ValueError("ids and vectors must have the same length")
+        metadata = metadata or [{} for _ in ids]
+
+        self._make_writable()
+        self._ensure_capacity(len(self._ids) + len(ids))
+        for chunk_id, row, meta in zip(ids, normalised, metadata):
+            position = self._positions.get(chunk_id)
+            if position is None:
+                position = len(self._ids)
+                self._positions[chunk_id] = position
+                self._ids.append(chunk_id)
+                self._metadata.append(meta)
+            else:
+                self._metadata[position] = meta
+            self._vectors[position] = row
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove rows by swapping the last row into the freed slot"""
+        self._make_writable()
+        removed = 0
+        for chunk_id in ids:
+            position = self._positions.pop(chunk_id, None)
+            if position is None:
+                continue
+            last = len(self._ids) - 1
+            if position != last:
+                self._vectors[position] = self._vectors[last]
+                self._ids[position] = self._ids[last]
+                self._metadata[position] = self._metadata[last]
+                self._positions[self._ids[position]] = position
+            self._ids.pop()
+            self._metadata.pop()
+            removed += 1
+        return removed
+
+    def search(
+        self, query_vector: Any, top_k: int = 5, candidates: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float, Dict]]:
+        """Return (chunk_id, score, metadata) for the top_k most similar rows
+
+        With candidates, only those chunk ids are scored (a prefiltered shortlist).
+        """
+        size = len(self._ids)
+        if size == 0 or top_k <= 0:
+            return []
+
+        query = self._normalise(query_vector)[0]
+        if candidates is None:
+            rows = np.arange(size)
+            scores = self._vectors[:size] @ query
+        else:
+            rows = lookup_rows(self._positions, candidates)
+            if rows.size == 0:
+                return []
+            scores = self._vectors[rows] @ query
+
+        k = min(top_k, rows.size)
+        if k < rows.size:
+            selected = np.argpartition(-scores, k - 1)[:k]
+        else:
+            selected = np.arange(rows.size)
+        ranked = selected[np.argsort(-scores[selected], kind="stable")]
+
+        return [(self._ids[rows[i]], float(scores[i]), self._metadata[rows[i]]) for i in ranked]
+
+    def write(self, directory: str):
+        """Write the index's files into directory (a version, or a part of one)"""
+        np.save(os.path.join(directory, VECTORS_FILE), np.ascontiguousarray(self.vectors))
+        write_rows(directory, self._ids, self._metadata)
+        write_header(directory, {"dimension": self.dimension, "count": len(self)})
+
+    def save(self, path: str) -> str:
+        """Publish the index as a new version under path; returns its directory"""
+        directory = publish(path, self.write)
+        logger.info(f"Saved local vector index with {len(self)} vectors to {directory}")
+        return directory
+
+    @classmethod
+    def load(cls, path: str, dimension: int = 1024) -> "LocalVectorIndex":
+        """Open the current version memory-mapped, or return an empty index if absent
+
+        Directories written before versioning (vectors.npy + metadata.json) are read
+        into RAM.
+        """
+        directory = resolve(path)
+        header = read_header(directory)
+        if header is None:
+            return cls._load_flat(directory, dimension)
+        if header["dimension"] != dimension:
+            raise ValueError(
+                f"Index at {path} has dimension {header['dimension']}, expected {dimension}"
+            )
+
+        index = cls(dimension=dimension, initial_capacity=1)
+        index._vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        index._ids, index._metadata, index._positions = open_rows(directory)
+        logger.info(f"Opened local vector index with {len(index)} vectors at {directory}")
+        return index
+
+    @classmethod
+    def _load_flat(cls, path: str, dimension: int) -> "LocalVectorIndex":
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        metadata_path = os.path.join(path, METADATA_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(metadata_path)):
+            return cls(dimension=dimension)
+
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        vectors = np.load(vectors_path)
+
+        if stored.get("dimension", dimension) != dimension:
+            raise ValueError(
+                f"Index at {path} has dimension {stored.get('dimension')}, expected {dimension}"
+            )
+
+        index = cls(dimension=dimension, initial_capacity=max(len(stored["ids"]), 1))
+        index._vectors[: vectors.shape[0]] = vectors
+        index._ids = list(stored["ids"])
+        index._metadata = list(stored["metadata"])
+        index._positions = {chunk_id: i for i, chunk_id in enumerate(index._ids)}
+        logger.info(f"Loaded local vector index with {len(index)} vectors from {path}")
+        return index
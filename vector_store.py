@@ -1,103 +1,434 @@
 """
 Vector Store implementation using Upstash KV with Mixbread Large embeddings
+Set VECTOR_STORE_MODE=local to serve retrieval from an in-process NumPy index, and
+VECTOR_QUANTIZATION=int8|binary to keep only compact codes in RAM. The vector and lexical
+indexes are saved together as one version under INDEX_PATH, memory-mapped and shared by
+all workers; each worker swaps in new versions as they appear.
 """
 
-import httpx
+import asyncio
 import json
-import os
 import logging
-from typing import List, Dict, Optional, Any
+import os
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from http_clients import shared_pool
+from index_versions import VERSIONS_DIR, current_version, publish
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from quantized_index import QUANTIZATIONS, QuantizedVectorIndex
+from tracing import traced
+from vector_index import LocalVectorIndex
 
 logger = logging.getLogger(__name__)
 
+# Subdirectories of an index version holding each index
+VECTOR_PART = "vector"
+LEXICAL_PART = "lexical"
+OPEN_ATTEMPTS = 3
+
+
 class VectorStore:
     """Vector store using Upstash KV with Mixbread Large embeddings"""
-    
+
     def __init__(self):
+        self.mode = os.getenv("VECTOR_STORE_MODE", "upstash").lower()
         self.upstash_url = os.getenv("UPSTASH_VECTOR_URL")
         self.upstash_token = os.getenv("UPSTASH_VECTOR_TOKEN")
         self.mixbread_api_key = os.getenv("MIXBREAD_API_KEY")
-        
-        if not all([self.upstash_url, self.upstash_token, self.mixbread_api_key]):
+
+        if self.mode not in ("upstash", "local"):
+            raise ValueError(f"Unsupported VECTOR_STORE_MODE: {self.mode}")
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+        if self.retrieval_mode not in ("hybrid", "vector", "lexical"):
+            raise ValueError(f"Unsupported RETRIEVAL_MODE: {self.retrieval_mode}")
+        self.quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+        if self.quantization not in ("none",) + QUANTIZATIONS:
+            raise ValueError(f"Unsupported VECTOR_QUANTIZATION: {self.quantization}")
+        self.rerank_candidates = int(os.getenv("VECTOR_RERANK_CANDIDATES", "100"))
+
+        required = [self.mixbread_api_key]
+        if self.mode == "upstash":
+            required += [self.upstash_url, self.upstash_token]
+        if not all(required):
             raise ValueError("Missing required environment variables for vector store")
-        
+
         self.embedding_model = "mixedbread-ai/mxbai-embed-large-v1"
         self.embedding_dimension = 1024
-    
+        self.index_root = os.getenv("INDEX_PATH", "data/index")
+        # Separately saved indexes from older releases, read until the first combined save
+        self.index_path = os.getenv("VECTOR_INDEX_PATH", "data/vector_index")
+        self.local_index: Optional[Union[LocalVectorIndex, QuantizedVectorIndex]] = None
+        self.lexical_index_path = os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index")
+        self.lexical_index = BM25Index()
+        # Local mode scores vectors only on a BM25 shortlist once the corpus is this large
+        self.prefilter_min_chunks = int(os.getenv("HYBRID_PREFILTER_MIN_CHUNKS", "50000"))
+        self.prefilter_shortlist = int(os.getenv("HYBRID_PREFILTER_SHORTLIST", "2000"))
+        # Bumped on every write so caches derived from the index can detect staleness
+        self.index_generation = 0
+        self._saved_generation = 0
+        # Seconds between checks for index versions published by another process
+        self.refresh_interval = float(os.getenv("INDEX_REFRESH_SECONDS", "2"))
+        self._loaded_version: Any = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.upstash_client = None
+        self.embedding_cache = EmbeddingCache(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+            disk_path=os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3") or None,
+        )
+        self.embedding_batcher = EmbeddingBatcher(
+            self._request_embeddings,
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+        )
+
     async def initialize(self):
-        """Initialize HTTP clients and verify connections"""
+        """Register upstream clients on the shared pool and load local indexes"""
         try:
-            self.upstash_client = httpx.AsyncClient(
-                base_url=self.upstash_url,
-                headers={
-                    "Authorization": f"Bearer {self.upstash_token}",
-                    "Content-Type": "application/json"
-                },
-                timeout=30.0
-            )
-            
-            self.mixbread_client = httpx.AsyncClient(
-                base_url="https://api.mixedbread.ai/v1",
+            pool = shared_pool()
+            if self.mode == "upstash":
+                self.upstash_client = pool.service(
+                    "upstash",
+                    self.upstash_url,
+                    headers={
+                        "Authorization": f"Bearer {self.upstash_token}",
+                        "Content-Type": "application/json",
+                    },
+                    timeout=30.0,
+                )
+            self._loaded_version, self.local_index, self.lexical_index = self._open_indexes()
+            if self.refresh_interval > 0:
+                self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+            self.mixbread_client = pool.service(
+                "mixbread",
+                "https://api.mixedbread.ai/v1",
                 headers={
                     "Authorization": f"Bearer {self.mixbread_api_key}",
-                    "Content-Type": "application/json"
+                    "Content-Type": "application/json",
                 },
-                timeout=60.0
+                timeout=60.0,
             )
-            
-            logger.info("Vector store initialized successfully")
-            
+
+            logger.info(f"Vector store initialized successfully (mode={self.mode})")
+
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
-    
-    async def create_embedding(self, text: str) -> List[float]:
-        """Create embedding using Mixbread Large model"""
-        try:
-            response = await self.mixbread_client.post(
-                "/embeddings",
-                json={
-                    "model": self.embedding_model,
-                    "input": [text],
-                    "encoding_format": "float"
-                }
+
+    async def close(self):
+        """Persist unsaved index changes; pooled connections are closed with the pool"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        await self.embedding_batcher.close()
+        if self.index_generation != self._saved_generation:
+            self.save_index()
+        self.embedding_cache.close()
+
+    def save_index(self):
+        """Publish the lexical index, and in local mode the vector index, as one new version
+
+        The in-memory copies made by writes are then dropped in favour of the mapped files.
+        """
+        local_index, lexical_index = self.local_index, self.lexical_index
+
+        def write(directory: str):
+            if local_index is not None:
+                os.mkdir(os.path.join(directory, VECTOR_PART))
+                local_index.write(os.path.join(directory, VECTOR_PART))
+            os.mkdir(os.path.join(directory, LEXICAL_PART))
+            lexical_index.write(os.path.join(directory, LEXICAL_PART))
+
+        directory = publish(self.index_root, write)
+        logger.info(f"Saved indexes with {len(lexical_index)} chunks to {directory}")
+        self._loaded_version, self.local_index, self.lexical_index = self._open_indexes()
+        self._saved_generation = self.index_generation
+
+    def _index_paths(self) -> tuple:
+        """(version key, vector path, lexical path) of the indexes to serve"""
+        version = current_version(self.index_root)
+        if version is None:
+            legacy = (
+                current_version(self.index_path) if self.mode == "local" else None,
+                current_version(self.lexical_index_path),
             )
-            
-            if response.status_code != 200:
-                raise Exception(f"Mixbread API error: {response.status_code}")
-            
-            result = response.json()
-            return result["data"][0]["embedding"]
-            
+            return legacy, self.index_path, self.lexical_index_path
+        directory = os.path.join(self.index_root, VERSIONS_DIR, version)
+        return version, os.path.join(directory, VECTOR_PART), os.path.join(directory, LEXICAL_PART)
+
+    def _open_indexes(self) -> tuple:
+        """Memory-map the current version; returns (version key, vector index, lexical index)
+
+        Both indexes always come from the same version. A version pruned between resolving
+        and opening it is retried against the new CURRENT.
+        """
+        for attempt in range(OPEN_ATTEMPTS):
+            version, vector_path, lexical_path = self._index_paths()
+            try:
+                local_index = self._open_vector_index(vector_path)
+                lexical_index = BM25Index.load(lexical_path)
+            except FileNotFoundError:
+                pass
+            else:
+                # A missing part loads as an empty index, so check the version survived
+                if not isinstance(version, str) or os.path.isdir(os.path.dirname(lexical_path)):
+                    return version, local_index, lexical_index
+            if attempt == OPEN_ATTEMPTS - 1:
+                raise FileNotFoundError(f"Index version {version} was removed while opening")
+            logger.warning(f"Index version {version} was removed while opening, retrying")
+
+    def _open_vector_index(self, path: str):
+        if self.mode != "local":
+            return None
+        if self.quantization != "none":
+            return QuantizedVectorIndex.load(
+                path,
+                dimension=self.embedding_dimension,
+                quantization=self.quantization,
+                rerank_candidates=self.rerank_candidates,
+            )
+        return LocalVectorIndex.load(path, dimension=self.embedding_dimension)
+
+    async def refresh_indexes(self) -> bool:
+        """Swap in an index version published by another process; True if anything changed
+
+        Both indexes come from one version and are replaced in one step between awaits,
+        so a search never sees a new lexical index next to an old vector index. Skipped
+        while this process has unsaved writes, which its own next save will publish.
+        """
+        if self._index_paths()[0] == self._loaded_version:
+            return False
+        if self.index_generation != self._saved_generation:
+            return False
+        version, local_index, lexical_index = await asyncio.to_thread(self._open_indexes)
+        if self.index_generation != self._saved_generation:
+            return False
+        self._loaded_version = version
+        self.local_index, self.lexical_index = local_index, lexical_index
+        self.index_generation += 1
+        self._saved_generation = self.index_generation
+        logger.info(f"Swapped in index version {version}")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_indexes()
+            except Exception as e:
+                logger.error(f"Failed to refresh indexes: {e}")
+
+    @traced("vector_store.embed")
+    async def create_embedding(self, text: str) -> np.ndarray:
+        """Create a float32 embedding using Mixbread Large model"""
+        cached = await self.embedding_cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+
+        try:
+            embedding = await self.embedding_batcher.embed(text)
         except Exception as e:
             logger.error(f"Error creating embedding: {e}")
             raise
-    
-    async def search_documents(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Search documents with similarity"""
+
+        return self.embedding_cache.put(self.embedding_model, text, embedding)
+
+    async def create_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed many texts with one API request for the cache misses"""
+        embeddings = [await self.embedding_cache.get(self.embedding_model, text) for text in texts]
+        missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+        if not missing:
+            return embeddings
+
         try:
-            query_embedding = await self.create_embedding(query)
-            
-            # Mock search results for now
-            return [{
-                "document_id": "doc_1",
-                "max_score": 0.9,
-                "chunks": [{
-                    "score": 0.9,
-                    "metadata": {
-                        "content": "Sample content about bootcamp courses",
-                        "document_id": "doc_1"
-                    }
-                }],
-                "metadata": {"title": "Course Information"}
-            }]
-            
+            vectors = await self._request_embeddings(missing)
+        except Exception as e:
+            logger.error(f"Error creating embeddings: {e}")
+            raise
+
+        fresh = {
+            text: self.embedding_cache.put(self.embedding_model, text, vector)
+            for text, vector in zip(missing, vectors)
+        }
+        return [e if e is not None else fresh[t] for t, e in zip(texts, embeddings)]
+
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call the Mixbread embeddings endpoint for a list of inputs"""
+        response = await self.mixbread_client.post(
+            "/embeddings",
+            json={"model": self.embedding_model, "input": texts, "encoding_format": "float"},
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Mixbread API error: {response.status_code}")
+
+        result = response.json()
+        return [item["embedding"] for item in result["data"]]
+
+    async def upsert_chunks(self, chunks: List[Dict[str, Any]]):
+        """Store chunks given as {"id", "embedding", "metadata"} dicts"""
+        if not chunks:
+            return
+        self.index_generation += 1
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            self.lexical_index.upsert(chunk["id"], metadata.get("content", ""), metadata)
+
+        if self.mode == "local":
+            self.local_index.upsert(
+                [chunk["id"] for chunk in chunks],
+                [chunk["embedding"] for chunk in chunks],
+                [chunk.get("metadata", {}) for chunk in chunks],
+            )
+            return
+
+        response = await self.upstash_client.post(
+            "/upsert",
+            json=[
+                {
+                    "id": chunk["id"],
+                    "vector": np.asarray(chunk["embedding"]).tolist(),
+                    "metadata": chunk.get("metadata", {}),
+                }
+                for chunk in chunks
+            ],
+        )
+        if response.status_code != 200:
+            raise Exception(f"Upstash API error: {response.status_code}")
+
+    async def delete_chunks(self, ids: List[str]):
+        """Remove chunks by id"""
+        if not ids:
+            return
+        self.index_generation += 1
+        self.lexical_index.delete(ids)
+
+        if self.mode == "local":
+            self.local_index.delete(ids)
+            return
+
+        response = await self.upstash_client.post("/delete", json=ids)
+        if response.status_code != 200:
+            raise Exception(f"Upstash API error: {response.status_code}")
+
+    @traced("vector_store.query")
+    async def _query_chunks(
+        self, embedding: List[float], top_k: int, candidates: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Return the top_k nearest chunks as {"id", "score", "metadata"} dicts
+
+        candidates restricts local-mode scoring to a shortlist; Upstash ignores it.
+        """
+        if self.mode == "local":
+            return [
+                {"id": chunk_id, "score": score, "metadata": metadata}
+                for chunk_id, score, metadata in self.local_index.search(
+                    embedding, top_k, candidates=candidates
+                )
+            ]
+
+        response = await self.upstash_client.post(
+            "/query",
+            json={
+                "vector": np.asarray(embedding).tolist(),
+                "topK": top_k,
+                "includeMetadata": True,
+            },
+        )
+        if response.status_code != 200:
+            raise Exception(f"Upstash API error: {response.status_code}")
+        return response.json().get("result", [])
+
+    def _shortlist(self, lexical: List) -> Optional[List[str]]:
+        """BM25 candidates for vector scoring, or None to scan the whole local index"""
+        if self.local_index is None or len(self.local_index) < self.prefilter_min_chunks:
+            return None
+        # Too few lexical matches would cost recall; fall back to the full scan
+        if len(lexical) < self.prefilter_shortlist // 4:
+            return None
+        return [chunk_id for chunk_id, _ in lexical]
+
+    @traced("vector_store.search")
+    async def search_documents(
+        self, query: str, top_k: int = 5, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """Search documents with BM25 and vector similarity fused by reciprocal rank"""
+        try:
+            # Over-fetch chunks so that grouping still yields top_k documents
+            fetch = top_k * 3
+
+            # A refresh may swap indexes while this search awaits; stay on one version
+            lexical_index = self.lexical_index
+            lexical = []
+            if self.retrieval_mode != "vector" and len(lexical_index):
+                lexical = lexical_index.search(query, max(fetch, self.prefilter_shortlist))
+
+            matches = []
+            if self.retrieval_mode != "lexical":
+                if query_embedding is None:
+                    query_embedding = await self.create_embedding(query)
+                matches = await self._query_chunks(
+                    query_embedding, fetch, candidates=self._shortlist(lexical)
+                )
+            lexical = lexical[:fetch]
+
+            chunks: Dict[str, Dict] = {
+                match["id"]: {
+                    "score": match["score"],
+                    "rank_score": match["score"],
+                    "metadata": match.get("metadata") or {},
+                }
+                for match in matches
+            }
+            for chunk_id, bm25 in lexical:
+                chunk = chunks.setdefault(
+                    chunk_id,
+                    {
+                        "score": 0.0,
+                        "rank_score": bm25,
+                        "metadata": lexical_index.metadata(chunk_id) or {},
+                    },
+                )
+                chunk["bm25"] = bm25
+            if matches and lexical:
+                fused = reciprocal_rank_fusion(
+                    [[match["id"] for match in matches], [chunk_id for chunk_id, _ in lexical]]
+                )
+                for chunk_id, rank_score in fused.items():
+                    chunks[chunk_id]["rank_score"] = rank_score
+
+            documents: Dict[str, Dict] = {}
+            for chunk_id, chunk in sorted(chunks.items(), key=lambda c: -c[1]["rank_score"]):
+                metadata = chunk["metadata"]
+                document_id = metadata.get("document_id", chunk_id)
+                document = documents.setdefault(
+                    document_id,
+                    {
+                        "document_id": document_id,
+                        "max_score": chunk["score"],
+                        "rank_score": chunk["rank_score"],
+                        "chunks": [],
+                        "metadata": {"title": metadata.get("title", document_id)},
+                    },
+                )
+                document["max_score"] = max(document["max_score"], chunk["score"])
+                document["chunks"].append(
+                    {key: value for key, value in chunk.items() if key != "rank_score"}
+                )
+
+            # Chunks were visited best-first, so documents are already in rank order
+            return list(documents.values())[:top_k]
+
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             return []
-    
+
     async def health_check(self):
         """Check if vector store is healthy"""
         test_embedding = await self.create_embedding("test")
-        return len(test_embedding) == self.embedding_dimension
\ No newline at end of file
+        return len(test_embedding) == self.embedding_dimension